@@ -1,35 +1,184 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.database import get_db
 from app.services.pattern_detector import PatternDetector
+from app.services.story_clusterer import StoryClusterer
+from app.services.cooccurrence import CooccurrenceService, METRICS
+from app.services.trending import TrendingService
+from app.services.rollups import RollupService, INTERVALS
+from app.services.source_stats import SourceStatsService, LATENCY_STAGES
+from app.core.config import settings
+from app.api.articles import get_subscribed_domains
 from app.core.deps import get_current_active_user
-from app.models.user import User
+from app.models.user import User, UserPreferences
 from app.models.article import Feed
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
 @router.get("/cascades")
-async def get_cascades(hours: int = Query(48, ge=1, le=168), db: Session = Depends(get_db)):
-    """Detect information cascades in the last N hours"""
+async def get_cascades(
+    hours: int = Query(48, ge=1, le=168),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    articles_per_cascade: int = Query(10, ge=0, le=100),
+    db: Session = Depends(get_db)
+):
+    """Detect information cascades in the last N hours (pass next_cursor as cursor for the next page)"""
     detector = PatternDetector(db)
-    cascades = detector.detect_cascades(hours)
+    try:
+        page = detector.get_cascades(hours, limit=limit, cursor=cursor, articles_per_cascade=articles_per_cascade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "time_window_hours": hours,
-        "cascades_detected": len(cascades),
-        "cascades": cascades[:10]
+        "cascades_detected": page["total"],
+        "cascades": page["cascades"],
+        "next_cursor": page["next_cursor"]
     }
 
-@router.get("/trending")
-async def get_trending(hours: int = Query(24, ge=1, le=168), db: Session = Depends(get_db)):
-    """Get trending topics"""
+@router.get("/cascades/me")
+async def get_my_cascades(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    articles_per_cascade: int = Query(10, ge=0, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cascades among the user's subscribed sources, using their cascade preferences"""
+    # The authenticated user may come from the user cache, detached from this session
+    user = db.query(User).filter(User.id == current_user.id).first()
+    prefs = db.query(UserPreferences).filter(UserPreferences.user_id == user.id).first()
+    hours = min(max((prefs and prefs.cascade_threshold_hours) or 48, 1), 168)
+    min_sources = max((prefs and prefs.min_sources_for_cascade) or 2, 1)
+    # No subscriptions: every source, as on the article feed
+    sources = get_subscribed_domains(user) if user.subscribed_feeds else None
+    
     detector = PatternDetector(db)
-    trending = detector.get_trending_topics(hours)
+    try:
+        page = detector.get_cascades(
+            hours, limit=limit, cursor=cursor, articles_per_cascade=articles_per_cascade,
+            min_sources=min_sources, sources=sources
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "time_window_hours": hours,
+        "min_sources": min_sources,
+        "cascades_detected": page["total"],
+        "cascades": page["cascades"],
+        "next_cursor": page["next_cursor"]
+    }
+
+@router.get("/cascades/acceleration")
+async def get_cascade_acceleration(
+    hours: int = Query(24, ge=2, le=168),
+    limit: int = Query(20, ge=1, le=100),
+    min_sources: int = Query(2, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Entities whose mentions/hour are rising fastest (from the hourly rollups)"""
+    accelerating = RollupService(db).acceleration(hours, limit=limit, min_sources=min_sources)
+    
+    return {
+        "time_window_hours": hours,
+        "cascades": accelerating
+    }
+
+@router.get("/stories")
+async def get_stories(
+    hours: int = Query(48, ge=1, le=168),
+    min_sources: int = Query(2, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Multi-source stories from embedding clusters (catches coverage without a shared entity spelling)"""
+    stories = StoryClusterer(db).get_stories(hours, min_sources=min_sources, limit=limit)
     
     return {
         "time_window_hours": hours,
-        "trending_topics": trending
+        "stories_detected": len(stories),
+        "stories": stories
+    }
+
+@router.get("/trending")
+async def get_trending(
+    hours: int = Query(24, ge=1, le=168),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Get trending topics (counts may overestimate by at most max_error)"""
+    trending = TrendingService(db).top(hours, limit)
+    
+    return {
+        "time_window_hours": hours,
+        "total_mentions": trending["total_mentions"],
+        "max_error": trending["max_error"],
+        "trending_topics": trending["topics"]
+    }
+
+@router.get("/graph")
+async def get_entity_graph(
+    days: int = Query(settings.COOCCURRENCE_WINDOW_DAYS, ge=1, le=settings.COOCCURRENCE_RETENTION_DAYS),
+    limit: int = Query(100, ge=1, le=2000),
+    metric: str = "pmi",
+    min_count: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Entity co-occurrence graph: top-N entity pairs by PMI or raw count (nodes/links for a force graph)"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(METRICS)}")
+    graph = CooccurrenceService(db).graph(days, limit=limit, metric=metric, min_count=min_count)
+    
+    return {
+        "time_window_days": days,
+        "metric": metric,
+        **graph
+    }
+
+@router.get("/entity/{entity_name}/related")
+async def get_related_entities(
+    entity_name: str,
+    days: int = Query(settings.COOCCURRENCE_WINDOW_DAYS, ge=1, le=settings.COOCCURRENCE_RETENTION_DAYS),
+    limit: int = Query(20, ge=1, le=200),
+    metric: str = "pmi",
+    min_count: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Entities most often mentioned together with this one"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(METRICS)}")
+    related = CooccurrenceService(db).related(entity_name, days, limit=limit, metric=metric, min_count=min_count)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Entity not mentioned in this window")
+    
+    return {
+        "entity": entity_name,
+        "time_window_days": days,
+        "metric": metric,
+        "related": related
+    }
+
+@router.get("/entity/{entity_name}/series")
+async def get_entity_series(
+    entity_name: str,
+    days: int = Query(30, ge=1, le=90),
+    interval: str = "day",
+    by_source: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Articles mentioning an entity per hour or day, for charts"""
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVALS)}")
+    series = RollupService(db).entity_series(entity_name, days, interval=interval, by_source=by_source)
+    
+    return {
+        "entity": entity_name,
+        "days": days,
+        "interval": interval,
+        **series
     }
 
 @router.get("/entity/{entity_name}/timeline")
@@ -45,11 +194,56 @@ async def get_entity_timeline(entity_name: str, days: int = Query(30, ge=1, le=9
         "timeline": timeline
     }
 
+@router.get("/sources/series")
+async def get_source_series(
+    days: int = Query(30, ge=1, le=90),
+    interval: str = "day",
+    sources: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Articles per source per hour or day, for charts"""
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVALS)}")
+    series = RollupService(db).source_series(days, interval=interval, sources=sources)
+    
+    return {
+        "days": days,
+        "interval": interval,
+        **series
+    }
+
+@router.get("/sources/latency")
+async def get_source_latency(
+    stage: str = "fetch_to_process",
+    sources: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Latency percentiles per source: publish_to_fetch (feed lag) or fetch_to_process (pipeline lag)"""
+    if stage not in LATENCY_STAGES:
+        raise HTTPException(status_code=400, detail=f"stage must be one of {', '.join(LATENCY_STAGES)}")
+    return SourceStatsService(db).latency(stage, sources=sources)
+
+@router.get("/sources/origins")
+async def get_cascade_origins(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Sources that most often break a story: first to mention an entity that other sources then picked up"""
+    origins = SourceStatsService(db).cascade_origins(limit)
+    
+    return {
+        "window_hours": settings.SOURCE_CASCADE_WINDOW_HOURS,
+        "sources": origins
+    }
+
 @router.get("/sources")
-async def get_source_stats(db: Session = Depends(get_db)):
-    """Get statistics by source"""
+async def get_source_stats(
+    sources: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get statistics by source: counts, sentiment, publish cadence, latency percentiles and cascade origins"""
     detector = PatternDetector(db)
-    stats = detector.get_source_statistics()
+    stats = detector.get_source_statistics(sources)
     
     return {
         "sources": stats,
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 from app.db.database import get_db
-from app.models.article import Article, Feed
+from app.models.article import Article, Feed, RelatedArticle
 from app.models.user import User
 from app.core.deps import get_current_active_user
+from app.services.search import HybridSearchService, MODES
+from app.services.related import RelatedArticlesService
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -29,6 +32,34 @@ def extract_root_domain(url: str) -> str:
     
     return domain
 
+def get_subscribed_domains(user: User) -> List[str]:
+    """Possible source domains (root and www.) of the user's subscribed feeds"""
+    subscribed_domains = []
+    for feed in user.subscribed_feeds:
+        if not feed.url or feed.url == 'https://example.com/':
+            continue  # Skip empty/test feeds
+        
+        # Extract root domain
+        root_domain = extract_root_domain(feed.url)
+        subscribed_domains.append(root_domain)
+        
+        # Also add with www. prefix
+        www_domain = f"www.{root_domain}"
+        subscribed_domains.append(www_domain)
+    return subscribed_domains
+
+def _source_filter(user: User, sources: Optional[List[str]], subscribed_only: bool) -> Optional[List[str]]:
+    """Requested sources, narrowed to the user's subscriptions if asked.
+
+    None means no restriction; an empty list means nothing can match.
+    """
+    if not subscribed_only or not user.subscribed_feeds:
+        return sources
+    subscribed = get_subscribed_domains(user)
+    if not sources:
+        return subscribed
+    return [s for s in sources if s in subscribed]
+
 @router.get("/")
 async def get_articles(
     skip: int = 0,
@@ -48,19 +79,7 @@ async def get_articles(
         print(f"📊 User {current_user.username} has no subscriptions - showing all articles")
         query = db.query(Article).filter(Article.published_date >= one_hour_ago)
     else:
-        # Build list of possible source domains from subscribed feeds
-        subscribed_domains = []
-        for feed in user.subscribed_feeds:
-            if not feed.url or feed.url == 'https://example.com/':
-                continue  # Skip empty/test feeds
-            
-            # Extract root domain
-            root_domain = extract_root_domain(feed.url)
-            subscribed_domains.append(root_domain)
-            
-            # Also add with www. prefix
-            www_domain = f"www.{root_domain}"
-            subscribed_domains.append(www_domain)
+        subscribed_domains = get_subscribed_domains(user)
         
         print(f"📊 User {current_user.username} subscribed domains: {subscribed_domains}")
         
@@ -91,38 +110,116 @@ async def get_article(
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
     
-    return article
+    # content is a lazy property backed by article_content, so add it explicitly
+    return {**jsonable_encoder(article, exclude={"body"}), "content": article.content}
+
+def _get_embedder():
+    """Shared embedding service, or None if the vector backend is unavailable"""
+    from app.api.processing import get_embedder_service
+    try:
+        return get_embedder_service()
+    except Exception as e:
+        print(f"⚠️ Embedding service unavailable: {str(e)}")
+        return None
 
 @router.get("/{article_id}/similar")
 async def get_similar_articles(
     article_id: int,
     limit: int = 5,
+    sources: Optional[List[str]] = Query(None),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    entities: Optional[List[str]] = Query(None),
+    subscribed_only: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get similar articles based on embeddings"""
-    from app.services.embedder import Embedder
-    
+    """Get similar articles based on embeddings, optionally filtered by source, date and entities
+
+    Served from the precomputed related-articles graph; falls back to a live
+    vector search for articles not in it yet and for entity filters. The
+    graph is only extended where articles are embedded (reprocess.py
+    --embeddings), since live processing doesn't embed; articles ingested
+    since then are answered by the live search.
+    """
     article = db.query(Article).filter(Article.id == article_id).first()
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
     
-    embedder = Embedder()
-    similar = embedder.find_similar(article.id, limit=limit)
+    # The authenticated user may come from the user cache, detached from this session
+    user = db.query(User).filter(User.id == current_user.id).first()
+    sources = _source_filter(user, sources, subscribed_only)
+    if sources == []:
+        return []
+    
+    if not entities and db.query(RelatedArticle.article_id).filter(RelatedArticle.article_id == article.id).first():
+        query = db.query(RelatedArticle.related_id, RelatedArticle.score).join(
+            Article, Article.id == RelatedArticle.related_id
+        ).filter(RelatedArticle.article_id == article.id)
+        query = HybridSearchService(db).apply_filters(query, sources, date_from, date_to)
+        scores = {
+            row.related_id: row.score
+            for row in query.order_by(RelatedArticle.score.desc()).limit(limit)
+        }
+        return HybridSearchService(db).hydrate(
+            list(scores), {related_id: {'similarity': score} for related_id, score in scores.items()}
+        )
+    
+    embedder = _get_embedder()
+    if embedder is None:
+        return []
+    
+    points = embedder.search_similar_to_article(
+        article.id, limit=limit, sources=sources,
+        date_from=date_from, date_to=date_to, entities=entities
+    )
+    scores = {p.payload['article_id']: p.score for p in points}
+    return HybridSearchService(db).hydrate(
+        list(scores), {article_id: {'similarity': score} for article_id, score in scores.items()}
+    )
+
+@router.get("/{article_id}/graph")
+async def get_article_graph(
+    article_id: int,
+    depth: int = Query(1, ge=1, le=3),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Related-articles neighbourhood (nodes + scored edges) for the knowledge graph view"""
+    if not db.query(Article.id).filter(Article.id == article_id).first():
+        raise HTTPException(status_code=404, detail="Article not found")
     
-    return similar
+    return RelatedArticlesService(db, None).graph(article_id, depth=depth, limit=limit)
 
 @router.post("/search")
 async def search_articles(
     query: str,
     limit: int = 10,
+    mode: str = "hybrid",
+    sources: Optional[List[str]] = Query(None),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    entities: Optional[List[str]] = Query(None),
+    subscribed_only: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Semantic search for articles"""
-    from app.services.embedder import Embedder
-    
-    embedder = Embedder()
-    results = embedder.semantic_search(query, limit=limit)
-    
-    return results
\ No newline at end of file
+    """Hybrid keyword + semantic search (mode: hybrid, keyword or semantic)
+
+    Filters (sources, date range, entities, subscribed_only) are applied
+    inside the full-text and vector indexes, not after fetching.
+    """
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
+    # The authenticated user may come from the user cache, detached from this session
+    user = db.query(User).filter(User.id == current_user.id).first()
+    sources = _source_filter(user, sources, subscribed_only)
+    if sources == []:
+        return []
+    
+    embedder = _get_embedder() if mode != "keyword" else None
+    return HybridSearchService(db, embedder).search(
+        query, limit=limit, mode=mode, sources=sources,
+        date_from=date_from, date_to=date_to, entities=entities
+    )
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, HttpUrl
 from datetime import datetime
 from app.db.database import get_db
 from app.models.article import Feed, Article
+from app.models.user import User
 from app.services.feed_fetcher import FeedFetcher
+from app.services.feed_health import FeedHealthTracker, FEED, HOST
+from app.services.url_filter import get_url_filter
+from app.core.deps import get_current_superuser
 
 router = APIRouter(prefix="/feeds", tags=["feeds"])
 
@@ -53,6 +57,56 @@ async def get_feeds(db: Session = Depends(get_db)):
     feeds = db.query(Feed).all()
     return feeds
 
+@router.get("/health")
+async def get_feed_health(
+    scope: Optional[str] = Query(None, pattern=f"^({FEED}|{HOST})$"),
+    tripped_only: bool = False,
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Admin: per-feed and per-host fetch health / circuit breaker state"""
+    states = FeedHealthTracker(db).get_states(scope, tripped_only)
+    
+    return {
+        "total": len(states),
+        "tripped": sum(1 for s in states if s['is_tripped']),
+        "states": states
+    }
+
+@router.post("/health/reset")
+async def reset_feed_health(
+    key: str,
+    scope: str = Query(FEED, pattern=f"^({FEED}|{HOST})$"),
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Admin: close the circuit for a feed or host"""
+    if not FeedHealthTracker(db).reset(scope, key):
+        raise HTTPException(status_code=404, detail="No health state for that key")
+    db.commit()
+    
+    return {"message": f"Reset {scope} {key}"}
+
+@router.get("/url-filter")
+async def get_url_filter_stats(current_user: User = Depends(get_current_superuser)):
+    """Admin: seen-URL filter size and hit/false-positive counters"""
+    url_filter = get_url_filter()
+    if url_filter is None:
+        return {"enabled": False}
+    return {"enabled": True, **url_filter.stats()}
+
+@router.post("/url-filter/rebuild")
+async def rebuild_url_filter(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Admin: rebuild the seen-URL filter from the articles table"""
+    url_filter = get_url_filter()
+    if url_filter is None:
+        raise HTTPException(status_code=400, detail="URL filter is disabled")
+    added = url_filter.rebuild(db)
+    return {"message": f"Rebuilt filter with {added} URLs"}
+
 @router.post("/{feed_id}/fetch")
 async def fetch_feed(feed_id: int, db: Session = Depends(get_db)):
     """Fetch articles from a specific feed"""
@@ -61,7 +115,7 @@ async def fetch_feed(feed_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Feed not found")
     
     fetcher = FeedFetcher(db)
-    articles = await fetcher.fetch_feed(feed.url)
+    articles = await fetcher.fetch_feed_incremental(feed)
     saved_count = await fetcher.save_articles(articles)
     
     # Update last_fetched
@@ -86,7 +140,7 @@ async def fetch_all_feeds_now(db: Session = Depends(get_db)):
     
     for feed in feeds:
         fetcher = FeedFetcher(db)
-        articles = await fetcher.fetch_feed(feed.url)
+        articles = await fetcher.fetch_feed_incremental(feed)
         saved_count = await fetcher.save_articles(articles)
         total_saved += saved_count
         
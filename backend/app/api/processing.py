@@ -1,9 +1,19 @@
 from fastapi import APIRouter, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
 from app.db.database import get_db, SessionLocal
 from app.models.article import Article
 from app.services.embedder import EmbeddingService
 from app.services.ner_service import NERService
+from app.services.nlp_cache import get_nlp_cache
+from app.services.html_cache import get_html_cache
+from app.services.feed_fetcher import extract_from_html
+from app.services.cooccurrence import CooccurrenceService, article_day
+from app.services.trending import TrendingService
+from app.services.rollups import RollupService
+from app.services.source_stats import SourceStatsService
+from app.services.gazetteer import record_mentions
 
 router = APIRouter(prefix="/processing", tags=["processing"])
 
@@ -27,23 +37,71 @@ def get_embedder_service():
         _embedder_service = EmbeddingService()
     return _embedder_service
 
-def process_article_task(article_id: int):
-    """Background task to process an article"""
+def process_article_task(article_id: int, force: bool = False):
+    """Background task to process an article
+
+    With force=True an already processed article is re-run; unchanged text
+    is served from the NLP cache instead of re-running the models.
+    """
     db = SessionLocal()
     try:
         article = db.query(Article).filter(Article.id == article_id).first()
-        if not article or article.is_processed:
+        if not article or (article.is_processed and not force):
             return
 
+        # Near-duplicates reuse their canonical article's NLP results
+        if article.canonical_id:
+            canonical = db.query(Article).filter(Article.id == article.canonical_id).first()
+            if canonical and canonical.is_processed:
+                stats = SourceStatsService(db)
+                stats.record_sentiment([(article.source_domain, article.sentiment_score, canonical.sentiment_score)])
+                if not article.is_processed:
+                    stats.record_processed([(article.source_domain, article.fetched_date, datetime.now())])
+                article.entities = canonical.entities
+                article.sentiment_score = canonical.sentiment_score
+                article.story_id = canonical.story_id
+                article.embedding_id = None
+                article.is_processed = True
+                db.commit()
+                print(f"✓ Reused results of article {canonical.id} for duplicate {article_id}")
+                return
+
         # Use singleton services - MUCH faster!
         ner = get_ner_service()
         # embedder = get_embedder_service()  # DISABLED: Qdrant timeouts
 
-        # Extract entities
-        if article.content:
-            entities = ner.extract_entities(article.content)
+        seen_at = article.published_date or article.fetched_date
+        previous_entities = article.entities
+        previous_sentiment = article.sentiment_score
+
+        # Extract entities; entries without body text still get known entities from the gazetteer
+        text = article.content
+        if not text and ner.gazetteer is not None:
+            text = " ".join(filter(None, [article.title, article.summary]))
+        if text:
+            cooccurrence = CooccurrenceService(db)
+            if article.is_processed:
+                cooccurrence.record([(article.entities, article_day(article))], sign=-1)
+            entities = ner.extract_entities(text, summary_only=not article.content)
             article.entities = {"entities": entities}
-            article.sentiment_score = ner.analyze_sentiment(article.content)
+            if article.content:
+                article.sentiment_score = ner.analyze_sentiment(article.content)
+            cooccurrence.record([(article.entities, article_day(article))])
+            if not article.is_processed:
+                TrendingService(db).record([(article.entities, seen_at)])
+                record_mentions(db, [article.entities])
+
+        rollups = RollupService(db)
+        if article.is_processed:
+            rollups.record([(previous_entities, article.source_domain, seen_at)], sign=-1)
+        rollups.record([(article.entities, article.source_domain, seen_at)])
+
+        stats = SourceStatsService(db)
+        stats.record_sentiment([(article.source_domain, previous_sentiment, article.sentiment_score)])
+        if not article.is_processed:
+            stats.record_processed([(article.source_domain, article.fetched_date, datetime.now())])
+            if not article.canonical_id:
+                stats.record_origins([(article.entities, article.source_domain, seen_at)])
 
         # TEMPORARILY DISABLED: Embeddings are timing out with Qdrant
         # We'll skip embeddings for now to get the system working
@@ -61,21 +119,56 @@ def process_article_task(article_id: int):
     finally:
         db.close()
 
+def reextract_articles_task(article_ids: List[int], batch_size: int = 100):
+    """Re-run content extraction from cached HTML (no network), then re-process changed articles"""
+    html_cache = get_html_cache()
+    if html_cache is None:
+        return
+    
+    changed_ids = []
+    missing = 0
+    db = SessionLocal()
+    try:
+        for i in range(0, len(article_ids), batch_size):
+            batch = db.query(Article).filter(Article.id.in_(article_ids[i:i + batch_size])).all()
+            for article in batch:
+                html = html_cache.get(article.url)
+                if html is None:
+                    missing += 1
+                    continue
+                text = extract_from_html(article.url, html)
+                if text and text != article.content:
+                    article.content = text
+                    article.meta = {**(article.meta or {}), 'content_source': 'extracted'}
+                    changed_ids.append(article.id)
+            db.commit()
+            db.expunge_all()
+    except Exception as e:
+        print(f"✗ Error re-extracting articles: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+    
+    print(f"♻️ Re-extracted {len(changed_ids)} changed articles ({missing} not in HTML cache)")
+    for article_id in changed_ids:
+        process_article_task(article_id, force=True)
+
 @router.post("/process/{article_id}")
 async def process_article(
     article_id: int,
     background_tasks: BackgroundTasks,
+    force: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Process a single article"""
+    """Process a single article (force=true re-processes it)"""
     article = db.query(Article).filter(Article.id == article_id).first()
     if not article:
         return {"error": "Article not found"}
     
-    if article.is_processed:
+    if article.is_processed and not force:
         return {"message": "Article already processed"}
     
-    background_tasks.add_task(process_article_task, article_id)
+    background_tasks.add_task(process_article_task, article_id, force)
     
     return {"message": f"Processing article {article_id} in background"}
 
@@ -95,6 +188,25 @@ async def process_all_unprocessed(
         "count": len(unprocessed)
     }
 
+@router.post("/reextract")
+async def reextract_articles(
+    background_tasks: BackgroundTasks,
+    article_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Re-extract article text from the HTML cache (all articles, or one) and re-process changes"""
+    query = db.query(Article.id)
+    if article_id is not None:
+        query = query.filter(Article.id == article_id)
+    article_ids = [row.id for row in query.all()]
+    
+    background_tasks.add_task(reextract_articles_task, article_ids)
+    
+    return {
+        "message": f"Re-extracting {len(article_ids)} articles from cache in background",
+        "count": len(article_ids)
+    }
+
 @router.get("/stats")
 async def get_processing_stats(db: Session = Depends(get_db)):
     """Get processing statistics"""
@@ -106,4 +218,15 @@ async def get_processing_stats(db: Session = Depends(get_db)):
         "processed": processed,
         "unprocessed": total - processed,
         "processing_rate": f"{(processed/total*100):.1f}%" if total > 0 else "0%"
+    }
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """NLP result, raw HTML and search query cache statistics (null when disabled or not loaded)"""
+    nlp_cache = get_nlp_cache()
+    html_cache = get_html_cache()
+    return {
+        "nlp_cache": nlp_cache.stats() if nlp_cache else None,
+        "html_cache": html_cache.stats() if html_cache else None,
+        "search_cache": _embedder_service.query_cache_stats() if _embedder_service else None
     }
\ No newline at end of file
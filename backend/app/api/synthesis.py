@@ -13,14 +13,7 @@ router = APIRouter(prefix="/synthesis", tags=["synthesis"])
 async def synthesize_cascade(entity_name: str, hours: int = Query(48, ge=1, le=168), db: Session = Depends(get_db)):
     """Generate AI synthesis for a specific entity cascade"""
     detector = PatternDetector(db)
-    cascades = detector.detect_cascades(hours)
-    
-    # Find the specific cascade
-    cascade = None
-    for c in cascades:
-        if c['entity'].lower() == entity_name.lower():
-            cascade = c
-            break
+    cascade = detector.get_cascade(entity_name, hours)
     
     if not cascade:
         raise HTTPException(status_code=404, detail=f"No cascade found for entity: {entity_name}")
@@ -49,7 +42,7 @@ async def daily_briefing(db: Session = Depends(get_db)):
     
     # Get cascades
     detector = PatternDetector(db)
-    cascades = detector.detect_cascades(24)
+    cascades = detector.detect_cascades(24, limit=3)
     
     # Synthesize
     synthesizer = SynthesisService(settings.OPENAI_API_KEY)
@@ -76,7 +69,7 @@ async def daily_briefing(db: Session = Depends(get_db)):
 async def synthesize_top_cascades(limit: int = Query(3, ge=1, le=5), db: Session = Depends(get_db)):
     """Get AI synthesis for top cascades"""
     detector = PatternDetector(db)
-    cascades = detector.detect_cascades(48)
+    cascades = detector.detect_cascades(48, limit=limit)
     
     if not cascades:
         return {"message": "No cascades detected", "syntheses": []}
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # API Settings
@@ -31,6 +31,117 @@ class Settings(BaseSettings):
     # Processing
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_BACKEND: str = "torch"  # torch, onnx or onnx-int8; ONNX needs a Transformer + Pooling (+ Normalize) model, and a failed export/parity check falls back to torch once and is remembered (retry: python -m app.services.encoders --force)
+    EMBEDDING_ONNX_DIR: str = "data/onnx"
+    EMBEDDING_ONNX_THREADS: int = 0  # 0 = onnxruntime default
+    EMBEDDING_PARITY_TOLERANCE: float = 0.01  # ONNX vectors must have cosine >= 1 - this vs PyTorch
+    NLP_CACHE_ENABLED: bool = True
+    NLP_CACHE_PATH: str = "data/nlp_cache.sqlite"
+    VECTOR_STORE_ENABLED: bool = True
+    VECTOR_STORE_DIR: str = "data/vectors"
+    VECTOR_STORE_DTYPE: str = "float16"  # float16 halves disk use; cosine error ~1e-4
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048  # in-memory LRU of search query vectors
+    SEARCH_RESULT_CACHE_SIZE: int = 512
+    SEARCH_RESULT_CACHE_TTL: int = 30  # seconds; 0 disables the search result cache
+    SEARCH_CANDIDATES: int = 50  # candidates taken from each leg of hybrid search
+    SEARCH_RRF_K: int = 60  # reciprocal rank fusion constant
+    SEARCH_MIN_VECTOR_SCORE: float = 0.3
+    
+    # Gazetteer entity tagging
+    NER_GAZETTEER_MODE: str = "merge"  # "off", "merge" (gazetteer + spaCy) or "fast" (gazetteer only for short/summary text; spaCy never sees them, so new entities there go unnoticed)
+    NER_GAZETTEER_SHORT_CHARS: int = 600  # shorter texts skip spaCy in fast mode
+    GAZETTEER_PATH: str = "data/gazetteer.json"  # [{"name", "type", "aliases": [...]}]
+    GAZETTEER_MIN_MENTIONS: int = 3  # entities seen in fewer articles are left out (keeps one-off NER noise out)
+    GAZETTEER_REFRESH_SECONDS: int = 600
+    
+    # Related-articles graph
+    RELATED_K: int = 10  # neighbours kept per article
+    RELATED_MIN_SCORE: float = 0.5
+    RELATED_WINDOW_DAYS: int = 14  # new articles are compared against this recent window
+    
+    # Story clustering
+    STORY_COLLECTION_NAME: str = "story_centroids"
+    STORY_THRESHOLD: float = 0.72  # min cosine to a story centroid to join it
+    STORY_WINDOW_HOURS: int = 72  # stories idle for longer stop absorbing articles
+    
+    # Entity co-occurrence graph
+    COOCCURRENCE_WINDOW_DAYS: int = 7  # default sliding window for graph queries
+    COOCCURRENCE_RETENTION_DAYS: int = 30  # daily count buckets kept (max window)
+    COOCCURRENCE_MIN_COUNT: int = 2  # pairs seen fewer times are left out of the in-memory matrix
+    COOCCURRENCE_CACHE_SECONDS: int = 60  # how long a loaded matrix is reused
+    
+    # Trending topics
+    TRENDING_SKETCH_CAPACITY: int = 1000  # counters per hourly sketch; overcount <= mentions / capacity
+    TRENDING_MAX_HOURS: int = 168  # longest window served; older sketches are deleted by retention
+    TRENDING_CACHE_SECONDS: int = 60
+    TRENDING_FLUSH_SECONDS: int = 30  # how often a process merges its pending counts into the hourly rows
+    
+    # Cascade ranking
+    CASCADE_SCORING: str = "sources"  # "sources" (source count, then mentions) or "weighted"
+    CASCADE_SCORE_WEIGHTS: Dict[str, float] = {
+        "source_count": 1.0,
+        "velocity": 0.5,
+        "acceleration": 0.5,
+        "source_entropy": 0.5,
+        "burstiness": 0.25,
+    }  # z-scored metrics combined by the "weighted" scorer
+    CASCADE_CACHE_SECONDS: int = 60  # how long a window's cascade snapshot is reused
+    CASCADE_CURSOR_SECONDS: int = 600  # how long a paged snapshot stays readable after its last page
+    
+    # Hourly entity/source rollups
+    ROLLUP_RETENTION_DAYS: int = 90  # longest time series served
+    
+    # Per-source statistics
+    SOURCE_LATENCY_ACCURACY: float = 0.05  # relative error of latency percentiles
+    SOURCE_CASCADE_WINDOW_HOURS: int = 48  # a second source within this long makes the first the cascade origin
+    
+    # Incremental feed parsing
+    FEED_KNOWN_RUN_STOP: int = 3  # stop parsing after this many consecutive already-seen entries
+    FEED_SEEN_MAX: int = 500  # seen GUIDs remembered per feed
+    
+    # Seen-URL Bloom filter
+    URL_FILTER_ENABLED: bool = True
+    URL_FILTER_BACKEND: str = "memory"  # "memory" or "redis"
+    URL_FILTER_CAPACITY: int = 100000  # URLs in the first layer; later layers double
+    URL_FILTER_ERROR_RATE: float = 0.001
+    
+    # Legacy inline article text (now in article_content)
+    DROP_INLINE_CONTENT_COLUMN: bool = False  # one-off: drop articles.content once no older instance runs
+    
+    # Feed-embedded content
+    FEED_CONTENT_FULL_WORDS: int = 300  # word count treated as a complete article
+    FEED_CONTENT_MIN_SCORE: float = 0.8  # completeness needed to skip the article download
+    
+    # Raw HTML cache
+    HTML_CACHE_ENABLED: bool = True
+    HTML_CACHE_DIR: str = "data/html_cache"
+    HTML_CACHE_MAX_MB: int = 2048
+    HTML_CACHE_ZSTD_LEVEL: int = 9
+    
+    # Feed health / circuit breaker
+    FEED_FETCH_TIMEOUT: float = 15.0  # seconds
+    ARTICLE_FETCH_TIMEOUT: float = 10.0  # seconds
+    HEALTH_FAILURE_THRESHOLD: int = 3  # consecutive failures before the circuit opens
+    HEALTH_BACKOFF_BASE: int = 300  # seconds, doubled for each failure past the threshold
+    HEALTH_BACKOFF_MAX: int = 6 * 3600  # seconds
+    HEALTH_LATENCY_ALPHA: float = 0.3  # EWMA smoothing factor
+    
+    # Near-duplicate detection
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.7  # estimated Jaccard similarity of word 3-shingles
+    DEDUP_MIN_TOKENS: int = 50  # shorter texts are too noisy to fingerprint
+    DEDUP_WINDOW_DAYS: int = 7
+    
+    # Retention
+    RETENTION_ENABLED: bool = False  # opt in: deletes aged-out rows for good
+    RETENTION_INTERVAL_HOURS: int = 6
+    RETENTION_BATCH_SIZE: int = 500  # rows per DELETE
+    RETENTION_MAX_BATCHES: int = 200  # per table per run, bounds the job's runtime
+    RETENTION_ARTICLE_DAYS: int = 30
+    RETENTION_ARCHIVE_MODE: str = "table"  # "table", "file" or "none"
+    RETENTION_ARCHIVE_DIR: str = "data/archive"
+    RETENTION_ARCHIVE_DAYS: int = 365
+    RETENTION_FEED_HEALTH_DAYS: int = 30
     
     class Config:
         env_file = ".env"
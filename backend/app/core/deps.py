@@ -76,4 +76,12 @@ async def get_current_active_user(
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_superuser(
+    current_user: User = Depends(get_current_active_user)
+) -> User:
+    """Get current user, requiring admin rights"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
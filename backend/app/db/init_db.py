@@ -1,5 +1,8 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import selectinload
 from app.db.database import engine, Base, SessionLocal
-from app.models.article import Article, Feed, Entity
+from app.core.config import settings
+from app.models.article import search_vector_expr, Article, ArticleContent, ArticleFingerprint, ArticleLSHBand, Feed, Entity, FeedHealth, ArticleArchive, RelatedArticle, StoryCluster, EntityDayCount, EntityCooccurrence, TrendingSketch, EntityHourlyRollup, SourceStats
 from app.models.user import User, UserPreferences
 
 def seed_default_feeds():
@@ -88,11 +91,209 @@ def seed_default_feeds():
     finally:
         db.close()
 
+def add_missing_columns():
+    """Add nullable columns declared on models but missing from existing tables.
+
+    create_all() only creates missing tables, so new columns on existing
+    tables are added here.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                if column.index:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table.name}_{column.name} ON {table.name} ({column.name})"
+                    ))
+                print(f"✅ Added column {table.name}.{column.name}")
+
+def migrate_inline_content(batch_size: int = 500):
+    """Copy legacy articles.content text into the compressed article_content table.
+
+    The inline column is left in place (older instances may still read and
+    write it); it is only dropped when DROP_INLINE_CONTENT_COLUMN is set,
+    once every instance runs this version.
+    """
+    columns = {c['name'] for c in inspect(engine).get_columns('articles')}
+    if 'content' not in columns:
+        return
+
+    db = SessionLocal()
+    copied = 0
+    try:
+        last_id = 0
+        while True:
+            rows = db.execute(text(
+                "SELECT id, content FROM articles a WHERE id > :last_id AND content IS NOT NULL "
+                "AND NOT EXISTS (SELECT 1 FROM article_content c WHERE c.article_id = a.id) "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                if row.content:
+                    db.add(ArticleContent(article_id=row.id, text=row.content))
+            db.commit()
+            copied += len(rows)
+            last_id = rows[-1].id
+
+        if copied:
+            print(f"✅ Copied {copied} article bodies to article_content")
+        if settings.DROP_INLINE_CONTENT_COLUMN:
+            db.execute(text("ALTER TABLE articles DROP COLUMN content"))
+            db.commit()
+            print("✅ Dropped legacy articles.content column")
+    except Exception as e:
+        print(f"❌ Error migrating article content: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_search_vectors(batch_size: int = 500):
+    """Build the keyword search index for articles saved before it existed (Postgres only)"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING gin (search_vector)"
+        ))
+
+    db = SessionLocal()
+    filled = 0
+    last_id = 0
+    try:
+        while True:
+            batch = db.query(Article).options(selectinload(Article.body)).filter(
+                Article.id > last_id,
+                Article.search_vector.is_(None)
+            ).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            for article in batch:
+                article.search_vector = search_vector_expr(article.title, article.summary, article.content)
+            last_id = batch[-1].id
+            db.commit()
+            filled += len(batch)
+            db.expunge_all()
+        if filled:
+            print(f"✅ Indexed {filled} articles for keyword search")
+    except Exception as e:
+        print(f"❌ Error building search index: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_cooccurrence():
+    """Count entity co-occurrences of already processed articles on first run"""
+    from app.services.cooccurrence import CooccurrenceService
+
+    db = SessionLocal()
+    try:
+        if db.query(EntityDayCount.id).first() is None:
+            CooccurrenceService(db).rebuild()
+    except Exception as e:
+        print(f"❌ Error building entity co-occurrence counts: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_trending():
+    """Build the hourly trending sketches from already processed articles on first run"""
+    from app.services.trending import TrendingService
+
+    db = SessionLocal()
+    try:
+        if db.query(TrendingSketch.id).first() is None:
+            TrendingService(db).rebuild()
+    except Exception as e:
+        print(f"❌ Error building trending sketches: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_rollups():
+    """Build the hourly entity/source rollups from already processed articles on first run"""
+    from app.services.rollups import RollupService
+
+    db = SessionLocal()
+    try:
+        if db.query(EntityHourlyRollup.id).first() is None:
+            RollupService(db).rebuild()
+    except Exception as e:
+        print(f"❌ Error building hourly rollups: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_entities(batch_size: int = 1000):
+    """Count entity mentions of already processed articles on first run (the gazetteer's source)"""
+    from app.services.gazetteer import record_mentions
+
+    db = SessionLocal()
+    try:
+        if db.query(Entity.id).first() is not None:
+            return
+        last_id = 0
+        counted = 0
+        while True:
+            batch = db.query(Article.id, Article.entities).filter(
+                Article.id > last_id,
+                Article.is_processed == True,
+                Article.canonical_id.is_(None)
+            ).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            record_mentions(db, (a.entities for a in batch))
+            db.commit()
+            counted += len(batch)
+            last_id = batch[-1].id
+        if counted:
+            print(f"📇 Counted entity mentions of {counted} articles")
+    except Exception as e:
+        print(f"❌ Error counting entity mentions: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def backfill_source_stats():
+    """Build the per-source statistics from existing articles on first run"""
+    from app.services.source_stats import SourceStatsService
+
+    db = SessionLocal()
+    try:
+        if db.query(SourceStats.id).first() is None and db.query(Article.id).first() is not None:
+            SourceStatsService(db).rebuild()
+    except Exception as e:
+        print(f"❌ Error building source statistics: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
 def init_db():
     """Initialize database tables and seed default data"""
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created successfully!")
 
+    add_missing_columns()
+    migrate_inline_content()
+    backfill_search_vectors()
+    backfill_cooccurrence()
+    backfill_trending()
+    backfill_rollups()
+    backfill_entities()
+    backfill_source_stats()
+
     # Seed default feeds
     seed_default_feeds()
 
@@ -26,6 +26,9 @@ async def lifespan(app: FastAPI):
     task.cancel()
     print("👻 Background scheduler stopped")
 
+    from app.services.trending import flush_pending
+    flush_pending()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
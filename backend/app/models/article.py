@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, Float, JSON, Boolean, LargeBinary, UniqueConstraint, ForeignKey, Index, event, inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred, Session
 from sqlalchemy.sql import func
+from typing import Optional
+import hashlib
+import zstandard
 from app.db.database import Base
 
+ZSTD_LEVEL = 3
+SEARCH_CONFIG = "english"  # Postgres text search configuration
+SEARCH_CONTENT_CHARS = 20000  # body text indexed for keyword search
+
 class Article(Base):
     __tablename__ = "articles"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
     url = Column(String(1000), unique=True, nullable=False, index=True)
-    content = Column(Text)
     summary = Column(Text)
     author = Column(String(200))
     source_domain = Column(String(200), index=True)
@@ -18,6 +26,8 @@ class Article(Base):
     # Processing status
     is_processed = Column(Boolean, default=False)
     embedding_id = Column(String(100))  # Qdrant point ID
+    canonical_id = Column(Integer, index=True)  # Set when this is a near-duplicate of another article
+    story_id = Column(Integer, index=True)  # Embedding-based story cluster (StoryCluster.id)
     
     # Extracted data
     entities = Column(JSON)  # List of extracted entities
@@ -26,6 +36,223 @@ class Article(Base):
     
     # Metadata
     meta = Column(JSON)  # CHANGED from metadata to meta
+    
+    # Weighted title (A) / summary (B) / body (C) lexemes for keyword search,
+    # kept up to date by _refresh_search_vectors below. Deferred: only queried in SQL.
+    search_vector = deferred(Column(TSVECTOR))
+    
+    __table_args__ = (Index('ix_articles_search_vector', 'search_vector', postgresql_using='gin'),)
+    
+    # Full text lives in article_content and is only loaded when accessed
+    body = relationship(
+        "ArticleContent",
+        uselist=False,
+        lazy="select",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    
+    @property
+    def content(self) -> Optional[str]:
+        return self.body.text if self.body is not None else None
+    
+    @content.setter
+    def content(self, text: Optional[str]):
+        if not text:
+            self.body = None
+        elif self.body is not None:
+            self.body.text = text
+        else:
+            self.body = ArticleContent(text=text)
+
+class ArticleContent(Base):
+    """zstd-compressed article body, kept out of the hot articles table"""
+    __tablename__ = "article_content"
+    
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    content_hash = Column(String(64), index=True)  # sha256 of the uncompressed text
+    raw_size = Column(Integer)
+    data = Column(LargeBinary)
+    
+    def __init__(self, text: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        if text is not None:
+            self.text = text
+    
+    @property
+    def text(self) -> Optional[str]:
+        if self.data is None:
+            return None
+        # Compressor objects aren't thread-safe, so create one per call
+        return zstandard.ZstdDecompressor().decompress(self.data).decode("utf-8")
+    
+    @text.setter
+    def text(self, value: str):
+        raw = value.encode("utf-8")
+        self.content_hash = hashlib.sha256(raw).hexdigest()
+        self.raw_size = len(raw)
+        self.data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+def search_vector_expr(title: Optional[str], summary: Optional[str], content: Optional[str]):
+    """SQL expression computing an article's tsvector"""
+    def weighted(text: Optional[str], weight: str):
+        return func.setweight(func.to_tsvector(SEARCH_CONFIG, text or ''), weight)
+    return weighted(title, 'A').op('||')(weighted(summary, 'B')).op('||')(
+        weighted((content or '')[:SEARCH_CONTENT_CHARS], 'C')
+    )
+
+@event.listens_for(Session, "before_flush")
+def _refresh_search_vectors(session, flush_context, instances):
+    """Recompute search_vector for new articles and ones whose text changed"""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    
+    changed = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Article):
+            state = inspect(obj)
+            if obj in session.new or any(
+                state.attrs[name].history.has_changes() for name in ('title', 'summary', 'body')
+            ):
+                changed.add(obj)
+        elif isinstance(obj, ArticleContent) and obj.article_id is not None and session.is_modified(obj):
+            # Body text edited in place: the parent article isn't dirty itself
+            with session.no_autoflush:
+                article = session.get(Article, obj.article_id)
+            if article is not None:
+                changed.add(article)
+    
+    for article in changed:
+        article.search_vector = search_vector_expr(article.title, article.summary, article.content)
+
+class ArticleFingerprint(Base):
+    """MinHash signature of an article's text, for near-duplicate detection"""
+    __tablename__ = "article_fingerprints"
+    
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # uint32 array
+    canonical_id = Column(Integer)
+    created_at = Column(DateTime, index=True)
+
+class ArticleLSHBand(Base):
+    """LSH index: one row per (band, bucket) of an article's MinHash signature"""
+    __tablename__ = "article_lsh_bands"
+    
+    id = Column(Integer, primary_key=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    __table_args__ = (Index('ix_article_lsh_bands_band_bucket', 'band', 'bucket'),)
+
+class RelatedArticle(Base):
+    """Precomputed nearest neighbours of an article by embedding similarity"""
+    __tablename__ = "related_articles"
+    
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    related_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True, index=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class StoryCluster(Base):
+    """A story: articles whose embeddings lie within STORY_THRESHOLD of a running centroid"""
+    __tablename__ = "story_clusters"
+    
+    id = Column(Integer, primary_key=True)
+    leader_article_id = Column(Integer, index=True)  # article that opened the cluster
+    centroid = Column(LargeBinary, nullable=False)  # float32 mean of member vectors
+    size = Column(Integer, nullable=False, default=1)
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime, index=True)
+
+class EntityDayCount(Base):
+    """Articles mentioning an entity, per day (entity "" counts all articles with entities)"""
+    __tablename__ = "entity_day_counts"
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    entity = Column(String(200), nullable=False)  # lowercased entity text
+    entity_type = Column(String(50))
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (UniqueConstraint('day', 'entity', name='uq_entity_day_counts_day_entity'),)
+
+class EntityCooccurrence(Base):
+    """Articles mentioning both entities, per day; one row per unordered pair (entity_a < entity_b)"""
+    __tablename__ = "entity_cooccurrence"
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    entity_a = Column(String(200), nullable=False)
+    entity_b = Column(String(200), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (UniqueConstraint('day', 'entity_a', 'entity_b', name='uq_entity_cooccurrence_day_pair'),)
+
+class EntityHourlyRollup(Base):
+    """Articles per (hour, entity, source); entity "" counts all of a source's articles"""
+    __tablename__ = "entity_hourly_rollups"
+    
+    id = Column(Integer, primary_key=True)
+    hour = Column(DateTime, nullable=False)  # start of the hour
+    entity = Column(String(200), nullable=False)  # lowercased entity text
+    entity_type = Column(String(50))
+    source_domain = Column(String(200), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('hour', 'entity', 'source_domain', name='uq_entity_hourly_rollups_key'),
+        Index('ix_entity_hourly_rollups_entity_hour', 'entity', 'hour'),
+        Index('ix_entity_hourly_rollups_source_hour', 'source_domain', 'hour'),
+    )
+
+class TrendingSketch(Base):
+    """Space-Saving summary of one hour's entity mentions (see app.services.trending)"""
+    __tablename__ = "trending_sketches"
+    
+    id = Column(Integer, primary_key=True)
+    hour = Column(DateTime, nullable=False, unique=True)  # start of the hour
+    total = Column(Integer, nullable=False, default=0)  # mentions summarized
+    sketch = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class SourceStats(Base):
+    """Running per-source totals, updated at ingest and processing (see app.services.source_stats)"""
+    __tablename__ = "source_stats"
+    
+    id = Column(Integer, primary_key=True)
+    source_domain = Column(String(200), nullable=False, unique=True)
+    article_count = Column(Integer, nullable=False, default=0)  # ingested, syndicated copies included
+    processed_count = Column(Integer, nullable=False, default=0)
+    sentiment_count = Column(Integer, nullable=False, default=0)  # articles with a sentiment score
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_sq_sum = Column(Float, nullable=False, default=0.0)
+    first_published = Column(DateTime)
+    last_published = Column(DateTime)
+    cascades_first = Column(Integer, nullable=False, default=0)  # entities this source covered before any other
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class SourceLatencyBucket(Base):
+    """Log-scale latency histogram bucket per (source, stage); buckets merge by addition"""
+    __tablename__ = "source_latency_buckets"
+    
+    id = Column(Integer, primary_key=True)
+    source_domain = Column(String(200), nullable=False)
+    stage = Column(String(30), nullable=False)  # "publish_to_fetch" or "fetch_to_process"
+    bucket = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (UniqueConstraint('source_domain', 'stage', 'bucket', name='uq_source_latency_buckets_key'),)
+
+class CascadeOrigin(Base):
+    """First source to mention an entity in the current cascade window, and when a second source followed"""
+    __tablename__ = "cascade_origins"
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(200), nullable=False, unique=True)  # lowercased entity text
+    source_domain = Column(String(200), nullable=False)
+    first_seen = Column(DateTime, nullable=False, index=True)
+    spread_at = Column(DateTime)  # set once another source mentions it; the origin source is credited then
 
 class Feed(Base):
     __tablename__ = "feeds"
@@ -38,6 +265,7 @@ class Feed(Base):
     is_active = Column(Boolean, default=True)
     last_fetched = Column(DateTime)
     fetch_interval = Column(Integer, default=1800)  # seconds
+    seen_guids = Column(JSON)  # Most recent entry GUIDs/URLs, newest first
     created_at = Column(DateTime, server_default=func.now())
 
 class Entity(Base):
@@ -48,4 +276,31 @@ class Entity(Base):
     entity_type = Column(String(50))  # PERSON, ORG, GPE, etc.
     first_seen = Column(DateTime, server_default=func.now())
     mention_count = Column(Integer, default=1)
-    meta = Column(JSON)  # CHANGED from metadata to meta
\ No newline at end of file
+    meta = Column(JSON)  # CHANGED from metadata to meta
+
+class FeedHealth(Base):
+    __tablename__ = "feed_health"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(20), nullable=False)  # "feed" or "host"
+    key = Column(String(1000), nullable=False, index=True)  # feed URL or hostname
+    
+    last_status = Column(String(50))  # "ok", "http_404", "timeout", "error", ...
+    last_error = Column(Text)
+    last_checked = Column(DateTime)
+    consecutive_failures = Column(Integer, default=0)
+    latency_ewma_ms = Column(Float)
+    backoff_until = Column(DateTime)  # Circuit is open until this time
+    
+    __table_args__ = (UniqueConstraint('scope', 'key', name='uq_feed_health_scope_key'),)
+
+class ArticleArchive(Base):
+    __tablename__ = "article_archive"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, index=True)
+    url = Column(String(1000))
+    source_domain = Column(String(200))
+    published_date = Column(DateTime)
+    archived_at = Column(DateTime, server_default=func.now(), index=True)
+    payload = Column(LargeBinary)  # gzip-compressed JSON of the full row
@@ -0,0 +1,385 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article
+from app.services.query_cache import LRUCache
+
+class MentionTable:
+    """Entity mentions in a time window as parallel columns, one row per (article, entity).
+
+    Entities, sources and articles are interned to integer codes; `canonical`
+    marks mentions by canonical articles (syndicated copies count towards an
+    entity's sources but not its mentions).
+    """
+
+    def __init__(self, window_start: datetime, window_end: datetime):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.entity_codes: Dict[Tuple[str, str], int] = {}
+        self.entity_names: List[str] = []
+        self.entity_types: List[str] = []
+        self.source_codes: Dict[str, int] = {}
+        self.source_names: List[str] = []
+        self.article_ids: List[int] = []
+
+        self.entity = np.empty(0, dtype=np.int64)
+        self.source = np.empty(0, dtype=np.int64)
+        self.article = np.empty(0, dtype=np.int64)
+        self.ts = np.empty(0, dtype=np.float64)
+        self.canonical = np.empty(0, dtype=bool)
+
+    @property
+    def n_entities(self) -> int:
+        return len(self.entity_names)
+
+    @property
+    def n_sources(self) -> int:
+        return len(self.source_names)
+
+def load_mentions(db: Session, hours: int) -> MentionTable:
+    """Read the window's processed articles once and flatten their entities into columns"""
+    window_end = datetime.now()
+    table = MentionTable(window_end - timedelta(hours=hours), window_end)
+    entity, source, article, ts, canonical = [], [], [], [], []
+
+    rows = db.query(
+        Article.id, Article.published_date, Article.source_domain, Article.canonical_id, Article.entities
+    ).filter(
+        Article.published_date >= table.window_start,
+        Article.is_processed == True
+    ).yield_per(1000)
+
+    for row in rows:
+        mentions = (row.entities or {}).get('entities', [])
+        if not mentions:
+            continue
+        source_code = table.source_codes.setdefault(row.source_domain, len(table.source_codes))
+        if source_code == len(table.source_names):
+            table.source_names.append(row.source_domain)
+        article_code = len(table.article_ids)
+        table.article_ids.append(row.id)
+        timestamp = row.published_date.timestamp()
+
+        for mention in mentions:
+            key = (mention['text'].lower(), mention['type'])
+            code = table.entity_codes.get(key)
+            if code is None:
+                code = table.entity_codes[key] = len(table.entity_names)
+                table.entity_names.append(mention['text'])
+                table.entity_types.append(mention['type'])
+            entity.append(code)
+            source.append(source_code)
+            article.append(article_code)
+            ts.append(timestamp)
+            canonical.append(row.canonical_id is None)
+
+    table.entity = np.asarray(entity, dtype=np.int64)
+    table.source = np.asarray(source, dtype=np.int64)
+    table.article = np.asarray(article, dtype=np.int64)
+    table.ts = np.asarray(ts, dtype=np.float64)
+    table.canonical = np.asarray(canonical, dtype=bool)
+    return table
+
+def _group_starts(sorted_keys: np.ndarray) -> np.ndarray:
+    """Start offsets of runs of equal values in a sorted array"""
+    if not len(sorted_keys):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+def compute_metrics(table: MentionTable) -> Dict[str, np.ndarray]:
+    """Per-entity cascade metrics, each an array indexed by entity code.
+
+    - mention_count: canonical articles mentioning the entity
+    - source_count: distinct sources, syndicated copies included
+    - first_seen / last_seen: unix time of the first/last canonical mention
+    - velocity: mentions per hour between first and last mention (min span 1h)
+    - acceleration: mentions/hour in the later half of the window minus the earlier half
+    - burstiness: (sd - mean) / (sd + mean) of gaps between mentions, -1 regular .. 1 bursty
+    - source_entropy: Shannon entropy (nats) of the entity's mentions over sources
+    - time_to_second_source: hours from the first source's mention to the second's (NaN if one source)
+    """
+    n, n_sources = table.n_entities, max(table.n_sources, 1)
+    window_hours = max((table.window_end - table.window_start).total_seconds() / 3600, 1.0)
+
+    # Sources (all mentions): distinct (entity, source) pairs, with counts and first mention time
+    pair = table.entity * n_sources + table.source
+    order = np.lexsort((table.ts, pair))
+    pair_sorted = pair[order]
+    starts = _group_starts(pair_sorted)
+    pair_keys = pair_sorted[starts]
+    pair_entity = pair_keys // n_sources
+    pair_counts = np.diff(np.r_[starts, len(pair_sorted)])
+    pair_first_ts = table.ts[order][starts]
+
+    source_count = np.bincount(pair_entity, minlength=n)
+    entity_total = np.bincount(pair_entity, weights=pair_counts, minlength=n)
+    share = pair_counts / entity_total[pair_entity]
+    source_entropy = np.bincount(pair_entity, weights=-share * np.log(share), minlength=n)
+
+    # Time to second source: rank each entity's sources by when they first mentioned it
+    by_first = np.lexsort((pair_first_ts, pair_entity))
+    ranked_entity, ranked_ts = pair_entity[by_first], pair_first_ts[by_first]
+    entity_starts = _group_starts(ranked_entity)
+    time_to_second_source = np.full(n, np.nan)
+    has_second = np.r_[entity_starts[1:], len(ranked_entity)] - entity_starts >= 2
+    firsts = entity_starts[has_second]
+    time_to_second_source[ranked_entity[firsts]] = (ranked_ts[firsts + 1] - ranked_ts[firsts]) / 3600
+
+    # Canonical mentions: counts, first/last seen, gaps
+    entity = table.entity[table.canonical]
+    ts = table.ts[table.canonical]
+    order = np.lexsort((ts, entity))
+    entity, ts = entity[order], ts[order]
+    mention_count = np.bincount(entity, minlength=n)
+
+    starts = _group_starts(entity)
+    first_seen = np.full(n, np.nan)
+    last_seen = np.full(n, np.nan)
+    first_seen[entity[starts]] = ts[starts]
+    last_seen[entity[starts]] = ts[np.r_[starts[1:], len(entity)] - 1]
+    span_hours = np.nan_to_num((last_seen - first_seen) / 3600)
+    velocity = mention_count / np.maximum(span_hours, 1)
+
+    midpoint = table.window_start.timestamp() + window_hours * 1800
+    later = np.bincount(entity, weights=ts >= midpoint, minlength=n)
+    acceleration = (2 * later - mention_count) / (window_hours / 2)
+
+    same = entity[1:] == entity[:-1]
+    gaps, gap_entity = np.diff(ts)[same], entity[1:][same]
+    gap_count = np.bincount(gap_entity, minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_mean = np.bincount(gap_entity, weights=gaps, minlength=n) / gap_count
+        gap_sd = np.sqrt(np.maximum(np.bincount(gap_entity, weights=gaps ** 2, minlength=n) / gap_count - gap_mean ** 2, 0))
+        burstiness = np.where(gap_count >= 2, (gap_sd - gap_mean) / (gap_sd + gap_mean), 0.0)
+    burstiness = np.nan_to_num(burstiness)
+
+    return {
+        'mention_count': mention_count,
+        'source_count': source_count,
+        'first_seen': first_seen,
+        'last_seen': last_seen,
+        'velocity': velocity,
+        'acceleration': acceleration,
+        'burstiness': burstiness,
+        'source_entropy': source_entropy,
+        'time_to_second_source': time_to_second_source,
+    }
+
+def _score_sources(metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    """Source diversity first, then mention count (the original ranking)"""
+    return metrics['source_count'] * (float(metrics['mention_count'].max(initial=0)) + 1) + metrics['mention_count']
+
+def _score_weighted(metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    """Weighted sum of z-scored metrics, weights from CASCADE_SCORE_WEIGHTS"""
+    score = np.zeros(len(metrics['mention_count']))
+    for name, weight in settings.CASCADE_SCORE_WEIGHTS.items():
+        values = np.nan_to_num(np.asarray(metrics[name], dtype=np.float64))
+        sd = values.std()
+        score += weight * ((values - values.mean()) / sd if sd > 0 else 0.0)
+    return score
+
+SCORERS: Dict[str, Callable[[Dict[str, np.ndarray]], np.ndarray]] = {
+    "sources": _score_sources,
+    "weighted": _score_weighted,
+}
+
+def encode_cursor(snapshot_id: str, score: float, name: str, entity_type: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([snapshot_id, score, name, entity_type]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, Tuple[float, str, str]]:
+    """(snapshot id, (score, lowercased name, type) of the previous page's last cascade); ValueError if malformed"""
+    try:
+        snapshot_id, score, name, entity_type = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(snapshot_id), (float(score), str(name), str(entity_type))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+class CascadeSnapshot:
+    """Mentions, metrics and scores of one window, shared by every request for it.
+
+    Cascades are ordered by (score desc, entity name asc, type asc), a total
+    order since (name, type) identifies an entity. Scores are relative to the
+    window (the max mention count, or z-scores), so they aren't comparable
+    across rebuilds: a cursor carries its snapshot's id and later pages are
+    read from that same snapshot, kept for CASCADE_CURSOR_SECONDS. Only
+    entity codes are kept per cascade; articles are resolved to rows for the
+    returned page.
+
+    Each entity also carries a bitset of the sources that mentioned it, so a
+    user's view (cascades among their subscribed sources) is an AND and a
+    popcount per entity against the user's source bitset, not a recomputation.
+    """
+
+    def __init__(self, table: MentionTable, hours: int):
+        self.table = table
+        self.hours = hours
+        self.id = uuid.uuid4().hex
+        self.metrics = compute_metrics(table)
+        self.scores = SCORERS[settings.CASCADE_SCORING](self.metrics).astype(np.float64)
+        self.names = np.array([name.lower() for name in table.entity_names], dtype=str)
+        self.types = np.array([entity_type or "" for entity_type in table.entity_types], dtype=str)
+        self.built_at = datetime.now()
+
+        n, n_sources = table.n_entities, max(table.n_sources, 1)
+        # Canonical mentions grouped by entity, newest first
+        canonical = np.flatnonzero(table.canonical)
+        canonical = canonical[np.lexsort((-table.ts[canonical], table.entity[canonical]))]
+        self.entity_articles = table.article[canonical]
+        self.entity_article_sources = table.source[canonical]
+        self.article_bounds = np.searchsorted(table.entity[canonical], np.arange(n + 1))
+        # Distinct sources per entity
+        pairs = np.unique(table.entity * n_sources + table.source)
+        self.pair_sources = pairs % n_sources
+        self.pair_bounds = np.searchsorted(pairs // n_sources, np.arange(n + 1))
+        # Source bitsets: bit s % 64 of word s // 64 is set if source s mentioned the entity
+        self.source_words = (n_sources + 63) // 64
+        self.source_bits = np.zeros((n, self.source_words), dtype=np.uint64)
+        np.bitwise_or.at(
+            self.source_bits, (pairs // n_sources, self.pair_sources // 64),
+            np.left_shift(np.uint64(1), (self.pair_sources % 64).astype(np.uint64))
+        )
+
+    def eligible(self, min_sources: int = 2, source_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cascades spanning at least min_sources sources (only those in source_mask, if given)"""
+        if source_mask is None:
+            return (self.metrics['source_count'] >= min_sources) & (self.metrics['mention_count'] > 0)
+        return (self.source_counts(source_mask) >= min_sources) & (self.metrics['mention_count'] > 0)
+
+    def source_mask(self, domains: Iterable[str]) -> np.ndarray:
+        """Source bitset of the given domains (domains not seen in the window are ignored)"""
+        mask = np.zeros(self.source_words, dtype=np.uint64)
+        for domain in set(domains):
+            code = self.table.source_codes.get(domain)
+            if code is not None:
+                mask[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        return mask
+
+    def source_counts(self, source_mask: np.ndarray) -> np.ndarray:
+        """Per entity, how many of the sources in source_mask mentioned it"""
+        shared = self.source_bits & source_mask
+        return _POPCOUNT[shared.view(np.uint8)].reshape(len(shared), -1).sum(axis=1)
+
+    def _in_mask(self, sources: np.ndarray, source_mask: np.ndarray) -> np.ndarray:
+        return (source_mask[sources // 64] >> (sources % 64).astype(np.uint64)) & np.uint64(1) == 1
+
+    def top(self, k: int, mask: np.ndarray, after: Optional[Tuple[float, str, str]] = None) -> Tuple[np.ndarray, bool]:
+        """Entity codes of the k best cascades in `mask` (after the cursor), and whether more follow.
+
+        Uses a partial selection (argpartition) so only k candidates are sorted.
+        """
+        candidates = np.flatnonzero(mask)
+        if after is not None and len(candidates):
+            score, name, entity_type = after
+            scores, names, types = self.scores[candidates], self.names[candidates], self.types[candidates]
+            later = (names > name) | ((names == name) & (types > entity_type))
+            candidates = candidates[(scores < score) | ((scores == score) & later)]
+        has_more = len(candidates) > k
+        if has_more:
+            kth = np.partition(self.scores[candidates], len(candidates) - k)[len(candidates) - k]
+            above = candidates[self.scores[candidates] > kth]
+            tied = candidates[self.scores[candidates] == kth]
+            tied = tied[np.lexsort((self.types[tied], self.names[tied]))][:k - len(above)]
+            candidates = np.concatenate([above, tied])
+        order = np.lexsort((self.types[candidates], self.names[candidates], -self.scores[candidates]))
+        return candidates[order], has_more
+
+    def cursor_after(self, code: int) -> str:
+        return encode_cursor(self.id, float(self.scores[code]), str(self.names[code]), str(self.types[code]))
+
+    def sources(self, code: int, source_mask: Optional[np.ndarray] = None) -> List[str]:
+        sources = self.pair_sources[self.pair_bounds[code]:self.pair_bounds[code + 1]]
+        if source_mask is not None:
+            sources = sources[self._in_mask(sources, source_mask)]
+        return [self.table.source_names[s] for s in sources]
+
+    def article_ids(self, code: int, limit: Optional[int] = None, source_mask: Optional[np.ndarray] = None) -> List[int]:
+        """Newest canonical articles mentioning the entity (only from source_mask's sources, if given)"""
+        start, end = self.article_bounds[code], self.article_bounds[code + 1]
+        articles = self.entity_articles[start:end]
+        if source_mask is not None:
+            articles = articles[self._in_mask(self.entity_article_sources[start:end], source_mask)]
+        if limit is not None:
+            articles = articles[:limit]
+        return [self.table.article_ids[a] for a in articles]
+
+    def summary(self, code: int, source_mask: Optional[np.ndarray] = None) -> Dict:
+        """Metrics of one cascade (no article details); with a source_mask, also the subscribed sources"""
+        m = self.metrics
+        ttss = m['time_to_second_source'][code]
+        summary = {
+            'entity': self.table.entity_names[code],
+            'type': self.table.entity_types[code],
+            'mention_count': int(m['mention_count'][code]),
+            'source_count': int(m['source_count'][code]),
+            'sources': self.sources(code),
+            'velocity': round(float(m['velocity'][code]), 2),
+            'acceleration': round(float(m['acceleration'][code]), 3),
+            'burstiness': round(float(m['burstiness'][code]), 3),
+            'source_entropy': round(float(m['source_entropy'][code]), 3),
+            'time_to_second_source_hours': None if np.isnan(ttss) else round(float(ttss), 2),
+            'score': round(float(self.scores[code]), 4),
+            'first_seen': datetime.fromtimestamp(m['first_seen'][code]).isoformat(),
+            'last_seen': datetime.fromtimestamp(m['last_seen'][code]).isoformat()
+        }
+        if source_mask is not None:
+            summary['subscribed_sources'] = self.sources(code, source_mask)
+            summary['subscribed_source_count'] = len(summary['subscribed_sources'])
+        return summary
+
+_snapshots = LRUCache(maxsize=16, ttl=settings.CASCADE_CACHE_SECONDS)
+_pinned = LRUCache(maxsize=16, ttl=settings.CASCADE_CURSOR_SECONDS)  # snapshot id -> snapshot, for cursors
+
+def get_snapshot(db: Session, hours: int, snapshot_id: Optional[str] = None) -> CascadeSnapshot:
+    """Snapshot of the last `hours` hours, rebuilt at most every CASCADE_CACHE_SECONDS.
+
+    With a snapshot_id (from a cursor), that snapshot instead; ValueError if it
+    has expired or covers a different window.
+    """
+    if snapshot_id is not None:
+        snapshot = _pinned.get(snapshot_id)
+        if snapshot is None:
+            raise ValueError("Cursor expired; request the first page again")
+        if snapshot.hours != hours:
+            raise ValueError("Cursor belongs to a different time window")
+        _pinned.put(snapshot_id, snapshot)  # keep it while pages are still being read
+        return snapshot
+
+    snapshot = _snapshots.get(hours)
+    if snapshot is None:
+        snapshot = CascadeSnapshot(load_mentions(db, hours), hours)
+        _snapshots.put(hours, snapshot)
+    _pinned.put(snapshot.id, snapshot)  # cursors from this page resolve to it
+    return snapshot
+
+def hydrate_cascades(db: Session, snapshot: CascadeSnapshot, codes, articles_per_cascade: int = 10,
+                     source_mask: Optional[np.ndarray] = None) -> List[Dict]:
+    """Cascade dicts for the given entity codes, with their articles loaded in one query"""
+    article_ids = {code: snapshot.article_ids(code, articles_per_cascade, source_mask) for code in codes}
+    wanted = {article_id for ids in article_ids.values() for article_id in ids}
+    rows = db.query(
+        Article.id, Article.title, Article.url, Article.published_date, Article.source_domain
+    ).filter(Article.id.in_(wanted)).all() if wanted else []
+    articles = {
+        row.id: {
+            'id': row.id,
+            'title': row.title,
+            'url': row.url,
+            'published_date': row.published_date.isoformat(),
+            'source': row.source_domain
+        }
+        for row in rows
+    }
+
+    cascades = []
+    for code in codes:
+        cascade = snapshot.summary(int(code), source_mask)
+        cascade['articles'] = [articles[i] for i in article_ids[code] if i in articles]
+        cascades.append(cascade)
+    return cascades
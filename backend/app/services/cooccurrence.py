@@ -0,0 +1,268 @@
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article, EntityCooccurrence, EntityDayCount
+
+MAX_ENTITIES_PER_ARTICLE = 25  # caps pairs per article at 300
+ARTICLE_TOTAL_KEY = ""  # EntityDayCount row counting every article with entities
+METRICS = ("pmi", "count")
+
+def article_entity_keys(entities, limit: Optional[int] = MAX_ENTITIES_PER_ARTICLE) -> Dict[str, str]:
+    """Distinct lowercased entity names of an Article.entities value -> entity type
+
+    The cap only exists to bound pair counts; per-entity counters pass limit=None.
+    """
+    keys: Dict[str, str] = {}
+    for entity in (entities or {}).get('entities', []):
+        name = (entity.get('text') or '').strip().lower()[:200]
+        if name and name not in keys:
+            keys[name] = entity.get('type')
+            if limit is not None and len(keys) >= limit:
+                break
+    return keys
+
+def article_day(article) -> date:
+    return (article.published_date or article.fetched_date or datetime.now()).date()
+
+def upsert_counts(db: Session, model, keys: List[str], rows: List[Dict], batch_size: int = 1000):
+    """INSERT ... ON CONFLICT (keys) DO UPDATE SET count = count + excluded.count
+
+    Rows should be sorted by key so concurrent writers lock them in the same order.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    for start in range(0, len(rows), batch_size):
+        stmt = insert(model).values(rows[start:start + batch_size])
+        set_ = {'count': model.count + stmt.excluded.count}
+        if 'entity_type' in rows[0]:
+            set_['entity_type'] = func.coalesce(stmt.excluded.entity_type, model.entity_type)
+        db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_))
+
+class CooccurrenceMatrix:
+    """Symmetric entity x entity count matrix in CSR form, with per-entity totals.
+
+    Row i's neighbours are indices[indptr[i]:indptr[i + 1]] with counts in
+    the same slice of data; the upper triangle is also kept as flat arrays
+    (pair_a, pair_b, pair_count) so whole-graph top-N is a single vectorized pass.
+    """
+
+    def __init__(self, names: List[str], types: List[Optional[str]], totals: np.ndarray,
+                 pair_a: np.ndarray, pair_b: np.ndarray, pair_count: np.ndarray, n_articles: int):
+        self.names = names
+        self.types = types
+        self.index = {name: i for i, name in enumerate(names)}
+        self.totals = totals.astype(np.float64)
+        self.n_articles = max(n_articles, 1)
+        self.pair_a, self.pair_b, self.pair_count = pair_a, pair_b, pair_count.astype(np.float64)
+        self.built_at = time.monotonic()
+
+        rows = np.concatenate([pair_a, pair_b])
+        cols = np.concatenate([pair_b, pair_a])
+        data = np.concatenate([self.pair_count, self.pair_count])
+        order = np.argsort(rows, kind='stable')
+        self.indices = cols[order]
+        self.data = data[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(names)))])
+
+    @property
+    def nnz(self) -> int:
+        return len(self.pair_count)
+
+    def scores(self, a: np.ndarray, b: np.ndarray, counts: np.ndarray, metric: str) -> np.ndarray:
+        if metric == "count":
+            return counts
+        # PMI = log P(a,b) / (P(a) P(b)), probabilities over articles in the window
+        return np.log(counts * self.n_articles / (self.totals[a] * self.totals[b]))
+
+    def node(self, i: int) -> Dict:
+        return {"id": self.names[i], "type": self.types[i], "count": int(self.totals[i])}
+
+    def top_edges(self, limit: int, metric: str = "pmi", min_count: int = 1) -> Dict:
+        """Strongest pairs in the window as a nodes/links graph"""
+        mask = self.pair_count >= min_count
+        a, b, counts = self.pair_a[mask], self.pair_b[mask], self.pair_count[mask]
+        if not len(counts):
+            return {"nodes": [], "links": []}
+
+        scores = self.scores(a, b, counts, metric)
+        top = _top_k(scores, limit)
+        node_ids = np.unique(np.concatenate([a[top], b[top]]))
+        return {
+            "nodes": [self.node(int(i)) for i in node_ids],
+            "links": [
+                {
+                    "source": self.names[a[i]],
+                    "target": self.names[b[i]],
+                    "count": int(counts[i]),
+                    "weight": round(float(scores[i]), 4)
+                }
+                for i in top
+            ]
+        }
+
+    def related(self, name: str, limit: int, metric: str = "pmi", min_count: int = 1) -> Optional[List[Dict]]:
+        """Entities co-occurring with `name`, strongest first; None if it's not in the window"""
+        i = self.index.get(name.strip().lower())
+        if i is None:
+            return None
+        start, end = self.indptr[i], self.indptr[i + 1]
+        neighbours, counts = self.indices[start:end], self.data[start:end]
+        mask = counts >= min_count
+        neighbours, counts = neighbours[mask], counts[mask]
+
+        scores = self.scores(np.full(len(neighbours), i), neighbours, counts, metric)
+        return [
+            {**self.node(int(neighbours[j])), "cooccurrences": int(counts[j]), "weight": round(float(scores[j]), 4)}
+            for j in _top_k(scores, limit)
+        ]
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, without sorting everything"""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+_matrices: Dict[int, CooccurrenceMatrix] = {}
+_matrices_lock = threading.Lock()
+
+class CooccurrenceService:
+    """Entity co-occurrence counts over a sliding window of daily buckets.
+
+    Processing an article adds one to its entities' counts and to every pair
+    among them for the article's day, as batched upserts. Queries sum the
+    buckets in the window once into a CooccurrenceMatrix, which is kept in
+    memory for COOCCURRENCE_CACHE_SECONDS, so graph and related-entity
+    lookups are array operations rather than scans of Article.entities.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, articles: Iterable[Tuple[Optional[Dict], date]], sign: int = 1) -> int:
+        """Add (sign=1) or remove (sign=-1) the counts of (entities, day) pairs; caller commits"""
+        entity_counts: Counter = Counter()
+        pair_counts: Counter = Counter()
+        types: Dict[str, str] = {}
+        recorded = 0
+        for entities, day in articles:
+            keys = article_entity_keys(entities)
+            if not keys:
+                continue
+            recorded += 1
+            types.update(keys)
+            entity_counts[(day, ARTICLE_TOTAL_KEY)] += sign
+            for name in keys:
+                entity_counts[(day, name)] += sign
+            for a, b in combinations(sorted(keys), 2):
+                pair_counts[(day, a, b)] += sign
+
+        if not recorded:
+            return 0
+        upsert_counts(self.db, EntityDayCount, ['day', 'entity'], [
+            {'day': day, 'entity': name, 'entity_type': types.get(name), 'count': count}
+            for (day, name), count in sorted(entity_counts.items())
+        ])
+        upsert_counts(self.db, EntityCooccurrence, ['day', 'entity_a', 'entity_b'], [
+            {'day': day, 'entity_a': a, 'entity_b': b, 'count': count}
+            for (day, a, b), count in sorted(pair_counts.items())
+        ])
+        if sign < 0:
+            days = {key[0] for key in entity_counts}
+            for model in (EntityDayCount, EntityCooccurrence):
+                self.db.query(model).filter(model.day.in_(days), model.count <= 0).delete(synchronize_session=False)
+        return recorded
+
+    def rebuild(self, days: Optional[int] = None, batch_size: int = 1000) -> int:
+        """Recount the window from Article.entities (first deploy, or after re-extraction outside the pipeline)"""
+        days = days or settings.COOCCURRENCE_RETENTION_DAYS
+        start = date.today() - timedelta(days=days - 1)
+        self.db.query(EntityDayCount).filter(EntityDayCount.day >= start).delete(synchronize_session=False)
+        self.db.query(EntityCooccurrence).filter(EntityCooccurrence.day >= start).delete(synchronize_session=False)
+
+        seen_at = func.coalesce(Article.published_date, Article.fetched_date)
+        last_id = 0
+        recorded = 0
+        while True:
+            batch = self.db.query(Article.id, Article.entities, Article.published_date, Article.fetched_date).filter(
+                Article.id > last_id,
+                Article.is_processed == True,
+                Article.canonical_id.is_(None),
+                seen_at >= datetime.combine(start, datetime.min.time())
+            ).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            recorded += self.record((a.entities, article_day(a)) for a in batch)
+            last_id = batch[-1].id
+        self.db.commit()
+        invalidate_matrices()
+        print(f"🕸️ Rebuilt entity co-occurrence counts: {recorded} articles over {days} days")
+        return recorded
+
+    def matrix(self, days: Optional[int] = None) -> CooccurrenceMatrix:
+        """Window matrix, reused for COOCCURRENCE_CACHE_SECONDS"""
+        days = min(days or settings.COOCCURRENCE_WINDOW_DAYS, settings.COOCCURRENCE_RETENTION_DAYS)
+        with _matrices_lock:
+            cached = _matrices.get(days)
+            if cached is not None and time.monotonic() - cached.built_at < settings.COOCCURRENCE_CACHE_SECONDS:
+                return cached
+            matrix = self._load(days)
+            _matrices[days] = matrix
+            return matrix
+
+    def _load(self, days: int) -> CooccurrenceMatrix:
+        start = date.today() - timedelta(days=days - 1)
+        entity_rows = self.db.query(
+            EntityDayCount.entity, func.max(EntityDayCount.entity_type), func.sum(EntityDayCount.count)
+        ).filter(EntityDayCount.day >= start).group_by(EntityDayCount.entity).all()
+
+        n_articles = 0
+        names, types, totals = [], [], []
+        for name, entity_type, total in entity_rows:
+            if name == ARTICLE_TOTAL_KEY:
+                n_articles = int(total)
+            elif total > 0:
+                names.append(name)
+                types.append(entity_type)
+                totals.append(total)
+        index = {name: i for i, name in enumerate(names)}
+
+        pair_rows = self.db.query(
+            EntityCooccurrence.entity_a, EntityCooccurrence.entity_b, func.sum(EntityCooccurrence.count)
+        ).filter(EntityCooccurrence.day >= start).group_by(
+            EntityCooccurrence.entity_a, EntityCooccurrence.entity_b
+        ).having(func.sum(EntityCooccurrence.count) >= settings.COOCCURRENCE_MIN_COUNT).all()
+
+        pairs = [(index[a], index[b], count) for a, b, count in pair_rows if a in index and b in index]
+        pair_array = np.array(pairs, dtype=np.int64).reshape(-1, 3)
+        return CooccurrenceMatrix(
+            names, types, np.array(totals, dtype=np.int64),
+            pair_array[:, 0], pair_array[:, 1], pair_array[:, 2], n_articles
+        )
+
+    def graph(self, days: Optional[int] = None, limit: int = 100, metric: str = "pmi",
+              min_count: Optional[int] = None) -> Dict:
+        matrix = self.matrix(days)
+        graph = matrix.top_edges(limit, metric, min_count or settings.COOCCURRENCE_MIN_COUNT)
+        return {**graph, "entities": len(matrix.names), "pairs": matrix.nnz, "articles": matrix.n_articles}
+
+    def related(self, name: str, days: Optional[int] = None, limit: int = 20, metric: str = "pmi",
+                min_count: Optional[int] = None) -> Optional[List[Dict]]:
+        return self.matrix(days).related(name, limit, metric, min_count or settings.COOCCURRENCE_MIN_COUNT)
+
+def invalidate_matrices():
+    with _matrices_lock:
+        _matrices.clear()
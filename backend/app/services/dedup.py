@@ -0,0 +1,120 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
+from datetime import datetime, timedelta
+from typing import List, Optional
+import hashlib
+import re
+import numpy as np
+from app.models.article import Article, ArticleFingerprint, ArticleLSHBand
+from app.core.config import settings
+
+NUM_PERM = 120
+LSH_BANDS = 20  # 20 bands x 6 rows: ~0.6 Jaccard is the 50% candidate point
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures must stay comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return _WORD_RE.findall(text.lower())
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "big")
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (uint32[NUM_PERM]) over word 3-shingles, or None if too short"""
+    words = tokenize(text)
+    if len(words) < settings.DEDUP_MIN_TOKENS:
+        return None
+
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    # Universal hashing (a*x + b) mod p for all permutations at once
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Hash each band of the signature into a signed 64-bit bucket key"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        chunk = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        buckets.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True))
+    return buckets
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+class DuplicateDetector:
+    """Near-duplicate lookup via MinHash and a banded LSH index in the DB.
+
+    Candidates are recent articles sharing at least one band bucket with the
+    new signature; they are confirmed by estimated Jaccard similarity.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def find_canonical(self, signature: np.ndarray, buckets: List[int]) -> Optional[int]:
+        """ID of the canonical article this signature is a near-duplicate of"""
+        cutoff = datetime.now() - timedelta(days=settings.DEDUP_WINDOW_DAYS)
+
+        candidate_ids = {
+            article_id for (article_id,) in self.db.query(ArticleLSHBand.article_id).filter(
+                or_(*[
+                    and_(ArticleLSHBand.band == band, ArticleLSHBand.bucket == bucket)
+                    for band, bucket in enumerate(buckets)
+                ])
+            ).distinct()
+        }
+        if not candidate_ids:
+            return None
+
+        candidates = self.db.query(ArticleFingerprint).filter(
+            ArticleFingerprint.article_id.in_(candidate_ids),
+            ArticleFingerprint.created_at >= cutoff
+        ).order_by(ArticleFingerprint.article_id).all()
+
+        for candidate in candidates:
+            other = np.frombuffer(candidate.signature, dtype=np.uint32)
+            if estimate_jaccard(signature, other) >= settings.DEDUP_THRESHOLD:
+                # Always link to the root, not to another duplicate
+                return candidate.canonical_id or candidate.article_id
+        return None
+
+    def register(self, article: Article, text: str) -> Optional[int]:
+        """Fingerprint a flushed article and link it to its canonical copy.
+
+        Returns the canonical article ID if the article is a duplicate.
+        """
+        signature = minhash(text)
+        if signature is None:
+            return None
+
+        buckets = band_buckets(signature)
+        canonical_id = self.find_canonical(signature, buckets)
+
+        self.db.add(ArticleFingerprint(
+            article_id=article.id,
+            signature=signature.tobytes(),
+            canonical_id=canonical_id,
+            created_at=datetime.now()
+        ))
+        self.db.add_all([
+            ArticleLSHBand(band=band, bucket=bucket, article_id=article.id)
+            for band, bucket in enumerate(buckets)
+        ])
+
+        if canonical_id is not None and canonical_id != article.id:
+            article.canonical_id = canonical_id
+            return canonical_id
+        return None
@@ -1,16 +1,109 @@
-from sentence_transformers import SentenceTransformer
+import sentence_transformers
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, MatchAny, Range, PointIdsList, PayloadSchemaType
 from qdrant_client.http.exceptions import UnexpectedResponse
-from typing import List, Optional
+from typing import List, Optional, Dict
+from datetime import datetime
+import numpy as np
+import threading
+import time
 import uuid
 from app.core.config import settings
+from app.services.nlp_cache import get_nlp_cache, normalize_text
+from app.services.query_cache import LRUCache
+from app.services.encoders import load_encoder
+from app.services.vector_store import get_vector_store
+
+# Payload fields filtered on at query time; indexed so filtering happens inside the HNSW search
+PAYLOAD_INDEXES = {
+    "article_id": PayloadSchemaType.INTEGER,
+    "source_domain": PayloadSchemaType.KEYWORD,
+    "published_ts": PayloadSchemaType.INTEGER,
+    "entities": PayloadSchemaType.KEYWORD
+}
+MAX_PAYLOAD_ENTITIES = 50
+
+def embedding_text(title: str, content: Optional[str]) -> str:
+    """Text that gets embedded for an article"""
+    return f"{title}\n\n{(content or '')[:5000]}"  # Limit content length
+
+def point_id_for(article_id: int) -> str:
+    """Deterministic Qdrant point ID, so re-embedding an article overwrites its point"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"article:{article_id}"))
+
+def entity_keys(entities: Optional[Dict]) -> List[str]:
+    """Lowercased entity names from an article's entities JSON"""
+    names = {e['text'].strip().lower() for e in (entities or {}).get('entities', []) if e.get('text')}
+    return sorted(names)[:MAX_PAYLOAD_ENTITIES]
+
+def vector_payload(source_domain: Optional[str], published_date: Optional[datetime],
+                   entities: Optional[Dict] = None) -> Dict:
+    """Filterable payload stored with each article's vector"""
+    return {
+        "source_domain": source_domain,
+        "published_date": published_date.isoformat() if published_date else None,
+        "published_ts": int(published_date.timestamp()) if published_date else None,
+        "entities": entity_keys(entities)
+    }
+
+def search_filter(sources: Optional[List[str]] = None, date_from: Optional[datetime] = None,
+                  date_to: Optional[datetime] = None, entities: Optional[List[str]] = None,
+                  exclude_article_id: Optional[int] = None) -> Optional[Filter]:
+    """Qdrant payload filter for source / publish date / entity restrictions.
+
+    Sources match any of the given domains; every listed entity must be present.
+    """
+    conditions = []
+    if sources:
+        conditions.append(FieldCondition(key="source_domain", match=MatchAny(any=list(sources))))
+    if date_from or date_to:
+        conditions.append(FieldCondition(key="published_ts", range=Range(
+            gte=int(date_from.timestamp()) if date_from else None,
+            lte=int(date_to.timestamp()) if date_to else None
+        )))
+    for entity in entities or []:
+        conditions.append(FieldCondition(key="entities", match=MatchValue(value=entity.strip().lower())))
+    
+    must_not = []
+    if exclude_article_id is not None:
+        must_not.append(FieldCondition(key="article_id", match=MatchValue(value=exclude_article_id)))
+    
+    if not conditions and not must_not:
+        return None
+    return Filter(must=conditions or None, must_not=must_not or None)
 
 class EmbeddingService:
-    def __init__(self):
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
-        self.qdrant = QdrantClient(url=settings.QDRANT_URL, timeout=10)  # 10 second timeout
-        self._ensure_collection()
+    def __init__(self, connect: bool = True):
+        """connect=False skips Qdrant, for processes that only encode text"""
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.model_key = f"{settings.EMBEDDING_MODEL}/st-{sentence_transformers.__version__}"
+        if settings.EMBEDDING_BACKEND != "torch":
+            self.model_key += f"/{settings.EMBEDDING_BACKEND}"
+        self.cache = get_nlp_cache()
+        if self.cache:
+            self.cache.purge_stale("embedding", self.model_key)
+        self.vector_store = get_vector_store(self.model_key)
+        # Search queries repeat a lot (popular searches, search-as-you-type)
+        self.query_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+        self.result_cache = LRUCache(
+            settings.SEARCH_RESULT_CACHE_SIZE, ttl=settings.SEARCH_RESULT_CACHE_TTL
+        ) if settings.SEARCH_RESULT_CACHE_TTL > 0 else None
+        self.query_model_ms = 0.0
+        self.qdrant = None
+        if connect:
+            self.qdrant = QdrantClient(url=settings.QDRANT_URL, timeout=10)  # 10 second timeout
+            self._ensure_collection()
+    
+    @property
+    def model(self):
+        """Encoder for EMBEDDING_BACKEND, loaded on first cache miss so fully
+        cached workloads never load it"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_encoder()
+        return self._model
     
     def _ensure_collection(self):
         """Create Qdrant collection if it doesn't exist"""
@@ -32,19 +125,96 @@ class EmbeddingService:
                     print(f"Collection {settings.QDRANT_COLLECTION_NAME} already exists")
                 else:
                     raise
+        self._ensure_payload_indexes()
+    
+    def _ensure_payload_indexes(self):
+        """Index the filterable payload fields (a no-op for ones that already exist)"""
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            try:
+                self.qdrant.create_payload_index(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    field_name=field_name,
+                    field_schema=schema
+                )
+            except Exception as e:
+                print(f"Error creating payload index {field_name}: {e}")
+    
+    def reset_collection(self):
+        """Drop and recreate the Qdrant collection with the current settings"""
+        self.qdrant.delete_collection(settings.QDRANT_COLLECTION_NAME)
+        self._ensure_collection()
     
     def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text"""
+        """Generate embedding for text (memoized by content hash)"""
+        if self.cache:
+            cached = self.cache.get_vector("embedding", self.model_key, text)
+            if cached is not None:
+                return cached.tolist()
+        
         embedding = self.model.encode(text)
+        
+        if self.cache:
+            self.cache.put_vector("embedding", self.model_key, text, embedding)
         return embedding.tolist()
     
-    def store_embedding(self, article_id: int, title: str, content: str, metadata: dict) -> str:
-        """Generate and store embedding in Qdrant"""
+    def generate_embeddings(self, texts: List[str], batch_size: int = 64) -> List[List[float]]:
+        """Batch version of generate_embedding: cache misses are encoded together"""
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            cached = self.cache.get_vector("embedding", self.model_key, text) if self.cache else None
+            if cached is not None:
+                vectors[i] = cached
+            else:
+                misses.append(i)
+        
+        if misses:
+            encoded = self.model.encode([texts[i] for i in misses], batch_size=batch_size)
+            for i, vector in zip(misses, encoded):
+                vectors[i] = vector
+                if self.cache:
+                    self.cache.put_vector("embedding", self.model_key, texts[i], vector)
+        
+        return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
+    
+    def store_vectors(self, items: List[Dict], persist: bool = True) -> List[str]:
+        """Bulk upsert precomputed vectors.
+
+        items: dicts with article_id, title, vector and optional payload.
+        persist=False skips the local vector store (used when rebuilding from it).
+        """
+        if persist and self.vector_store and items:
+            self.vector_store.append([item['article_id'] for item in items], [item['vector'] for item in items])
+        
+        points = [
+            PointStruct(
+                id=point_id_for(item['article_id']),
+                vector=item['vector'],
+                payload={
+                    "article_id": item['article_id'],
+                    "title": item['title'],
+                    **item.get('payload', {})
+                }
+            )
+            for item in items
+        ]
+        if points:
+            self.qdrant.upsert(collection_name=settings.QDRANT_COLLECTION_NAME, points=points)
+        return [point.id for point in points]
+    
+    def store_embedding(self, article_id: int, title: str, content: str, metadata: Optional[dict] = None,
+                        source_domain: Optional[str] = None, published_date: Optional[datetime] = None,
+                        entities: Optional[Dict] = None) -> str:
+        """Generate and store embedding in Qdrant, with indexed filter payload"""
         # Combine title and content for embedding
-        text = f"{title}\n\n{content[:5000]}"  # Limit content length
+        text = embedding_text(title, content)
         
         embedding = self.generate_embedding(text)
-        point_id = str(uuid.uuid4())
+        point_id = point_id_for(article_id)
+        
+        # Kept locally first, so the vector survives a failed or lost Qdrant write
+        if self.vector_store:
+            self.vector_store.append([article_id], [embedding])
         
         # Store in Qdrant
         self.qdrant.upsert(
@@ -56,7 +226,8 @@ class EmbeddingService:
                     payload={
                         "article_id": article_id,
                         "title": title,
-                        **metadata
+                        **vector_payload(source_domain, published_date, entities),
+                        **(metadata or {})
                     }
                 )
             ]
@@ -64,60 +235,103 @@ class EmbeddingService:
         
         return point_id
     
-    def search_similar(self, text: str, limit: int = 10, score_threshold: float = 0.7):
-        """Search for similar articles"""
-        embedding = self.generate_embedding(text)
+    def delete_embeddings(self, point_ids: List[str]):
+        """Delete points from Qdrant by ID"""
+        if not point_ids:
+            return
+        self.qdrant.delete(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            points_selector=PointIdsList(points=point_ids)
+        )
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embedding for a search query, from the in-memory LRU when possible.
+
+        Queries bypass the persistent NLP cache: every distinct search string
+        (type-ahead prefixes included) would otherwise be kept on disk forever.
+        """
+        key = normalize_text(text)
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            start = time.perf_counter()
+            embedding = np.asarray(self.model.encode(key), dtype=np.float32).tolist()
+            self.query_model_ms += (time.perf_counter() - start) * 1000
+            self.query_cache.put(key, embedding)
+        return embedding
+    
+    def search_similar(self, text: str, limit: int = 10, score_threshold: float = 0.7,
+                       sources: Optional[List[str]] = None, date_from: Optional[datetime] = None,
+                       date_to: Optional[datetime] = None, entities: Optional[List[str]] = None):
+        """Search for similar articles, optionally restricted by source, publish date and entities"""
+        result_key = (
+            normalize_text(text), limit, score_threshold,
+            tuple(sorted(sources)) if sources else None, date_from, date_to,
+            tuple(sorted(entities)) if entities else None
+        )
+        if self.result_cache:
+            cached = self.result_cache.get(result_key)
+            if cached is not None:
+                return cached
+        
+        embedding = self.embed_query(text)
         
         try:
-            results = self.qdrant.query_points(
+            results = self.qdrant.search(
                 collection_name=settings.QDRANT_COLLECTION_NAME,
-                query=embedding,
+                query_vector=embedding,
+                query_filter=search_filter(sources, date_from, date_to, entities),
                 limit=limit,
                 score_threshold=score_threshold
             )
-            return results.points
         except Exception as e:
             print(f"Error in search_similar: {e}")
             return []
+        
+        if self.result_cache:
+            self.result_cache.put(result_key, results)
+        return results
+    
+    def query_cache_stats(self) -> Dict:
+        return {
+            "query_embeddings": {
+                **self.query_cache.stats(),
+                "model_ms_total": round(self.query_model_ms, 1)
+            },
+            "search_results": self.result_cache.stats() if self.result_cache else None
+        }
+    
+    def _article_vector(self, article_id: int) -> Optional[List[float]]:
+        """Stored vector of an article: local store first, then Qdrant"""
+        if self.vector_store:
+            vector = self.vector_store.get(article_id)
+            if vector is not None:
+                return vector.tolist()
+        
+        points, _ = self.qdrant.scroll(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            scroll_filter=Filter(must=[FieldCondition(key="article_id", match=MatchValue(value=article_id))]),
+            limit=1,
+            with_vectors=True
+        )
+        return points[0].vector if points else None
     
-    def search_similar_to_article(self, article_id: int, limit: int = 10):
-        """Find articles similar to a given article"""
+    def search_similar_to_article(self, article_id: int, limit: int = 10, score_threshold: float = 0.7,
+                                  sources: Optional[List[str]] = None, date_from: Optional[datetime] = None,
+                                  date_to: Optional[datetime] = None, entities: Optional[List[str]] = None):
+        """Find articles similar to a given article, with the same filters as search_similar"""
         try:
-            # Get the article's point from Qdrant
-            results = self.qdrant.scroll(
-                collection_name=settings.QDRANT_COLLECTION_NAME,
-                scroll_filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="article_id",
-                            match=MatchValue(value=article_id)
-                        )
-                    ]
-                ),
-                limit=1
-            )
-            
-            points, _ = results
-            
-            if not points:
+            vector = self._article_vector(article_id)
+            if vector is None:
                 return []
             
-            point = points[0]
-            
-            # Search for similar articles using the vector
-            similar_results = self.qdrant.query_points(
+            # The article itself is excluded by the filter rather than over-fetching
+            return self.qdrant.search(
                 collection_name=settings.QDRANT_COLLECTION_NAME,
-                query=point.vector,
-                limit=limit + 1  # +1 to potentially exclude self
+                query_vector=vector,
+                query_filter=search_filter(sources, date_from, date_to, entities, exclude_article_id=article_id),
+                limit=limit,
+                score_threshold=score_threshold
             )
-            
-            # Filter out the original article and apply score threshold manually
-            similar_points = [
-                p for p in similar_results.points 
-                if p.payload.get('article_id') != article_id and p.score >= 0.7
-            ]
-            
-            return similar_points[:limit]
         except Exception as e:
             print(f"Error in search_similar_to_article: {e}")
-            return []
\ No newline at end of file
+            return []
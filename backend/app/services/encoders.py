@@ -0,0 +1,287 @@
+"""
+Sentence embedding inference backends.
+
+- "torch": SentenceTransformer on PyTorch (reference implementation)
+- "onnx": the same transformer exported to ONNX and run with onnxruntime
+- "onnx-int8": the ONNX export with dynamically quantized int8 weights
+
+ONNX models are exported on first use and only activated after a parity
+check against the PyTorch model; any failure falls back to PyTorch. The
+failure is recorded next to the export, so later processes fall back
+straight away instead of exporting and checking again; retry with
+
+    python -m app.services.encoders --backend onnx-int8 --force   # export + parity check
+"""
+import json
+import os
+from typing import Dict, List, Optional, Union
+import numpy as np
+from app.core.config import settings
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+FAILURES_FILE = "failures.json"  # backend -> why it couldn't be used
+
+PARITY_SAMPLES = [
+    "OpenAI releases a new model for developers",
+    "The European Commission opened an antitrust investigation into Apple's App Store rules.",
+    "Scientists at MIT built a battery that charges in under five minutes.",
+    "Stocks fell sharply on Tuesday after the Federal Reserve signalled further rate increases, "
+    "with technology shares leading the decline across major indexes.",
+    "",
+]
+
+_logged_fallbacks = set()
+
+def onnx_dir(model_name: str) -> str:
+    return os.path.join(settings.EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+def _failures(model_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(model_dir, FAILURES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_failures(model_dir: str, failures: Dict[str, str]):
+    path = os.path.join(model_dir, FAILURES_FILE)
+    if not failures:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(model_dir, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(failures, f, indent=2)
+
+class TorchEncoder:
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size)
+
+class OnnxEncoder:
+    """Tokenizer + onnxruntime transformer + numpy pooling/normalization"""
+
+    def __init__(self, model_dir: str, quantized: bool):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, "encoder.json")) as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.EMBEDDING_ONNX_THREADS:
+            options.intra_op_num_threads = settings.EMBEDDING_ONNX_THREADS
+
+        filename = "model-int8.onnx" if quantized else "model.onnx"
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, filename), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.backend = "onnx-int8" if quantized else "onnx"
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.config["max_seq_length"],
+            return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+
+        pooling = self.config["pooling"]
+        if pooling == "cls":
+            pooled = hidden[:, 0]
+        elif pooling == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items:
+            return np.zeros((0, self.config["dimension"]), dtype=np.float32)
+
+        # Sort by length so batches need little padding, then restore order
+        order = sorted(range(len(items)), key=lambda i: len(items[i]))
+        chunks = []
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            chunks.append((idx, self._encode_batch([items[i] for i in idx])))
+        out = np.empty((len(items), chunks[0][1].shape[1]), dtype=np.float32)
+        for idx, vectors in chunks:
+            out[idx] = vectors
+        return out[0] if single else out
+
+def export_onnx(model_name: str, model_dir: str):
+    """Export the SentenceTransformer's transformer to ONNX (fp32 and int8)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Transformer, Pooling, Normalize
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling, normalize = None, None, False
+    for module in st:
+        if isinstance(module, Transformer):
+            transformer = module
+        elif isinstance(module, Pooling):
+            pooling = module
+        elif isinstance(module, Normalize):
+            normalize = True
+        else:
+            raise ValueError(f"Unsupported module for ONNX export: {type(module).__name__}")
+    if transformer is None or pooling is None:
+        raise ValueError("Model has no Transformer + Pooling modules")
+
+    if pooling.pooling_mode_cls_token:
+        pooling_mode = "cls"
+    elif pooling.pooling_mode_max_tokens:
+        pooling_mode = "max"
+    elif pooling.pooling_mode_mean_tokens:
+        pooling_mode = "mean"
+    else:
+        raise ValueError("Unsupported pooling mode")
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(input_names, args)))[0]
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            os.path.join(model_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "last_hidden_state": {0: "batch", 1: "sequence"}
+            },
+            opset_version=14
+        )
+
+    quantize_dynamic(
+        os.path.join(model_dir, "model.onnx"),
+        os.path.join(model_dir, "model-int8.onnx"),
+        weight_type=QuantType.QInt8
+    )
+    tokenizer.save_pretrained(model_dir)
+
+    with open(os.path.join(model_dir, "encoder.json"), "w") as f:
+        json.dump({
+            "model": model_name,
+            "pooling": pooling_mode,
+            "normalize": normalize,
+            "max_seq_length": st.max_seq_length,
+            "dimension": st.get_sentence_embedding_dimension(),
+            "parity": {}
+        }, f, indent=2)
+    print(f"📦 Exported {model_name} to ONNX in {model_dir}")
+
+def check_parity(reference: TorchEncoder, candidate, texts: List[str] = PARITY_SAMPLES) -> float:
+    """Minimum cosine similarity between reference and candidate vectors"""
+    ref = np.asarray(reference.encode(texts), dtype=np.float32)
+    got = np.asarray(candidate.encode(texts), dtype=np.float32)
+    ref = ref / np.clip(np.linalg.norm(ref, axis=1, keepdims=True), 1e-12, None)
+    got = got / np.clip(np.linalg.norm(got, axis=1, keepdims=True), 1e-12, None)
+    return float((ref * got).sum(axis=1).min())
+
+def _load_onnx(model_name: str, backend: str) -> OnnxEncoder:
+    """Load (exporting and parity-checking on first use) an ONNX encoder"""
+    model_dir = onnx_dir(model_name)
+    config_path = os.path.join(model_dir, "encoder.json")
+    if not os.path.exists(config_path):
+        export_onnx(model_name, model_dir)
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    encoder = None
+    if backend not in config.get("parity", {}):
+        encoder = OnnxEncoder(model_dir, quantized=backend == "onnx-int8")
+        similarity = check_parity(TorchEncoder(model_name), encoder)
+        config.setdefault("parity", {})[backend] = similarity
+        with open(config_path, "w") as f:
+            json.dump(config, f, indent=2)
+        print(f"🔬 {backend} parity vs PyTorch: min cosine {similarity:.5f}")
+
+    if config["parity"][backend] < 1 - settings.EMBEDDING_PARITY_TOLERANCE:
+        raise ValueError(
+            f"{backend} parity {config['parity'][backend]:.5f} is outside tolerance "
+            f"{settings.EMBEDDING_PARITY_TOLERANCE}"
+        )
+    encoder = encoder or OnnxEncoder(model_dir, quantized=backend == "onnx-int8")
+
+    failures = _failures(model_dir)
+    if failures.pop(backend, None) is not None:
+        _save_failures(model_dir, failures)
+    return encoder
+
+def load_encoder(model_name: Optional[str] = None, backend: Optional[str] = None):
+    """Load the configured backend, falling back to PyTorch if it can't be used"""
+    model_name = model_name or settings.EMBEDDING_MODEL
+    backend = backend or settings.EMBEDDING_BACKEND
+
+    if backend in ("onnx", "onnx-int8"):
+        model_dir = onnx_dir(model_name)
+        reason = _failures(model_dir).get(backend)
+        if reason is None:
+            try:
+                return _load_onnx(model_name, backend)
+            except Exception as e:
+                # Remembered so later processes don't repeat the export and parity check
+                reason = str(e)
+                _save_failures(model_dir, {**_failures(model_dir), backend: reason})
+        if (model_name, backend) not in _logged_fallbacks:
+            _logged_fallbacks.add((model_name, backend))
+            print(f"⚠️ {backend} embedding backend unavailable ({reason}), falling back to PyTorch; "
+                  f"retry with: python -m app.services.encoders --backend {backend} --force")
+    elif backend != "torch":
+        print(f"⚠️ Unknown embedding backend {backend}, using PyTorch")
+
+    return TorchEncoder(model_name)
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import time
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX and check parity")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx-int8")
+    parser.add_argument("--force", action="store_true", help="re-export even if an export exists")
+    args = parser.parse_args()
+
+    if args.force and os.path.exists(onnx_dir(settings.EMBEDDING_MODEL)):
+        shutil.rmtree(onnx_dir(settings.EMBEDDING_MODEL))
+
+    encoder = _load_onnx(settings.EMBEDDING_MODEL, args.backend)
+    reference = TorchEncoder(settings.EMBEDDING_MODEL)
+    texts = PARITY_SAMPLES * 64
+    for name, candidate in (("torch", reference), (args.backend, encoder)):
+        candidate.encode(texts[:8])
+        start = time.perf_counter()
+        candidate.encode(texts)
+        print(f"{name}: {len(texts) / (time.perf_counter() - start):.1f} embeddings/s")
@@ -1,22 +1,78 @@
-import feedparser
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
+import re
+import time
 import httpx
+import lxml.html
 from newspaper import Article as NewsArticle
+from newspaper.article import ArticleDownloadState
 from app.models.article import Feed, Article
+from app.services.feed_health import FeedHealthTracker
+from app.services.dedup import DuplicateDetector
+from app.services.feed_parser import iter_entries, FeedParseError
+from app.services.url_filter import get_url_filter
+from app.services.html_cache import get_html_cache
+from app.services.source_stats import SourceStatsService
+from app.core.config import settings
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+def extract_from_html(url: str, html: str) -> Optional[str]:
+    """Run newspaper3k extraction over already-downloaded HTML"""
+    try:
+        article = NewsArticle(url)
+        article.download(input_html=html)
+        article.parse()
+        return article.text
+    except Exception as e:
+        print(f"Error extracting content from cached HTML for {url}: {str(e)}")
+        return None
+
+_TRUNCATION_RE = re.compile(r"(read more|continue reading|\[\.\.\.\]|\[…\]|…|\.\.\.)\s*\S{0,40}\s*$")
 
 class FeedFetcher:
     def __init__(self, db: Session):
         self.db = db
+        self.health = FeedHealthTracker(db)
+        self.dedup = DuplicateDetector(db)
     
-    async def fetch_feed(self, feed_url: str) -> List[Dict]:
-        """Fetch and parse RSS feed"""
+    async def fetch_feed(self, feed_url: str, seen: Optional[Set[str]] = None) -> List[Dict]:
+        """Fetch and parse RSS feed
+
+        If `seen` holds GUIDs/URLs from earlier polls, parsing stops after
+        FEED_KNOWN_RUN_STOP consecutive known entries, since feeds list
+        newest first.
+        """
+        if not self.health.allow_feed(feed_url):
+            print(f"⏭️ Skipping feed {feed_url}: circuit open")
+            return []
+        
+        start = time.monotonic()
         try:
-            parsed = feedparser.parse(feed_url)
+            async with httpx.AsyncClient(timeout=settings.FEED_FETCH_TIMEOUT, follow_redirects=True) as client:
+                response = await client.get(feed_url)
+            latency_ms = (time.monotonic() - start) * 1000
+            
+            if response.status_code >= 400:
+                self.health.record_feed_failure(feed_url, f"http_{response.status_code}", latency_ms=latency_ms)
+                print(f"Error fetching feed {feed_url}: HTTP {response.status_code}")
+                return []
+            
+            headers = dict(response.headers)
+            headers['content-location'] = str(response.url)
+            
             articles = []
+            known_run = 0
             
-            for entry in parsed.entries:
+            for entry in iter_entries(response.content, headers):
+                guid = entry.get('id') or entry.get('link', '')
+                if seen is not None and guid in seen:
+                    known_run += 1
+                    if known_run >= settings.FEED_KNOWN_RUN_STOP:
+                        break
+                    continue
+                known_run = 0
+                
                 article_data = {
                     'title': entry.get('title', ''),
                     'url': entry.get('link', ''),
@@ -25,24 +81,124 @@ class FeedFetcher:
                     'published_date': self._parse_date(entry.get('published')),
                     'source_domain': self._extract_domain(entry.get('link', ''))
                 }
+                
+                # Full text embedded in the feed (content:encoded / Atom <content>)
+                feed_content = self._extract_feed_content(entry)
+                article_data['guid'] = guid
+                article_data['feed_content'] = feed_content
+                article_data['content_score'] = self._score_completeness(feed_content, article_data['summary'])
+                
                 articles.append(article_data)
             
+            self.health.record_feed_success(feed_url, latency_ms)
             return articles
+        except FeedParseError as e:
+            self.health.record_feed_failure(
+                feed_url, "parse_error", str(e),
+                latency_ms=(time.monotonic() - start) * 1000, host_failure=False
+            )
+            print(f"Error parsing feed {feed_url}: {str(e)}")
+            return []
+        except httpx.TimeoutException as e:
+            self.health.record_feed_failure(feed_url, "timeout", str(e), latency_ms=(time.monotonic() - start) * 1000)
+            print(f"Timeout fetching feed {feed_url}")
+            return []
         except Exception as e:
+            self.health.record_feed_failure(feed_url, "error", str(e))
             print(f"Error fetching feed {feed_url}: {str(e)}")
             return []
     
+    async def fetch_feed_incremental(self, feed: Feed) -> List[Dict]:
+        """Fetch only entries not seen on earlier polls and remember them.
+
+        The seen set is updated on the session, so it is committed together
+        with the saved articles.
+        """
+        articles = await self.fetch_feed(feed.url, set(feed.seen_guids or []))
+        
+        new_guids = [a['guid'] for a in articles if a.get('guid')]
+        if new_guids:
+            new_set = set(new_guids)
+            previous = [g for g in (feed.seen_guids or []) if g not in new_set]
+            feed.seen_guids = (new_guids + previous)[:settings.FEED_SEEN_MAX]
+        
+        return articles
+    
     async def extract_full_content(self, url: str) -> Optional[str]:
-        """Extract full article content from URL"""
+        """Extract full article content from URL (or the local HTML cache)"""
+        html_cache = get_html_cache()
+        cached_html = html_cache.get(url) if html_cache else None
+        if cached_html is not None:
+            return extract_from_html(url, cached_html)
+        
+        if not self.health.allow_host(url):
+            return None
+        
+        start = time.monotonic()
         try:
-            article = NewsArticle(url)
+            article = NewsArticle(url, request_timeout=settings.ARTICLE_FETCH_TIMEOUT)
             article.download()
+            latency_ms = (time.monotonic() - start) * 1000
+            
+            # Download failures count against the host; parse failures don't
+            if article.download_state == ArticleDownloadState.FAILED_RESPONSE:
+                self.health.record_host_failure(url, "download_error", article.download_exception_msg or "", latency_ms)
+                print(f"Error downloading {url}: {article.download_exception_msg}")
+                return None
+            
+            self.health.record_host_success(url, latency_ms)
+            if html_cache:
+                html_cache.put(url, article.html)
             article.parse()
             return article.text
         except Exception as e:
             print(f"Error extracting content from {url}: {str(e)}")
             return None
     
+    def _extract_feed_content(self, entry) -> Optional[str]:
+        """Longest text/html content block in a feed entry, as plain text"""
+        best = None
+        for block in entry.get('content', []):
+            value = block.get('value', '')
+            if not value:
+                continue
+            text = self._html_to_text(value) if 'html' in block.get('type', 'text/html') else value.strip()
+            if text and (best is None or len(text) > len(best)):
+                best = text
+        return best
+    
+    def _html_to_text(self, html: str) -> str:
+        """Strip markup, keeping paragraph breaks"""
+        try:
+            doc = lxml.html.fromstring(html)
+        except Exception:
+            return ""
+        for bad in doc.xpath('//script|//style|//figure|//iframe'):
+            bad.drop_tree()
+        for block in doc.xpath('//p|//br|//li|//h1|//h2|//h3|//h4|//blockquote|//div'):
+            block.tail = "\n\n" + (block.tail or "")
+        text = doc.text_content()
+        return re.sub(r"\n\s*\n+", "\n\n", re.sub(r"[ \t\xa0]+", " ", text)).strip()
+    
+    def _score_completeness(self, content: Optional[str], summary: str) -> float:
+        """0-1 estimate of whether feed content is the full article.
+
+        Scales with word count up to FEED_CONTENT_FULL_WORDS, and is halved when
+        the text looks truncated or is no longer than the summary.
+        """
+        if not content:
+            return 0.0
+        words = len(content.split())
+        score = min(words / settings.FEED_CONTENT_FULL_WORDS, 1.0)
+        
+        tail = content[-200:].lower()
+        if _TRUNCATION_RE.search(tail):
+            score *= 0.5
+        summary_words = len(self._html_to_text(summary).split()) if summary else 0
+        if words <= summary_words * 1.2:
+            score *= 0.5
+        return round(score, 2)
+    
     def _parse_date(self, date_str: Optional[str]) -> Optional[datetime]:
         """Parse date string to datetime"""
         if not date_str:
@@ -50,6 +206,11 @@ class FeedFetcher:
         try:
             from email.utils import parsedate_to_datetime
             return parsedate_to_datetime(date_str)
+        except:
+            pass
+        try:
+            # Atom / dc:date use ISO 8601
+            return datetime.fromisoformat(date_str.strip())
         except:
             return None
     
@@ -64,25 +225,67 @@ class FeedFetcher:
     async def save_articles(self, articles: List[Dict]) -> int:
         """Save articles to database"""
         saved_count = 0
+        saved = []  # (source_domain, published_date, fetched_at) for the source statistics
+        url_filter = get_url_filter()
         
         for article_data in articles:
-            # Check if article already exists
-            existing = self.db.query(Article).filter(
-                Article.url == article_data['url']
-            ).first()
+            # The seen-URL filter rules out most new URLs without a DB round trip;
+            # only "probably seen" answers are confirmed against the table
+            if url_filter is None or url_filter.might_contain(article_data['url']):
+                existing = self.db.query(Article).filter(
+                    Article.url == article_data['url']
+                ).first()
+                
+                if existing:
+                    continue
+                if url_filter is not None:
+                    url_filter.record_false_positive()
             
-            if existing:
-                continue
+            article_data.pop('guid', None)
+            
+            # Prefer full text shipped in the feed; only thin entries need a download
+            feed_content = article_data.pop('feed_content', None)
+            content_score = article_data.pop('content_score', 0.0)
+            
+            if feed_content and content_score >= settings.FEED_CONTENT_MIN_SCORE:
+                full_content = feed_content
+                content_source = "feed"
+            else:
+                full_content = await self.extract_full_content(article_data['url'])
+                content_source = "extracted"
+                if not full_content and feed_content:
+                    full_content = feed_content
+                    content_source = "feed"
             
-            # Extract full content
-            full_content = await self.extract_full_content(article_data['url'])
             if full_content:
                 article_data['content'] = full_content
+                article_data['meta'] = {'content_source': content_source, 'content_score': content_score}
+            
+            # Create new article. A savepoint keeps one conflicting URL (e.g. inserted
+            # by another worker the in-memory filter didn't know about) from
+            # failing the whole batch.
+            try:
+                with self.db.begin_nested():
+                    article = Article(**article_data)
+                    self.db.add(article)
+                    self.db.flush()
+                    
+                    # Fingerprint and link syndicated copies to the first one we saw
+                    if settings.DEDUP_ENABLED:
+                        canonical_id = self.dedup.register(
+                            article, full_content or f"{article.title}\n{article.summary or ''}"
+                        )
+                        if canonical_id:
+                            print(f"🔁 Article {article.id} is a near-duplicate of {canonical_id}")
+            except IntegrityError:
+                print(f"⏭️ Skipping {article_data['url']}: already saved")
+                continue
             
-            # Create new article
-            article = Article(**article_data)
-            self.db.add(article)
             saved_count += 1
+            saved.append((article.source_domain, article.published_date, datetime.now()))
+            if url_filter is not None:
+                url_filter.add(article_data['url'])
         
+        SourceStatsService(self.db).record_ingest(saved)
         self.db.commit()
         return saved_count
\ No newline at end of file
@@ -0,0 +1,150 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from app.models.article import FeedHealth
+from app.core.config import settings
+
+FEED = "feed"
+HOST = "host"
+
+class FeedHealthTracker:
+    """Per-feed and per-host circuit breaker with exponential backoff.
+
+    Every fetch records its outcome and latency. After HEALTH_FAILURE_THRESHOLD
+    consecutive failures the circuit opens and the feed/host is skipped until
+    `backoff_until`. The first attempt after that is a trial: success closes the
+    circuit, failure re-opens it with a doubled backoff.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._rows: Dict[Tuple[str, str], FeedHealth] = {}
+
+    @staticmethod
+    def host_for(url: str) -> str:
+        """Extract hostname used as the per-host health key"""
+        try:
+            return urlparse(url).netloc.lower()
+        except Exception:
+            return ""
+
+    def _get(self, scope: str, key: str, create: bool = False) -> Optional[FeedHealth]:
+        cache_key = (scope, key)
+        if cache_key in self._rows:
+            return self._rows[cache_key]
+
+        row = self.db.query(FeedHealth).filter(
+            FeedHealth.scope == scope,
+            FeedHealth.key == key
+        ).first()
+
+        if row is None and create:
+            row = FeedHealth(scope=scope, key=key, consecutive_failures=0)
+            self.db.add(row)
+
+        if row is not None:
+            self._rows[cache_key] = row
+        return row
+
+    def _is_tripped(self, scope: str, key: str) -> bool:
+        if not key:
+            return False
+        row = self._get(scope, key)
+        return bool(row and row.backoff_until and row.backoff_until > datetime.now())
+
+    def allow_feed(self, feed_url: str) -> bool:
+        """False if the feed or its host is currently backed off"""
+        return not (self._is_tripped(FEED, feed_url) or
+                    self._is_tripped(HOST, self.host_for(feed_url)))
+
+    def allow_host(self, url: str) -> bool:
+        """False if the URL's host is currently backed off"""
+        return not self._is_tripped(HOST, self.host_for(url))
+
+    def _record_success(self, scope: str, key: str, latency_ms: float):
+        if not key:
+            return
+        row = self._get(scope, key, create=True)
+        row.last_status = "ok"
+        row.last_error = None
+        row.last_checked = datetime.now()
+        row.consecutive_failures = 0
+        row.backoff_until = None
+        self._update_latency(row, latency_ms)
+
+    def _record_failure(self, scope: str, key: str, status: str, error: str, latency_ms: Optional[float]):
+        if not key:
+            return
+        row = self._get(scope, key, create=True)
+        row.last_status = status
+        row.last_error = error[:1000] if error else None
+        row.last_checked = datetime.now()
+        row.consecutive_failures = (row.consecutive_failures or 0) + 1
+        if latency_ms is not None:
+            self._update_latency(row, latency_ms)
+
+        overflow = row.consecutive_failures - settings.HEALTH_FAILURE_THRESHOLD
+        if overflow >= 0:
+            backoff = min(settings.HEALTH_BACKOFF_BASE * (2 ** min(overflow, 16)), settings.HEALTH_BACKOFF_MAX)
+            row.backoff_until = row.last_checked + timedelta(seconds=backoff)
+            print(f"🚧 Circuit open for {scope} {key} ({row.consecutive_failures} failures, backing off {backoff}s)")
+
+    @staticmethod
+    def _update_latency(row: FeedHealth, latency_ms: float):
+        if row.latency_ewma_ms is None:
+            row.latency_ewma_ms = latency_ms
+        else:
+            alpha = settings.HEALTH_LATENCY_ALPHA
+            row.latency_ewma_ms = alpha * latency_ms + (1 - alpha) * row.latency_ewma_ms
+
+    def record_feed_success(self, feed_url: str, latency_ms: float):
+        self._record_success(FEED, feed_url, latency_ms)
+        self._record_success(HOST, self.host_for(feed_url), latency_ms)
+
+    def record_feed_failure(self, feed_url: str, status: str, error: str = "",
+                            latency_ms: Optional[float] = None, host_failure: bool = True):
+        """Record a failed feed fetch. Parse errors are not the host's fault, so
+        callers pass host_failure=False for them."""
+        self._record_failure(FEED, feed_url, status, error, latency_ms)
+        if host_failure:
+            self._record_failure(HOST, self.host_for(feed_url), status, error, latency_ms)
+
+    def record_host_success(self, url: str, latency_ms: float):
+        self._record_success(HOST, self.host_for(url), latency_ms)
+
+    def record_host_failure(self, url: str, status: str, error: str = "", latency_ms: Optional[float] = None):
+        self._record_failure(HOST, self.host_for(url), status, error, latency_ms)
+
+    def get_states(self, scope: Optional[str] = None, tripped_only: bool = False) -> List[Dict]:
+        """Health state for the admin endpoint"""
+        query = self.db.query(FeedHealth)
+        if scope:
+            query = query.filter(FeedHealth.scope == scope)
+        if tripped_only:
+            query = query.filter(FeedHealth.backoff_until > datetime.now())
+
+        now = datetime.now()
+        return [
+            {
+                'scope': row.scope,
+                'key': row.key,
+                'last_status': row.last_status,
+                'last_error': row.last_error,
+                'last_checked': row.last_checked.isoformat() if row.last_checked else None,
+                'consecutive_failures': row.consecutive_failures or 0,
+                'latency_ewma_ms': round(row.latency_ewma_ms, 1) if row.latency_ewma_ms is not None else None,
+                'backoff_until': row.backoff_until.isoformat() if row.backoff_until else None,
+                'is_tripped': bool(row.backoff_until and row.backoff_until > now)
+            }
+            for row in query.order_by(FeedHealth.consecutive_failures.desc(), FeedHealth.key).all()
+        ]
+
+    def reset(self, scope: str, key: str) -> bool:
+        """Close the circuit for a feed/host manually"""
+        row = self._get(scope, key)
+        if row is None:
+            return False
+        row.consecutive_failures = 0
+        row.backoff_until = None
+        return True
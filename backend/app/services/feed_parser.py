@@ -0,0 +1,104 @@
+import io
+from typing import Dict, Iterator, Optional
+import feedparser
+from lxml import etree
+
+CONTENT_NS = "http://purl.org/rss/1.0/modules/content/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+ENTRY_TAGS = ("item", "entry")
+
+class FeedParseError(Exception):
+    """Feed body could not be parsed into any entries"""
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+def _text(elem) -> str:
+    return (elem.text or "").strip() if elem is not None else ""
+
+def _inner_xml(elem) -> str:
+    """Serialized children of an element (Atom type="xhtml" content)"""
+    parts = [elem.text or ""]
+    for child in elem:
+        parts.append(etree.tostring(child, encoding="unicode"))
+    return "".join(parts)
+
+def _entry_from_element(elem) -> Dict:
+    """Map an RSS <item> or Atom <entry> to feedparser-style keys"""
+    entry = {'content': []}
+    for child in elem:
+        if not isinstance(child.tag, str):
+            continue
+        qname = etree.QName(child.tag)
+        name, ns = qname.localname, qname.namespace
+
+        if name == "title":
+            entry['title'] = _text(child)
+        elif name == "link":
+            href = child.get("href")
+            if href is None:
+                entry.setdefault('link', _text(child))
+            elif child.get("rel", "alternate") == "alternate":
+                entry['link'] = href
+        elif name in ("guid", "id"):
+            entry['id'] = _text(child)
+        elif name in ("description", "summary"):
+            entry['summary'] = _text(child)
+        elif name == "encoded" and ns == CONTENT_NS:
+            entry['content'].append({'type': 'text/html', 'value': _text(child)})
+        elif name == "content" and ns != CONTENT_NS:
+            content_type = child.get("type", "text")
+            if content_type == "xhtml":
+                entry['content'].append({'type': 'application/xhtml+xml', 'value': _inner_xml(child)})
+            else:
+                entry['content'].append({
+                    'type': 'text/html' if content_type == "html" else 'text/plain',
+                    'value': _text(child)
+                })
+        elif name == "author" or (name == "creator" and ns == DC_NS):
+            author = _text(child) or _text(child.find("{*}name"))
+            entry.setdefault('author', author)
+        elif name in ("pubDate", "published") or (name == "date" and ns == DC_NS):
+            entry['published'] = _text(child)
+        elif name == "updated":
+            entry.setdefault('published', _text(child))
+
+    entry.setdefault('id', entry.get('link', ''))
+    return entry
+
+def _stream_entries(content: bytes) -> Iterator[Dict]:
+    """Yield entries one at a time, freeing each element once consumed"""
+    for _, elem in etree.iterparse(io.BytesIO(content), events=("end",), recover=False, resolve_entities=False):
+        if _local(elem.tag) not in ENTRY_TAGS:
+            continue
+        yield _entry_from_element(elem)
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+def iter_entries(content: bytes, headers: Optional[Dict] = None) -> Iterator[Dict]:
+    """Lazily yield feed entries, newest-first as published.
+
+    Well-formed RSS/Atom is streamed with lxml so callers that stop early
+    never parse the rest of the document. Anything else falls back to
+    feedparser's lenient (whole-document) parser; if the XML breaks partway
+    (e.g. a bare &nbsp;), feedparser continues after the entries already
+    yielded.
+    """
+    yielded = 0
+    try:
+        for entry in _stream_entries(content):
+            yielded += 1
+            yield entry
+        if yielded:
+            return
+    except etree.XMLSyntaxError as e:
+        if yielded:
+            print(f"Malformed feed XML after {yielded} entries, continuing with feedparser: {str(e)}")
+
+    parsed = feedparser.parse(content, response_headers=headers or {})
+    if parsed.bozo and not parsed.entries and not yielded:
+        raise FeedParseError(str(parsed.get('bozo_exception', '')))
+    yield from parsed.entries[yielded:]
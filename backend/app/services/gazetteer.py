@@ -0,0 +1,259 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from app.core.config import settings
+
+CASE_SENSITIVE_MAX_LEN = 3  # "AI", "EA", "GM": only match as written
+
+class AhoCorasick:
+    """Multi-pattern string matcher: finds every occurrence of every pattern in one pass over the text"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, object]]] = [[]]
+
+    def add(self, pattern: str, value):
+        node = 0
+        for ch in pattern:
+            next_node = self.goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][ch] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = next_node
+        self.out[node].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links breadth-first; call once after adding all patterns"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def iter(self, text: str):
+        """Yield (start, end, value) for every match"""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+def _lower(text: str) -> str:
+    """Lowercase without changing length, so offsets map back onto the original text"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+class Gazetteer:
+    """Known entities and their aliases, tagged with an Aho-Corasick automaton.
+
+    Every alias maps to its entity's canonical name and type, so variants
+    ("Alphabet Inc.", "Google's parent Alphabet") produce the same entity
+    text and therefore the same cascade key. Matches must sit on word
+    boundaries; overlapping matches resolve to the leftmost, then longest.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.automaton = AhoCorasick()
+        self.aliases: Dict[str, Tuple[str, str]] = {}  # lowercased alias -> (name, type)
+        for entry in entries:
+            name = (entry.get('name') or '').strip()
+            if not name:
+                continue
+            canonical = (name, entry.get('type'))
+            for alias in [name, *entry.get('aliases', [])]:
+                alias = alias.strip()
+                if not alias or alias.lower() in self.aliases:
+                    continue
+                self.aliases[alias.lower()] = canonical
+                case_sensitive = len(alias) <= CASE_SENSITIVE_MAX_LEN
+                self.automaton.add(alias.lower(), (alias if case_sensitive else None, canonical))
+        self.automaton.build()
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def matches(self, text: str) -> List[Tuple[int, int, Tuple[str, str]]]:
+        """Non-overlapping (start, end, (name, type)) matches on word boundaries, leftmost-longest"""
+        candidates = []
+        for start, end, (exact, canonical) in self.automaton.iter(_lower(text)):
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            if exact is not None and text[start:end] != exact:
+                continue
+            candidates.append((start, end, canonical))
+        candidates.sort(key=lambda m: (m[0], -m[1]))
+
+        matches = []
+        covered_to = 0
+        for start, end, canonical in candidates:
+            if start >= covered_to:
+                matches.append((start, end, canonical))
+                covered_to = end
+        return matches
+
+    def tag(self, text: str) -> List[Dict]:
+        """Known entities in `text`, first mention of each, in the same shape as NERService output"""
+        return self._first_mentions(self.matches(text))
+
+    def _first_mentions(self, matches) -> List[Dict]:
+        entities = []
+        seen = set()
+        for start, end, (name, entity_type) in matches:
+            if (name.lower(), entity_type) not in seen:
+                seen.add((name.lower(), entity_type))
+                entities.append({'text': name, 'type': entity_type, 'start': start, 'end': end})
+        return entities
+
+    def merge(self, text: str, ner_entities: List[Dict]) -> List[Dict]:
+        """Union of gazetteer and NER entities for `text`, in text order.
+
+        NER spans overlapping any gazetteer match are dropped, and NER entities
+        whose text is a known alias take the canonical name and type.
+        """
+        matches = self.matches(text)
+        merged = self._first_mentions(matches)
+        seen = {(e['text'].lower(), e['type']) for e in merged}
+        for entity in ner_entities:
+            if any(entity['start'] < end and start < entity['end'] for start, end, _ in matches):
+                continue
+            canonical = self.aliases.get(entity['text'].lower())
+            if canonical is not None:
+                entity = {**entity, 'text': canonical[0], 'type': canonical[1]}
+            key = (entity['text'].lower(), entity['type'])
+            if key not in seen:
+                seen.add(key)
+                merged.append(entity)
+        merged.sort(key=lambda e: e['start'])
+        return merged
+
+def record_mentions(db, articles: Iterable[Optional[Dict]]) -> int:
+    """Count first-time processed articles' entities into the entities table; caller commits.
+
+    These rows (mention_count >= GAZETTEER_MIN_MENTIONS) are what the
+    gazetteer learns from, so entities spaCy finds in long articles are
+    later tagged in short ones too.
+    """
+    from app.models.article import Entity
+
+    counts: Counter = Counter()
+    types: Dict[str, str] = {}
+    for entities in articles:
+        seen = set()
+        for entity in (entities or {}).get('entities', []):
+            name = (entity.get('text') or '').strip()[:200]
+            if name and name not in seen:
+                seen.add(name)
+                counts[name] += 1
+                types.setdefault(name, entity.get('type'))
+    if not counts:
+        return 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    rows = [{'name': name, 'entity_type': types[name], 'mention_count': count} for name, count in sorted(counts.items())]
+    for start in range(0, len(rows), 1000):
+        stmt = insert(Entity).values(rows[start:start + 1000])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'mention_count': func.coalesce(Entity.mention_count, 0) + stmt.excluded.mention_count,
+                'entity_type': func.coalesce(Entity.entity_type, stmt.excluded.entity_type)
+            }
+        ))
+    return len(rows)
+
+def _load_curated(path: str) -> List[Dict]:
+    """Entries of the alias file; a malformed file or entry is skipped, not fatal"""
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+        return [
+            entry for entry in entries
+            if isinstance(entry, dict) and isinstance(entry.get('name'), str) and entry['name'].strip()
+        ]
+    except Exception as e:
+        print(f"⚠️ Could not load gazetteer file {path}: {str(e)}")
+        return []
+
+def load_entries() -> List[Dict]:
+    """Gazetteer entries from the entities table (aliases in meta["aliases"]) and the alias file"""
+    from app.db.database import SessionLocal
+    from app.models.article import Entity
+
+    entries = []
+    db = SessionLocal()
+    try:
+        for entity in db.query(Entity).filter(Entity.mention_count >= settings.GAZETTEER_MIN_MENTIONS):
+            entries.append({
+                'name': entity.name,
+                'type': entity.entity_type,
+                'aliases': (entity.meta or {}).get('aliases', [])
+            })
+    except Exception as e:
+        print(f"⚠️ Could not load gazetteer entities: {str(e)}")
+    finally:
+        db.close()
+
+    # Alias file entries go first so curated names win over table spellings
+    if settings.GAZETTEER_PATH and os.path.exists(settings.GAZETTEER_PATH):
+        curated = _load_curated(settings.GAZETTEER_PATH)
+        curated_names = {entry['name'].lower() for entry in curated}
+        entries = curated + [entry for entry in entries if entry['name'].lower() not in curated_names]
+    return entries
+
+_gazetteer: Optional[Gazetteer] = None
+_loaded_at = 0.0
+_lock = threading.Lock()  # held only by the thread building a new gazetteer
+
+def _refresh():
+    """Build a new gazetteer and swap it in; readers keep using the old one meanwhile"""
+    global _gazetteer, _loaded_at
+    try:
+        gazetteer = Gazetteer(load_entries())
+        _gazetteer, _loaded_at = gazetteer, time.monotonic()
+        print(f"📇 Gazetteer loaded: {len(gazetteer)} aliases")
+    except Exception as e:
+        _loaded_at = time.monotonic()  # retry after the next refresh interval
+        print(f"⚠️ Could not build gazetteer: {str(e)}")
+    finally:
+        _lock.release()
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Shared gazetteer, rebuilt every GAZETTEER_REFRESH_SECONDS; None when disabled or empty.
+
+    Only the first load blocks; later rebuilds run in a background thread.
+    """
+    if settings.NER_GAZETTEER_MODE == "off":
+        return None
+    if _gazetteer is None:
+        _lock.acquire()
+        if _gazetteer is None:
+            _refresh()
+        else:
+            _lock.release()
+    elif time.monotonic() - _loaded_at > settings.GAZETTEER_REFRESH_SECONDS and _lock.acquire(blocking=False):
+        threading.Thread(target=_refresh, daemon=True).start()
+    gazetteer = _gazetteer
+    return gazetteer if gazetteer is not None and len(gazetteer) else None
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+import zstandard
+from app.core.config import settings
+from app.services.url_filter import normalize_url
+
+class HTMLCache:
+    """Content-addressed on-disk cache of fetched article HTML.
+
+    Blobs are zstd-compressed and stored by sha256 of the HTML, so identical
+    pages fetched under different URLs are kept once. A SQLite index maps
+    normalized URLs to blobs and tracks last access; when the total blob size
+    exceeds the limit the least recently used blobs are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_blobs_last_access ON blobs (last_access);
+            CREATE TABLE IF NOT EXISTS urls (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_urls_content_hash ON urls (content_hash);
+        """)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}.zst")
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM urls WHERE url_key = ?", (self._url_key(url),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            content_hash = row[0]
+            self._conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE content_hash = ?", (time.time(), content_hash)
+            )
+            self._conn.commit()
+
+        try:
+            with open(self._blob_path(content_hash), "rb") as f:
+                data = zstandard.ZstdDecompressor().decompress(f.read())
+        except (OSError, zstandard.ZstdError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data.decode("utf-8", errors="replace")
+
+    def put(self, url: str, html: str):
+        if not html:
+            return
+        raw = html.encode("utf-8")
+        content_hash = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(content_hash)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zstandard.ZstdCompressor(level=settings.HTML_CACHE_ZSTD_LEVEL).compress(raw))
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (content_hash, size, last_access) VALUES (?, ?, ?)",
+                (content_hash, os.path.getsize(path), now)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url_key, url, content_hash, fetched_at) VALUES (?, ?, ?, ?)",
+                (self._url_key(url), url, content_hash, now)
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used blobs until under max_bytes (caller holds the lock)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so we don't evict on every put
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for content_hash, size in self._conn.execute(
+            "SELECT content_hash, size FROM blobs ORDER BY last_access"
+        ).fetchall():
+            if total <= target:
+                break
+            try:
+                os.remove(self._blob_path(content_hash))
+            except OSError:
+                pass
+            self._conn.execute("DELETE FROM urls WHERE content_hash = ?", (content_hash,))
+            self._conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+            total -= size
+            evicted += 1
+        self._conn.commit()
+        print(f"🧹 Evicted {evicted} pages from HTML cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            blobs, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            urls = self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        return {
+            "urls": urls,
+            "blobs": blobs,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+_html_cache = None
+_html_cache_lock = threading.Lock()
+
+def get_html_cache() -> Optional[HTMLCache]:
+    """Shared cache instance, or None if disabled"""
+    global _html_cache
+    if not settings.HTML_CACHE_ENABLED:
+        return None
+    if _html_cache is None:
+        with _html_cache_lock:
+            if _html_cache is None:
+                _html_cache = HTMLCache(settings.HTML_CACHE_DIR, settings.HTML_CACHE_MAX_MB * 1024 * 1024)
+    return _html_cache
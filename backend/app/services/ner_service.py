@@ -1,15 +1,94 @@
 import spacy
 from typing import List, Dict, Set
 from collections import Counter
+from app.services.nlp_cache import get_nlp_cache
+from app.services.gazetteer import get_gazetteer
+from app.core.config import settings
+
+# Bump when extraction logic (label filter, output shape) changes so cached results are invalidated
+NER_PIPELINE_VERSION = 1
 
 class NERService:
     def __init__(self):
         self.nlp = spacy.load("en_core_web_sm")
+        self.model_key = (
+            f"{self.nlp.meta['lang']}_{self.nlp.meta['name']}-{self.nlp.meta['version']}"
+            f"/spacy-{spacy.__version__}/v{NER_PIPELINE_VERSION}"
+        )
+        self.cache = get_nlp_cache()
+        if self.cache:
+            self.cache.purge_stale("entities", self.model_key)
+            self.cache.purge_stale("sentiment", self.model_key)
     
-    def extract_entities(self, text: str) -> List[Dict]:
-        """Extract named entities from text"""
-        doc = self.nlp(text[:1000000])  # spaCy has limits
+    @property
+    def gazetteer(self):
+        return get_gazetteer()
+    
+    def _gazetteer_only(self, text: str, summary_only: bool) -> bool:
+        return settings.NER_GAZETTEER_MODE == "fast" and (summary_only or len(text) < settings.NER_GAZETTEER_SHORT_CHARS)
+    
+    def extract_entities(self, text: str, summary_only: bool = False) -> List[Dict]:
+        """Extract named entities from text.
+
+        Known entities are tagged by the gazetteer and merged with spaCy's; in
+        "fast" mode short and summary-only texts skip spaCy altogether.
+        """
+        gazetteer = self.gazetteer
+        if gazetteer is None:
+            return self._spacy_entities(text)
+        if self._gazetteer_only(text, summary_only):
+            return gazetteer.tag(text)
+        return gazetteer.merge(text, self._spacy_entities(text))
+    
+    def _spacy_entities(self, text: str) -> List[Dict]:
+        """spaCy entities, memoized by content hash"""
+        if self.cache:
+            cached = self.cache.get_json("entities", self.model_key, text)
+            if cached is not None:
+                return cached
+        
+        entities = self._extract_entities(text)
+        
+        if self.cache:
+            self.cache.put_json("entities", self.model_key, text, entities)
+        return entities
+    
+    def extract_entities_batch(self, texts: List[str], batch_size: int = 32, summary_only: bool = False) -> List[List[Dict]]:
+        """Batch version of extract_entities: spaCy cache misses go through nlp.pipe together"""
+        gazetteer = self.gazetteer
+        if gazetteer is None:
+            return self._spacy_entities_batch(texts, batch_size)
+        
+        needs_spacy = [i for i, text in enumerate(texts) if not self._gazetteer_only(text, summary_only)]
+        spacy_results = dict(zip(needs_spacy, self._spacy_entities_batch([texts[i] for i in needs_spacy], batch_size)))
+        return [
+            gazetteer.merge(text, spacy_results[i]) if i in spacy_results else gazetteer.tag(text)
+            for i, text in enumerate(texts)
+        ]
+    
+    def _spacy_entities_batch(self, texts: List[str], batch_size: int = 32) -> List[List[Dict]]:
+        results: List[List[Dict]] = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            cached = self.cache.get_json("entities", self.model_key, text) if self.cache else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
         
+        docs = self.nlp.pipe((texts[i][:1000000] for i in misses), batch_size=batch_size)
+        for i, doc in zip(misses, docs):
+            results[i] = self._entities_from_doc(doc)
+            if self.cache:
+                self.cache.put_json("entities", self.model_key, texts[i], results[i])
+        
+        return results
+    
+    def _extract_entities(self, text: str) -> List[Dict]:
+        doc = self.nlp(text[:1000000])  # spaCy has limits
+        return self._entities_from_doc(doc)
+    
+    def _entities_from_doc(self, doc) -> List[Dict]:
         entities = []
         seen = set()
         
@@ -35,9 +114,18 @@ class NERService:
     
     def analyze_sentiment(self, text: str) -> float:
         """Simple sentiment analysis (-1 to 1)"""
+        if self.cache:
+            cached = self.cache.get_json("sentiment", self.model_key, text)
+            if cached is not None:
+                return cached
+        
         # This is a placeholder - you can enhance with better models
         doc = self.nlp(text[:100000])
         
         # Simple polarity based on spaCy's sentiment (if available)
         # For now, return neutral
-        return 0.0
\ No newline at end of file
+        score = 0.0
+        
+        if self.cache:
+            self.cache.put_json("sentiment", self.model_key, text, score)
+        return score
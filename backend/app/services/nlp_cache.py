@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Optional
+import numpy as np
+from app.core.config import settings
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def content_key(model_key: str, text: str) -> str:
+    return hashlib.sha256(f"{model_key}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class NLPCache:
+    """Persistent memo of NLP outputs keyed by (normalized input hash, model).
+
+    Backed by a local SQLite file so results survive restarts. Keys include
+    the model name and version, so upgrading a model only misses for that
+    model's outputs; `purge_stale` reclaims space from old versions.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nlp_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                model TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_nlp_cache_ns_model ON nlp_cache (namespace, model)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, namespace: str, model_key: str, text: str) -> Optional[bytes]:
+        key = content_key(f"{namespace}:{model_key}", text)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM nlp_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def _put(self, namespace: str, model_key: str, text: str, value: bytes):
+        key = content_key(f"{namespace}:{model_key}", text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nlp_cache (key, namespace, model, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, model_key, value, time.time())
+            )
+            self._conn.commit()
+
+    def get_json(self, namespace: str, model_key: str, text: str) -> Optional[Any]:
+        value = self._get(namespace, model_key, text)
+        return json.loads(value) if value is not None else None
+
+    def put_json(self, namespace: str, model_key: str, text: str, value: Any):
+        self._put(namespace, model_key, text, json.dumps(value).encode("utf-8"))
+
+    def get_vector(self, namespace: str, model_key: str, text: str) -> Optional[np.ndarray]:
+        value = self._get(namespace, model_key, text)
+        return np.frombuffer(value, dtype=np.float32) if value is not None else None
+
+    def put_vector(self, namespace: str, model_key: str, text: str, vector):
+        self._put(namespace, model_key, text, np.asarray(vector, dtype=np.float32).tobytes())
+
+    def purge_stale(self, namespace: str, current_model_key: str) -> int:
+        """Drop entries in a namespace produced by any other model version"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM nlp_cache WHERE namespace = ? AND model != ?",
+                (namespace, current_model_key)
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            print(f"🧹 Purged {cursor.rowcount} stale {namespace} cache entries")
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, model, COUNT(*) FROM nlp_cache GROUP BY namespace, model"
+            ).fetchall()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": [{"namespace": ns, "model": model, "count": count} for ns, model, count in rows]
+        }
+
+_nlp_cache = None
+_nlp_cache_lock = threading.Lock()
+
+def get_nlp_cache() -> Optional[NLPCache]:
+    """Shared cache instance, or None if caching is disabled"""
+    global _nlp_cache
+    if not settings.NLP_CACHE_ENABLED:
+        return None
+    if _nlp_cache is None:
+        with _nlp_cache_lock:
+            if _nlp_cache is None:
+                _nlp_cache = NLPCache(settings.NLP_CACHE_PATH)
+    return _nlp_cache
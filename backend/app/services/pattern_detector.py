@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from app.models.article import Article, Entity
+from app.services.trending import TrendingService
+from app.services.source_stats import SourceStatsService
+from app.services.cascade_engine import get_snapshot, hydrate_cascades, decode_cursor
+import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 from collections import Counter
 import json
 from typing import List, Dict, Set
@@ -11,76 +15,38 @@ class PatternDetector:
     def __init__(self, db: Session):
         self.db = db
     
-    def detect_cascades(self, hours: int = 48) -> List[Dict]:
-        """Detect information cascades - topics spreading across sources"""
-        cutoff = datetime.now() - timedelta(hours=hours)
-        
-        # Get recent articles
-        recent_articles = self.db.query(Article).filter(
-            Article.published_date >= cutoff,
-            Article.is_processed == True
-        ).all()
-    
-        if not recent_articles:
-            return []
-        
-        # Extract all entities from recent articles
-        entity_mentions = {}
-        
-        for article in recent_articles:
-            if article.entities:
-                entities = article.entities.get('entities', [])
-                for entity in entities:
-                    entity_key = (entity['text'].lower(), entity['type'])
-                    
-                    if entity_key not in entity_mentions:
-                        entity_mentions[entity_key] = {
-                            'text': entity['text'],
-                            'type': entity['type'],
-                            'sources': set(),
-                            'articles': [],
-                            'first_seen': article.published_date,
-                            'last_seen': article.published_date
-                        }
-                    
-                    entity_mentions[entity_key]['sources'].add(article.source_domain)
-                    entity_mentions[entity_key]['articles'].append({
-                        'id': article.id,
-                        'title': article.title,
-                        'url': article.url,
-                        'published_date': article.published_date.isoformat(),
-                        'source': article.source_domain
-                    })
-                    
-                    if article.published_date < entity_mentions[entity_key]['first_seen']:
-                        entity_mentions[entity_key]['first_seen'] = article.published_date
-                    if article.published_date > entity_mentions[entity_key]['last_seen']:
-                        entity_mentions[entity_key]['last_seen'] = article.published_date
+    def get_cascades(self, hours: int = 48, limit: int = 10, cursor: Optional[str] = None,
+                     articles_per_cascade: int = 10, min_sources: int = 2,
+                     sources: Optional[List[str]] = None) -> Dict:
+        """One page of cascades, best first; pass next_cursor back for the following page.
         
-        # Find cascades (entities mentioned by multiple sources)
-        cascades = []
-        for entity_key, data in entity_mentions.items():
-            if len(data['sources']) >= 2:  # At least 2 different sources
-                # Calculate velocity
-                time_span = (data['last_seen'] - data['first_seen']).total_seconds() / 3600  # hours
-                velocity = len(data['articles']) / max(time_span, 1)
-                
-                cascades.append({
-                    'entity': data['text'],
-                    'type': data['type'],
-                    'mention_count': len(data['articles']),
-                    'source_count': len(data['sources']),
-                    'sources': list(data['sources']),
-                    'velocity': round(velocity, 2),
-                    'first_seen': data['first_seen'].isoformat(),
-                    'last_seen': data['last_seen'].isoformat(),
-                    'articles': data['articles']
-                })
+        With `sources`, only cascades spanning min_sources of those sources are
+        returned, with articles from them; the shared window snapshot is reused.
+        """
+        snapshot_id, after = decode_cursor(cursor) if cursor else (None, None)
+        snapshot = get_snapshot(self.db, hours, snapshot_id)
+        source_mask = snapshot.source_mask(sources) if sources is not None else None
+        eligible = snapshot.eligible(min_sources, source_mask)
+        codes, has_more = snapshot.top(limit, eligible, after)
         
-        # Sort by mention count and source diversity
-        cascades.sort(key=lambda x: (x['source_count'], x['mention_count']), reverse=True)
-        
-        return cascades
+        return {
+            "total": int(eligible.sum()),
+            "cascades": hydrate_cascades(self.db, snapshot, codes, articles_per_cascade, source_mask),
+            "next_cursor": snapshot.cursor_after(int(codes[-1])) if has_more and len(codes) else None
+        }
+    
+    def detect_cascades(self, hours: int = 48, limit: int = 10, articles_per_cascade: int = 10) -> List[Dict]:
+        """Detect information cascades - topics spreading across sources"""
+        return self.get_cascades(hours, limit=limit, articles_per_cascade=articles_per_cascade)["cascades"]
+    
+    def get_cascade(self, entity_name: str, hours: int = 48, articles_per_cascade: int = 20) -> Optional[Dict]:
+        """The cascade for one entity, if it spans at least two sources"""
+        snapshot = get_snapshot(self.db, hours)
+        codes = np.flatnonzero((snapshot.names == entity_name.lower()) & snapshot.eligible())
+        if not len(codes):
+            return None
+        best = codes[np.argmax(snapshot.scores[codes])]
+        return hydrate_cascades(self.db, snapshot, [int(best)], articles_per_cascade)[0]
     
     def get_entity_timeline(self, entity_name: str, days: int = 30) -> List[Dict]:
         """Get timeline of entity mentions"""
@@ -88,7 +54,8 @@ class PatternDetector:
         
         articles = self.db.query(Article).filter(
             Article.published_date >= cutoff,
-            Article.is_processed == True
+            Article.is_processed == True,
+            Article.canonical_id.is_(None)
         ).order_by(Article.published_date).all()
         
         timeline = []
@@ -108,50 +75,10 @@ class PatternDetector:
         
         return timeline
     
-    def get_trending_topics(self, hours: int = 24) -> List[Dict]:
-        """Get trending topics based on entity frequency"""
-        cutoff = datetime.now() - timedelta(hours=hours)
-        
-        recent_articles = self.db.query(Article).filter(
-            Article.published_date >= cutoff,
-            Article.is_processed == True
-        ).all()
-        
-        entity_counter = Counter()
-        entity_types = {}
-        
-        for article in recent_articles:
-            if article.entities:
-                entities = article.entities.get('entities', [])
-                for entity in entities:
-                    key = entity['text'].lower()
-                    entity_counter[key] += 1
-                    entity_types[key] = entity['type']
-        
-        trending = [
-            {
-                'entity': name,
-                'type': entity_types[name],
-                'mentions': count
-            }
-            for name, count in entity_counter.most_common(20)
-        ]
-        
-        return trending
+    def get_trending_topics(self, hours: int = 24, limit: int = 20) -> List[Dict]:
+        """Get trending topics based on entity frequency (from the hourly heavy-hitter sketches)"""
+        return TrendingService(self.db).top(hours, limit)['topics']
     
-    def get_source_statistics(self) -> List[Dict]:
-        """Get statistics by source"""
-        stats = self.db.query(
-            Article.source_domain,
-            func.count(Article.id).label('article_count'),
-            func.avg(Article.sentiment_score).label('avg_sentiment')
-        ).group_by(Article.source_domain).all()
-        
-        return [
-            {
-                'source': stat.source_domain,
-                'article_count': stat.article_count,
-                'avg_sentiment': round(stat.avg_sentiment, 3) if stat.avg_sentiment else 0.0
-            }
-            for stat in stats
-        ]
\ No newline at end of file
+    def get_source_statistics(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """Get statistics by source (from the incrementally maintained per-source aggregates)"""
+        return SourceStatsService(self.db).statistics(sources)
\ No newline at end of file
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from qdrant_client.models import Filter, FieldCondition, Range, SearchRequest
+from app.core.config import settings
+from app.models.article import Article, RelatedArticle
+
+class RelatedArticlesService:
+    """Maintains the related_articles kNN graph.
+
+    After a batch of articles is embedded, `update` finds each new article's
+    top RELATED_K neighbours above RELATED_MIN_SCORE in the recent window and
+    inserts the reverse edges too, trimming neighbours' lists back to the
+    top RELATED_K. With a Qdrant client the neighbours come from one batched
+    kNN query, so only the candidates are touched; otherwise (and for full
+    rebuilds) the batch is scored against the whole window's vectors from
+    the local store with one matrix multiply. Readers then get neighbour
+    lists with one indexed query.
+    """
+
+    def __init__(self, db: Session, vector_store, qdrant=None):
+        self.db = db
+        self.store = vector_store
+        self.qdrant = qdrant
+
+    def _window(self, since: datetime, exclude_duplicates: bool = True):
+        """IDs and vectors of embedded articles published (or fetched) since `since`"""
+        query = self.db.query(Article.id).filter(
+            func.coalesce(Article.published_date, Article.fetched_date) >= since
+        )
+        if exclude_duplicates:
+            query = query.filter(Article.canonical_id.is_(None))
+        ids = [row.id for row in query]
+        return self.store.get_many(ids)
+
+    def update(self, article_ids: Sequence[int], vectors: Optional[np.ndarray] = None,
+               since: Optional[datetime] = None, use_index: bool = True) -> int:
+        """Compute neighbours for a batch of embedded articles; returns edges written"""
+        if not article_ids or (self.store is None and vectors is None):
+            return 0
+        if vectors is None:
+            article_ids, vectors = self.store.get_many(article_ids)
+            if not article_ids:
+                return 0
+        batch = np.array(vectors, dtype=np.float32)
+        batch /= np.clip(np.linalg.norm(batch, axis=1, keepdims=True), 1e-12, None)
+
+        if since is None:
+            since = datetime.now() - timedelta(days=settings.RELATED_WINDOW_DAYS)
+        if self.qdrant is not None and use_index:
+            candidates = self._index_candidates(batch, since)
+        elif self.store is not None:
+            candidates = self._window_candidates(article_ids, batch, since)
+        else:
+            return 0
+
+        edges: Dict[int, Dict[int, float]] = {}
+        for article_id, neighbours in zip(article_ids, candidates):
+            for neighbour, score in neighbours:
+                if score < settings.RELATED_MIN_SCORE or neighbour == article_id:
+                    continue
+                edges.setdefault(article_id, {})[neighbour] = score
+                edges.setdefault(neighbour, {})[article_id] = score
+        return self._merge(edges, replace=set(article_ids))
+
+    def _index_candidates(self, batch: np.ndarray, since: datetime) -> List[List[Tuple[int, float]]]:
+        """Nearest articles in the window per vector, from one batched Qdrant kNN query"""
+        window_filter = Filter(must=[FieldCondition(key="published_ts", range=Range(gte=int(since.timestamp())))])
+        results = self.qdrant.search_batch(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            requests=[
+                SearchRequest(
+                    vector=vector.tolist(),
+                    filter=window_filter,
+                    limit=settings.RELATED_K + 1,  # the article itself is usually the first hit
+                    score_threshold=settings.RELATED_MIN_SCORE,
+                    with_payload=["article_id"]
+                )
+                for vector in batch
+            ]
+        )
+        return [[(int(hit.payload['article_id']), float(hit.score)) for hit in hits] for hits in results]
+
+    def _window_candidates(self, article_ids: Sequence[int], batch: np.ndarray,
+                           since: datetime) -> List[List[Tuple[int, float]]]:
+        """Nearest articles in the window per vector, scoring against every window vector"""
+        window_ids, window = self._window(since)
+        if not window_ids:
+            return [[] for _ in article_ids]
+        window /= np.clip(np.linalg.norm(window, axis=1, keepdims=True), 1e-12, None)
+        window_ids = np.asarray(window_ids)
+
+        # (batch x window) cosine similarities in one multiply
+        scores = batch @ window.T
+        scores[np.asarray(article_ids)[:, None] == window_ids[None, :]] = -1.0
+
+        k = min(settings.RELATED_K, len(window_ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return [[(int(window_ids[col]), float(scores[row, col])) for col in top[row]] for row in range(len(article_ids))]
+
+    def _merge(self, edges: Dict[int, Dict[int, float]], replace: set) -> int:
+        """Merge new edges into the table, keeping the top RELATED_K per article.
+
+        Lists of articles in `replace` are recomputed from scratch; others keep
+        their existing neighbours and only gain the new edges.
+        """
+        affected = list(edges.keys() | replace)
+        if not affected:
+            return 0
+
+        current: Dict[int, Dict[int, float]] = {article_id: {} for article_id in affected}
+        for row in self.db.query(RelatedArticle).filter(RelatedArticle.article_id.in_(affected)):
+            if row.article_id not in replace:
+                current[row.article_id][row.related_id] = row.score
+        for article_id, neighbours in edges.items():
+            current[article_id].update(neighbours)
+
+        rows = []
+        for article_id, neighbours in current.items():
+            best = sorted(neighbours.items(), key=lambda item: item[1], reverse=True)[:settings.RELATED_K]
+            rows.extend({'article_id': article_id, 'related_id': related_id, 'score': score} for related_id, score in best)
+
+        self.db.query(RelatedArticle).filter(RelatedArticle.article_id.in_(affected)).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(RelatedArticle, rows)
+        self.db.commit()
+        return len(rows)
+
+    def rebuild(self, days: Optional[int] = None, batch_size: int = 512) -> int:
+        """Recompute the whole graph for the window (e.g. after a model change or first deploy)"""
+        if self.store is None:
+            return 0
+        since = datetime.now() - timedelta(days=days or settings.RELATED_WINDOW_DAYS)
+        ids, _ = self._window(since)
+
+        written = 0
+        for start in range(0, len(ids), batch_size):
+            written += self.update(ids[start:start + batch_size], since=since, use_index=False)
+        print(f"🕸️ Rebuilt related-articles graph: {len(ids)} articles, {written} edge rows")
+        return written
+
+    def neighbours(self, article_id: int, limit: int = 10) -> List[RelatedArticle]:
+        return self.db.query(RelatedArticle).filter(
+            RelatedArticle.article_id == article_id
+        ).order_by(RelatedArticle.score.desc()).limit(limit).all()
+
+    def graph(self, article_id: int, depth: int = 1, limit: int = 10) -> Dict:
+        """Nodes and edges around an article, one query per hop"""
+        frontier = {article_id}
+        seen = {article_id}
+        edges = {}
+        for _ in range(depth):
+            rows = self.db.query(RelatedArticle).filter(RelatedArticle.article_id.in_(frontier)).all()
+            by_article: Dict[int, List[RelatedArticle]] = {}
+            for row in rows:
+                by_article.setdefault(row.article_id, []).append(row)
+
+            next_frontier = set()
+            for source_id, source_rows in by_article.items():
+                for row in sorted(source_rows, key=lambda r: r.score, reverse=True)[:limit]:
+                    key = tuple(sorted((row.article_id, row.related_id)))
+                    edges[key] = max(edges.get(key, 0.0), row.score)
+                    if row.related_id not in seen:
+                        seen.add(row.related_id)
+                        next_frontier.add(row.related_id)
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        articles = self.db.query(
+            Article.id, Article.title, Article.source_domain, Article.published_date
+        ).filter(Article.id.in_(seen)).all()
+        return {
+            "nodes": [
+                {"id": a.id, "title": a.title, "source_domain": a.source_domain, "published_date": a.published_date}
+                for a in articles
+            ],
+            "edges": [
+                {"source": source, "target": target, "score": round(score, 4)}
+                for (source, target), score in edges.items()
+            ]
+        }
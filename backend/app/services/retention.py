@@ -0,0 +1,233 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, date
+from typing import Dict, List, Optional
+from sqlalchemy import text, func
+from sqlalchemy.orm import Session, selectinload
+from app.db.database import engine
+from app.models.article import Article, ArticleContent, ArticleFingerprint, ArticleLSHBand, ArticleArchive, FeedHealth, RelatedArticle, StoryCluster, EntityDayCount, EntityCooccurrence, TrendingSketch, EntityHourlyRollup, CascadeOrigin
+from app.core.config import settings
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointIdsList
+
+def get_retention_policies() -> List[Dict]:
+    """Per-table retention policies.
+
+    - model / column: table and the timestamp that ages rows out
+    - days: keep rows newer than this
+    - archive: copy rows to the archive (table or file) before deleting
+    - vectors: Qdrant collection to delete the rows' points from (False for none)
+    - vector_id: the row's point ID in that collection
+    - dependents: (model, key column) side tables deleted along with the rows
+    - options: loader options for the batch query
+    """
+    return [
+        {
+            'name': 'articles',
+            'model': Article,
+            'column': func.coalesce(Article.published_date, Article.fetched_date),
+            'days': settings.RETENTION_ARTICLE_DAYS,
+            'archive': settings.RETENTION_ARCHIVE_MODE != "none",
+            'vectors': settings.QDRANT_COLLECTION_NAME,
+            'vector_id': lambda row: row.embedding_id,
+            'dependents': [
+                (ArticleContent, ArticleContent.article_id),
+                (ArticleFingerprint, ArticleFingerprint.article_id),
+                (ArticleLSHBand, ArticleLSHBand.article_id),
+                (RelatedArticle, RelatedArticle.article_id),
+                (RelatedArticle, RelatedArticle.related_id),
+            ],
+            'options': [selectinload(Article.body)],
+        },
+        {
+            'name': 'feed_health',
+            'model': FeedHealth,
+            'column': FeedHealth.last_checked,
+            'days': settings.RETENTION_FEED_HEALTH_DAYS,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'story_clusters',
+            'model': StoryCluster,
+            'column': StoryCluster.last_seen,
+            'days': settings.RETENTION_ARTICLE_DAYS,
+            'archive': False,
+            'vectors': settings.STORY_COLLECTION_NAME,
+            'vector_id': lambda row: row.id,  # centroid point ID is the cluster ID
+        },
+        {
+            'name': 'entity_day_counts',
+            'model': EntityDayCount,
+            'column': EntityDayCount.day,
+            'days': settings.COOCCURRENCE_RETENTION_DAYS,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'entity_cooccurrence',
+            'model': EntityCooccurrence,
+            'column': EntityCooccurrence.day,
+            'days': settings.COOCCURRENCE_RETENTION_DAYS,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'trending_sketches',
+            'model': TrendingSketch,
+            'column': TrendingSketch.hour,
+            'days': settings.TRENDING_MAX_HOURS // 24 + 1,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'entity_hourly_rollups',
+            'model': EntityHourlyRollup,
+            'column': EntityHourlyRollup.hour,
+            'days': settings.ROLLUP_RETENTION_DAYS,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'cascade_origins',
+            'model': CascadeOrigin,
+            'column': CascadeOrigin.first_seen,
+            'days': settings.SOURCE_CASCADE_WINDOW_HOURS // 24 + 1,
+            'archive': False,
+            'vectors': False,
+        },
+        {
+            'name': 'article_archive',
+            'model': ArticleArchive,
+            'column': ArticleArchive.archived_at,
+            'days': settings.RETENTION_ARCHIVE_DAYS,
+            'archive': False,
+            'vectors': False,
+        },
+    ]
+
+def _serialize_row(row) -> Dict:
+    """Column values of an ORM row as JSON-safe dict"""
+    data = {}
+    for column in row.__table__.columns:
+        if column.key == 'search_vector':
+            continue  # derived from the text, and deferred (would cost a query per row)
+        value = getattr(row, column.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        data[column.key] = value
+    if isinstance(row, Article):
+        data['content'] = row.content
+    return data
+
+class RetentionService:
+    """Deletes aged-out rows in bounded batches.
+
+    Each batch selects at most RETENTION_BATCH_SIZE primary keys, archives the
+    rows and deletes them by primary key, then commits; their vector points
+    are removed only once the commit has succeeded. Short transactions keep
+    locks brief and let autovacuum keep up; on Postgres the table is VACUUM
+    ANALYZEd after a run that deleted rows.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._qdrant = None
+
+    async def run(self, policies: Optional[List[Dict]] = None) -> Dict[str, int]:
+        """Apply all policies, returning deleted row counts per table"""
+        results = {}
+        for policy in policies or get_retention_policies():
+            try:
+                results[policy['name']] = await self.apply_policy(policy)
+            except Exception as e:
+                print(f"Error applying retention to {policy['name']}: {str(e)}")
+                self.db.rollback()
+                results[policy['name']] = 0
+
+        for name, deleted in results.items():
+            if deleted > 0:
+                self._vacuum(name)
+        return results
+
+    async def apply_policy(self, policy: Dict) -> int:
+        model = policy['model']
+        cutoff = datetime.now() - timedelta(days=policy['days'])
+        deleted = 0
+
+        for _ in range(settings.RETENTION_MAX_BATCHES):
+            rows = self.db.query(model).options(*policy.get('options', [])).filter(
+                policy['column'] < cutoff
+            ).order_by(model.id).limit(settings.RETENTION_BATCH_SIZE).all()
+
+            if not rows:
+                break
+
+            if policy['archive']:
+                self._archive(policy['name'], rows)
+            point_ids = [policy['vector_id'](row) for row in rows] if policy['vectors'] else []
+
+            ids = [row.id for row in rows]
+            for dependent, key in policy.get('dependents', []):
+                self.db.query(dependent).filter(key.in_(ids)).delete(synchronize_session=False)
+            self.db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            self.db.commit()
+            self.db.expunge_all()
+            # After the commit, so a failed batch never leaves rows pointing at deleted vectors
+            self._delete_vectors(policy['vectors'], [point_id for point_id in point_ids if point_id])
+
+            deleted += len(ids)
+
+            # Let the event loop serve requests between batches
+            await asyncio.sleep(0)
+
+        if deleted:
+            print(f"🗑️ Retention removed {deleted} rows from {policy['name']} older than {policy['days']} days")
+        return deleted
+
+    def _archive(self, name: str, rows: List):
+        if settings.RETENTION_ARCHIVE_MODE == "file":
+            os.makedirs(settings.RETENTION_ARCHIVE_DIR, exist_ok=True)
+            path = os.path.join(
+                settings.RETENTION_ARCHIVE_DIR,
+                f"{name}-{datetime.now().strftime('%Y%m%d')}.jsonl.gz"
+            )
+            # gzip members can be concatenated, so appending keeps the file valid
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(_serialize_row(row)) + "\n")
+            return
+
+        if name != 'articles':
+            return
+        for row in rows:
+            self.db.add(ArticleArchive(
+                article_id=row.id,
+                url=row.url,
+                source_domain=row.source_domain,
+                published_date=row.published_date,
+                payload=gzip.compress(json.dumps(_serialize_row(row)).encode("utf-8"))
+            ))
+
+    def _delete_vectors(self, collection: str, point_ids: List):
+        if not point_ids:
+            return
+        try:
+            if self._qdrant is None:
+                self._qdrant = QdrantClient(url=settings.QDRANT_URL, timeout=10)
+            self._qdrant.delete(collection_name=collection, points_selector=PointIdsList(points=point_ids))
+        except Exception as e:
+            # Rows are already gone; orphaned points are only wasted space
+            print(f"Error deleting {len(point_ids)} vectors from {collection}: {str(e)}")
+
+    def _vacuum(self, name: str):
+        if engine.dialect.name != "postgresql":
+            return
+        try:
+            # VACUUM can't run inside a transaction block
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"VACUUM ANALYZE {name}"))
+        except Exception as e:
+            print(f"Error vacuuming {name}: {str(e)}")
@@ -0,0 +1,202 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article, EntityHourlyRollup
+from app.services.cooccurrence import article_entity_keys, upsert_counts
+from app.services.trending import hour_bucket
+
+ALL_ARTICLES_KEY = ""  # rollup rows with this entity count every article of the source
+INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+class RollupService:
+    """Hourly (hour, entity, source) -> article count aggregates.
+
+    Processing an article adds one to its hour's row for each of its
+    entities (and the source's all-articles row); re-processing swaps the
+    old entities' counts for the new ones. Time series and cascade
+    acceleration are then read from at most 24 x days rows per entity
+    instead of scanning articles.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, articles: Iterable[Tuple[Optional[Dict], Optional[str], datetime]], sign: int = 1) -> int:
+        """Add (sign=1) or remove (sign=-1) (entities, source_domain, seen_at) triples; caller commits"""
+        counts: Counter = Counter()
+        types: Dict[str, str] = {}
+        recorded = 0
+        for entities, source_domain, seen_at in articles:
+            hour = hour_bucket(seen_at or datetime.now())
+            source = source_domain or ""
+            keys = article_entity_keys(entities, limit=None)
+            types.update(keys)
+            counts[(hour, ALL_ARTICLES_KEY, source)] += sign
+            for name in keys:
+                counts[(hour, name, source)] += sign
+            recorded += 1
+
+        upsert_counts(self.db, EntityHourlyRollup, ['hour', 'entity', 'source_domain'], [
+            {'hour': hour, 'entity': name, 'entity_type': types.get(name), 'source_domain': source, 'count': count}
+            for (hour, name, source), count in sorted(counts.items()) if count
+        ])
+        if sign < 0 and counts:
+            hours = {key[0] for key in counts}
+            self.db.query(EntityHourlyRollup).filter(
+                EntityHourlyRollup.hour.in_(hours), EntityHourlyRollup.count <= 0
+            ).delete(synchronize_session=False)
+        return recorded
+
+    def rebuild(self, days: Optional[int] = None, batch_size: int = 1000) -> int:
+        """Recount the rollups from the articles table (first deploy)"""
+        days = days or settings.ROLLUP_RETENTION_DAYS
+        since = hour_bucket(datetime.now()) - timedelta(days=days)
+        self.db.query(EntityHourlyRollup).filter(EntityHourlyRollup.hour >= since).delete(synchronize_session=False)
+
+        seen_at = func.coalesce(Article.published_date, Article.fetched_date)
+        last_id = 0
+        recorded = 0
+        while True:
+            batch = self.db.query(Article.id, Article.entities, Article.source_domain, seen_at.label('seen_at')).filter(
+                Article.id > last_id,
+                Article.is_processed == True,
+                Article.canonical_id.is_(None),
+                seen_at >= since
+            ).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            recorded += self.record((a.entities, a.source_domain, a.seen_at) for a in batch)
+            last_id = batch[-1].id
+        self.db.commit()
+        print(f"📊 Rebuilt hourly rollups: {recorded} articles over {days} days")
+        return recorded
+
+    def _buckets(self, start: datetime, end: datetime, interval: str) -> List[datetime]:
+        step = INTERVALS[interval]
+        buckets = []
+        bucket = start
+        while bucket <= end:
+            buckets.append(bucket)
+            bucket += step
+        return buckets
+
+    def _window(self, days: int, interval: str) -> Tuple[datetime, List[datetime]]:
+        end = hour_bucket(datetime.now())
+        if interval == "day":
+            end = end.replace(hour=0)
+        start = end - timedelta(days=days) + INTERVALS[interval]
+        return start, self._buckets(start, end, interval)
+
+    def _dense(self, rows, start: datetime, n_buckets: int, interval: str) -> Dict[str, np.ndarray]:
+        """(key, hour, count) rows -> key -> counts per bucket, zeros filled in"""
+        step = INTERVALS[interval].total_seconds()
+        series: Dict[str, np.ndarray] = {}
+        for key, hour, count in rows:
+            index = int((hour - start).total_seconds() // step)
+            if 0 <= index < n_buckets:
+                series.setdefault(key, np.zeros(n_buckets, dtype=np.int64))[index] += count
+        return series
+
+    def entity_series(self, name: str, days: int = 30, interval: str = "day", by_source: bool = False) -> Dict:
+        """Articles mentioning an entity per hour/day, optionally split by source"""
+        start, buckets = self._window(days, interval)
+        rows = self.db.query(
+            EntityHourlyRollup.source_domain, EntityHourlyRollup.hour, func.sum(EntityHourlyRollup.count)
+        ).filter(
+            EntityHourlyRollup.entity == name.strip().lower(),
+            EntityHourlyRollup.hour >= start
+        ).group_by(EntityHourlyRollup.source_domain, EntityHourlyRollup.hour).all()
+
+        per_source = self._dense(rows, start, len(buckets), interval)
+        total = sum(per_source.values(), np.zeros(len(buckets), dtype=np.int64))
+        result = {
+            "total": int(total.sum()),
+            "series": [{"bucket": b.isoformat(), "count": int(c)} for b, c in zip(buckets, total)]
+        }
+        if by_source:
+            result["sources"] = {source or "unknown": counts.tolist() for source, counts in per_source.items()}
+        return result
+
+    def source_series(self, days: int = 30, interval: str = "day", sources: Optional[List[str]] = None) -> Dict:
+        """Articles per source per hour/day"""
+        start, buckets = self._window(days, interval)
+        query = self.db.query(
+            EntityHourlyRollup.source_domain, EntityHourlyRollup.hour, EntityHourlyRollup.count
+        ).filter(
+            EntityHourlyRollup.entity == ALL_ARTICLES_KEY,
+            EntityHourlyRollup.hour >= start
+        )
+        if sources:
+            query = query.filter(EntityHourlyRollup.source_domain.in_(sources))
+
+        per_source = self._dense(query.all(), start, len(buckets), interval)
+        return {
+            "buckets": [b.isoformat() for b in buckets],
+            "sources": {
+                source or "unknown": {"total": int(counts.sum()), "counts": counts.tolist()}
+                for source, counts in sorted(per_source.items(), key=lambda kv: -kv[1].sum())
+            }
+        }
+
+    def acceleration(self, hours: int = 24, limit: int = 20, min_mentions: int = 3, min_sources: int = 2) -> List[Dict]:
+        """Entities whose mentions/hour are rising fastest in the window.
+
+        The hourly counts of every candidate entity form one matrix; the
+        least-squares slope (mentions/hour per hour) and the rate in the
+        recent vs. the earlier half of the window are computed on it at once.
+        """
+        end = hour_bucket(datetime.now())
+        start = end - timedelta(hours=hours - 1)
+        base = self.db.query(EntityHourlyRollup).filter(
+            EntityHourlyRollup.entity != ALL_ARTICLES_KEY,
+            EntityHourlyRollup.hour >= start
+        )
+        candidates = {
+            row.entity: row for row in base.with_entities(
+                EntityHourlyRollup.entity,
+                func.max(EntityHourlyRollup.entity_type).label('entity_type'),
+                func.sum(EntityHourlyRollup.count).label('mentions'),
+                func.count(func.distinct(EntityHourlyRollup.source_domain)).label('source_count')
+            ).group_by(EntityHourlyRollup.entity).having(
+                func.sum(EntityHourlyRollup.count) >= min_mentions,
+                func.count(func.distinct(EntityHourlyRollup.source_domain)) >= min_sources
+            )
+        }
+        if not candidates:
+            return []
+
+        rows = base.with_entities(
+            EntityHourlyRollup.entity, EntityHourlyRollup.hour, func.sum(EntityHourlyRollup.count)
+        ).filter(EntityHourlyRollup.entity.in_(list(candidates))).group_by(
+            EntityHourlyRollup.entity, EntityHourlyRollup.hour
+        ).all()
+        series = self._dense(rows, start, hours, "hour")
+        names = list(series)
+        counts = np.stack([series[name] for name in names]).astype(np.float64)
+
+        t = np.arange(hours, dtype=np.float64)
+        t -= t.mean()
+        slopes = counts @ t / max(float(t @ t), 1.0)
+        half = max(hours // 2, 1)
+        recent = counts[:, -half:].sum(axis=1) / half
+        earlier = counts[:, :-half].sum(axis=1) / max(hours - half, 1)
+
+        order = np.argsort(-slopes, kind='stable')[:limit]
+        return [
+            {
+                'entity': names[i],
+                'type': candidates[names[i]].entity_type,
+                'mentions': int(candidates[names[i]].mentions),
+                'source_count': int(candidates[names[i]].source_count),
+                'rate_recent': round(float(recent[i]), 3),
+                'rate_earlier': round(float(earlier[i]), 3),
+                'acceleration': round(float(recent[i] - earlier[i]), 3),
+                'slope': round(float(slopes[i]), 4),
+                'hourly': counts[i].astype(int).tolist()
+            }
+            for i in order
+        ]
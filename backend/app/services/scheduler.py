@@ -4,30 +4,18 @@ from sqlalchemy.orm import Session
 from app.db.database import SessionLocal
 from app.models.article import Feed, Article
 from app.services.feed_fetcher import FeedFetcher
+from app.services.retention import RetentionService
+from app.services.trending import flush_pending
+from app.core.config import settings
 from app.api.processing import process_article_task
 
 async def cleanup_old_articles():
-    """Delete articles published more than 7 days ago (changed from 24h to prevent deleting fresh articles)"""
+    """Apply retention policies: archive and delete aged-out rows in batches"""
     db = SessionLocal()
     try:
-        # Delete based on published date - but use 7 days to keep recent articles
-        seven_days_ago = datetime.now() - timedelta(days=7)
-
-        # Count before delete - only articles published more than 7 days ago
-        old_count = db.query(Article).filter(
-            Article.published_date < seven_days_ago
-        ).count()
-
-        if old_count > 0:
-            # Delete old articles
-            db.query(Article).filter(
-                Article.published_date < seven_days_ago
-            ).delete()
-
-            db.commit()
-            print(f"🗑️ Deleted {old_count} articles older than 7 days")
-        else:
-            print(f"✨ No old articles to delete")
+        results = await RetentionService(db).run()
+        if not any(results.values()):
+            print(f"✨ No old rows to delete")
     except Exception as e:
         print(f"Error cleaning up articles: {str(e)}")
         db.rollback()
@@ -46,7 +34,7 @@ async def fetch_all_feeds():
             print(f"🎃 Fetching feed: {feed.title}")
             
             fetcher = FeedFetcher(db)
-            articles = await fetcher.fetch_feed(feed.url)
+            articles = await fetcher.fetch_feed_incremental(feed)
             saved_count = await fetcher.save_articles(articles)
             
             # Get new article IDs
@@ -92,9 +80,7 @@ async def fetch_all_feeds():
 
             print(f"✅ Completed processing {completed} articles")
         
-        # Clean up old articles after processing - DISABLED for hackathon demo
-        # await cleanup_old_articles()
-        
+        flush_pending()  # don't leave this cycle's trending counts waiting for the next article
         print("🌙 All feeds fetched and processed!")
     except Exception as e:
         print(f"Error in fetch_all_feeds: {str(e)}")
@@ -105,16 +91,24 @@ async def background_scheduler():
     """Run scheduled tasks"""
     print("🎃 Background scheduler starting...")
     
-    # Clean up old articles IMMEDIATELY on startup - DISABLED for hackathon demo
-    # print("🧹 Cleaning up old articles on startup...")
-    # await cleanup_old_articles()
-    
     # Wait 5 seconds before first fetch
     await asyncio.sleep(5)
     
+    last_cleanup = None
+    
     # Start the fetch loop
     while True:
         print("🕷️ Starting scheduled feed fetch...")
         await fetch_all_feeds()
+        
+        # Retention runs on its own, slower interval
+        if settings.RETENTION_ENABLED and (
+            last_cleanup is None or
+            datetime.now() - last_cleanup >= timedelta(hours=settings.RETENTION_INTERVAL_HOURS)
+        ):
+            print("🧹 Applying retention policies...")
+            await cleanup_old_articles()
+            last_cleanup = datetime.now()
+        
         print("⏰ Next fetch in 30 minutes...")
         await asyncio.sleep(1800)  # 30 minutes
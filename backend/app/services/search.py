@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_, cast, text, Text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article, SEARCH_CONFIG
+
+MODES = ("hybrid", "keyword", "semantic")
+
+class HybridSearchService:
+    """Keyword (Postgres full-text) + semantic (Qdrant) article search.
+
+    Both legs apply the same source/date/entity filters in their own index and
+    return a ranked candidate list; hybrid mode merges them with reciprocal
+    rank fusion, score = sum(1 / (SEARCH_RRF_K + rank)), so exact-term hits
+    and semantically close articles both surface without tuning score scales.
+    """
+
+    def __init__(self, db: Session, embedder=None):
+        self.db = db
+        self.embedder = embedder  # None: keyword only
+
+    def keyword_search(self, query: str, limit: int, sources: Optional[List[str]] = None,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                       entities: Optional[List[str]] = None) -> List[int]:
+        """Article IDs ranked by full-text relevance"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+            rank = func.ts_rank_cd(Article.search_vector, tsquery)
+            q = self.db.query(Article.id).filter(Article.search_vector.op('@@')(tsquery))
+            order = [rank.desc(), Article.published_date.desc()]
+        else:
+            # No full-text index: substring match on title/summary, newest first
+            pattern = f"%{query}%"
+            q = self.db.query(Article.id).filter(or_(Article.title.ilike(pattern), Article.summary.ilike(pattern)))
+            order = [Article.published_date.desc()]
+
+        q = q.filter(Article.canonical_id.is_(None))
+        q = self.apply_filters(q, sources, date_from, date_to, entities)
+        return [row.id for row in q.order_by(*order).limit(limit)]
+
+    def vector_search(self, query: str, limit: int, sources: Optional[List[str]] = None,
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      entities: Optional[List[str]] = None) -> Dict[int, float]:
+        """Article ID -> cosine similarity, best first"""
+        if self.embedder is None:
+            return {}
+        points = self.embedder.search_similar(
+            query, limit=limit, score_threshold=settings.SEARCH_MIN_VECTOR_SCORE,
+            sources=sources, date_from=date_from, date_to=date_to, entities=entities
+        )
+        return {p.payload['article_id']: p.score for p in points if p.payload.get('article_id') is not None}
+
+    def search(self, query: str, limit: int = 10, mode: str = "hybrid", sources: Optional[List[str]] = None,
+               date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+               entities: Optional[List[str]] = None) -> List[Dict]:
+        depth = max(limit, settings.SEARCH_CANDIDATES)
+        filters = (sources, date_from, date_to, entities)
+        keyword_ids = self.keyword_search(query, depth, *filters) if mode != "semantic" else []
+        vector_scores = self.vector_search(query, depth, *filters) if mode != "keyword" else {}
+
+        fused: Dict[int, float] = {}
+        for rank, article_id in enumerate(keyword_ids, start=1):
+            fused[article_id] = fused.get(article_id, 0.0) + 1.0 / (settings.SEARCH_RRF_K + rank)
+        for rank, article_id in enumerate(vector_scores, start=1):
+            fused[article_id] = fused.get(article_id, 0.0) + 1.0 / (settings.SEARCH_RRF_K + rank)
+
+        top = sorted(fused, key=fused.get, reverse=True)[:limit]
+        keyword_set = set(keyword_ids)
+        return self.hydrate(top, {
+            article_id: {
+                'score': round(fused[article_id], 6),
+                'matched_by': [
+                    leg for leg, hit in (("keyword", article_id in keyword_set), ("semantic", article_id in vector_scores))
+                    if hit
+                ],
+                'similarity': vector_scores.get(article_id)
+            }
+            for article_id in top
+        })
+
+    def hydrate(self, article_ids: List[int], extra: Optional[Dict[int, Dict]] = None) -> List[Dict]:
+        """Load articles in one query, keeping the given order"""
+        if not article_ids:
+            return []
+        articles = {a.id: a for a in self.db.query(Article).filter(Article.id.in_(article_ids))}
+        return [
+            {**jsonable_encoder(articles[article_id], exclude={"body"}), **(extra or {}).get(article_id, {})}
+            for article_id in article_ids if article_id in articles
+        ]
+
+    def apply_filters(self, query, sources, date_from, date_to, entities=None):
+        if sources:
+            query = query.filter(Article.source_domain.in_(sources))
+        if date_from:
+            query = query.filter(Article.published_date >= date_from)
+        if date_to:
+            query = query.filter(Article.published_date <= date_to)
+        for i, entity in enumerate(entities or []):
+            name = entity.strip().lower()
+            if self.db.get_bind().dialect.name == "postgresql":
+                query = query.filter(text(
+                    "EXISTS (SELECT 1 FROM jsonb_array_elements(articles.entities::jsonb -> 'entities') e "
+                    f"WHERE lower(e ->> 'text') = :entity_{i})"
+                ).bindparams(**{f"entity_{i}": name}))
+            else:
+                query = query.filter(func.lower(cast(Article.entities, Text)).contains(f'"{name}"'))
+        return query
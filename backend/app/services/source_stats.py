@@ -0,0 +1,342 @@
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article, CascadeOrigin, SourceLatencyBucket, SourceStats
+from app.services.cooccurrence import article_entity_keys, upsert_counts
+
+LATENCY_STAGES = ("publish_to_fetch", "fetch_to_process")
+PERCENTILES = (50, 90, 99)
+ADDITIVE_COLUMNS = ('article_count', 'processed_count', 'sentiment_count', 'sentiment_sum', 'sentiment_sq_sum', 'cascades_first')
+
+# Bucket i holds latencies in (gamma^(i-1), gamma^i] seconds, so any value in it is
+# within SOURCE_LATENCY_ACCURACY of the bucket's representative value (DDSketch)
+_GAMMA = (1 + settings.SOURCE_LATENCY_ACCURACY) / (1 - settings.SOURCE_LATENCY_ACCURACY)
+
+def latency_bucket(seconds: float) -> int:
+    """Histogram bucket of a latency; bucket 0 holds everything up to one second (and clock skew)"""
+    if seconds <= 1:
+        return 0
+    return int(math.ceil(math.log(seconds) / math.log(_GAMMA)))
+
+def bucket_value(bucket: int) -> float:
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+def latency_percentiles(buckets: Dict[int, int], percentiles=PERCENTILES) -> Dict[str, Optional[float]]:
+    """pXX -> latency in seconds from a bucket -> count histogram"""
+    total = sum(buckets.values())
+    result = {f"p{p}": None for p in percentiles}
+    if not total:
+        return result
+    ordered = sorted(buckets.items())
+    for p in percentiles:
+        rank = p / 100 * (total - 1)
+        seen = 0
+        for bucket, count in ordered:
+            seen += count
+            if seen > rank:
+                result[f"p{p}"] = round(bucket_value(bucket), 1)
+                break
+    return result
+
+def _local(when: Optional[datetime]) -> Optional[datetime]:
+    """Naive local time (feed dates may carry a UTC offset)"""
+    if when is not None and when.tzinfo is not None:
+        return when.astimezone().replace(tzinfo=None)
+    return when
+
+class SourceStatsService:
+    """Per-source aggregates kept up to date as articles are ingested and processed.
+
+    Counts, sentiment sums and publish-date bounds are upserted as deltas,
+    and latencies are counted into log-scale histogram buckets, so fetchers
+    and workers update them concurrently without read-modify-write. Source
+    analytics then read one row and a few dozen buckets per source instead
+    of grouping the articles table.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _upsert(self, deltas: Dict[str, Dict]):
+        if not deltas:
+            return
+        rows = [
+            {
+                'source_domain': source,
+                **{column: delta.get(column, 0) for column in ADDITIVE_COLUMNS},
+                'first_published': delta.get('first_published'),
+                'last_published': delta.get('last_published')
+            }
+            for source, delta in sorted(deltas.items())
+        ]
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            least, greatest = func.least, func.greatest
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            least, greatest = func.min, func.max
+
+        stmt = insert(SourceStats).values(rows)
+        set_ = {column: getattr(SourceStats, column) + getattr(stmt.excluded, column) for column in ADDITIVE_COLUMNS}
+        set_['first_published'] = func.coalesce(
+            least(SourceStats.first_published, stmt.excluded.first_published),
+            SourceStats.first_published, stmt.excluded.first_published
+        )
+        set_['last_published'] = func.coalesce(
+            greatest(SourceStats.last_published, stmt.excluded.last_published),
+            SourceStats.last_published, stmt.excluded.last_published
+        )
+        set_['updated_at'] = func.now()
+        self.db.execute(stmt.on_conflict_do_update(index_elements=['source_domain'], set_=set_))
+
+    def _record_latencies(self, latencies: Counter):
+        upsert_counts(self.db, SourceLatencyBucket, ['source_domain', 'stage', 'bucket'], [
+            {'source_domain': source, 'stage': stage, 'bucket': bucket, 'count': count}
+            for (source, stage, bucket), count in sorted(latencies.items())
+        ])
+
+    def record_ingest(self, articles: Iterable[Tuple[Optional[str], Optional[datetime], datetime]]) -> int:
+        """Count newly saved (source_domain, published_date, fetched_at) articles; caller commits"""
+        deltas: Dict[str, Dict] = defaultdict(dict)
+        latencies: Counter = Counter()
+        recorded = 0
+        for source, published, fetched_at in articles:
+            source = source or ""
+            published, fetched_at = _local(published), _local(fetched_at)
+            delta = deltas[source]
+            delta['article_count'] = delta.get('article_count', 0) + 1
+            when = published or fetched_at
+            delta['first_published'] = min(delta.get('first_published') or when, when)
+            delta['last_published'] = max(delta.get('last_published') or when, when)
+            if published is not None:
+                latencies[(source, "publish_to_fetch", latency_bucket((fetched_at - published).total_seconds()))] += 1
+            recorded += 1
+        self._upsert(deltas)
+        self._record_latencies(latencies)
+        return recorded
+
+    def record_processed(self, articles: Iterable[Tuple[Optional[str], Optional[datetime], Optional[datetime]]]) -> int:
+        """Count first-time processed (source_domain, fetched_at, processed_at) articles; caller commits"""
+        deltas: Dict[str, Dict] = defaultdict(dict)
+        latencies: Counter = Counter()
+        recorded = 0
+        for source, fetched_at, processed_at in articles:
+            source = source or ""
+            delta = deltas[source]
+            delta['processed_count'] = delta.get('processed_count', 0) + 1
+            if fetched_at is not None and processed_at is not None:
+                seconds = (_local(processed_at) - _local(fetched_at)).total_seconds()
+                latencies[(source, "fetch_to_process", latency_bucket(seconds))] += 1
+            recorded += 1
+        self._upsert(deltas)
+        self._record_latencies(latencies)
+        return recorded
+
+    def record_sentiment(self, changes: Iterable[Tuple[Optional[str], Optional[float], Optional[float]]]):
+        """Swap (source_domain, old_score, new_score) in the running sentiment sums; caller commits"""
+        deltas: Dict[str, Dict] = defaultdict(dict)
+        for source, old, new in changes:
+            if old == new:
+                continue
+            delta = deltas[source or ""]
+            for score, sign in ((old, -1), (new, 1)):
+                if score is not None:
+                    delta['sentiment_count'] = delta.get('sentiment_count', 0) + sign
+                    delta['sentiment_sum'] = delta.get('sentiment_sum', 0.0) + sign * score
+                    delta['sentiment_sq_sum'] = delta.get('sentiment_sq_sum', 0.0) + sign * score * score
+        self._upsert(deltas)
+
+    def record_origins(self, articles: Iterable[Tuple[Optional[Dict], Optional[str], datetime]]) -> int:
+        """Track which source mentioned each entity first; caller commits.
+
+        Takes (entities, source_domain, seen_at) of first-time processed
+        canonical articles. The first mention of an entity in
+        SOURCE_CASCADE_WINDOW_HOURS opens an episode; when a different
+        source mentions it within the window, the episode's first source is
+        credited with a cascade. Returns the number of cascades credited.
+        """
+        window = timedelta(hours=settings.SOURCE_CASCADE_WINDOW_HOURS)
+        articles = sorted(
+            ((article_entity_keys(entities), source or "", _local(seen_at) or datetime.now())
+             for entities, source, seen_at in articles),
+            key=lambda a: a[2]
+        )
+        names = sorted({name for keys, _, _ in articles for name in keys})
+        origins: Dict[str, List] = {}
+        for start in range(0, len(names), 1000):
+            for row in self.db.query(
+                CascadeOrigin.entity, CascadeOrigin.source_domain, CascadeOrigin.first_seen, CascadeOrigin.spread_at
+            ).filter(CascadeOrigin.entity.in_(names[start:start + 1000])):
+                origins[row.entity] = [row.source_domain, row.first_seen, row.spread_at]
+
+        credited: Counter = Counter()
+        for keys, source, seen_at in articles:
+            opened = []
+            for name in keys:
+                origin = origins.get(name)
+                if origin is None or seen_at - origin[1] > window:
+                    opened.append(name)
+                    origins[name] = [source, seen_at, None]
+                elif origin[1] - seen_at > window or origin[2] is not None or origin[0] == source:
+                    continue
+                else:
+                    # A second source within the window; an older backfilled article may become the origin
+                    first_source, first_seen = (origin[0], origin[1]) if origin[1] <= seen_at else (source, seen_at)
+                    claimed = self.db.query(CascadeOrigin).filter(
+                        CascadeOrigin.entity == name, CascadeOrigin.spread_at.is_(None)
+                    ).update({
+                        'source_domain': first_source,
+                        'first_seen': first_seen,
+                        'spread_at': max(origin[1], seen_at)
+                    }, synchronize_session=False)
+                    origins[name] = [first_source, first_seen, max(origin[1], seen_at)]
+                    if claimed:
+                        credited[first_source] += 1
+            self._open_episodes(opened, source, seen_at, window)
+
+        self._upsert({source: {'cascades_first': count} for source, count in credited.items()})
+        return sum(credited.values())
+
+    def _open_episodes(self, names: List[str], source: str, seen_at: datetime, window: timedelta):
+        """Make `source` the origin of each entity, unless another worker opened a current episode meanwhile"""
+        if not names:
+            return
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(CascadeOrigin).values([
+            {'entity': name, 'source_domain': source, 'first_seen': seen_at, 'spread_at': None} for name in sorted(names)
+        ])
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=['entity'],
+            set_={'source_domain': stmt.excluded.source_domain, 'first_seen': stmt.excluded.first_seen, 'spread_at': None},
+            where=CascadeOrigin.first_seen < seen_at - window
+        ))
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Recount every source's aggregates from the articles table (first deploy).
+
+        Processing times aren't stored, so fetch-to-process latency only
+        accumulates from new processing.
+        """
+        for model in (SourceStats, SourceLatencyBucket, CascadeOrigin):
+            self.db.query(model).delete(synchronize_session=False)
+
+        last_id = 0
+        recorded = 0
+        while True:
+            batch = self.db.query(
+                Article.id, Article.source_domain, Article.published_date, Article.fetched_date,
+                Article.is_processed, Article.sentiment_score
+            ).filter(Article.id > last_id).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            recorded += self.record_ingest((a.source_domain, a.published_date, a.fetched_date or datetime.now()) for a in batch)
+            self.record_processed((a.source_domain, None, None) for a in batch if a.is_processed)
+            self.record_sentiment((a.source_domain, None, a.sentiment_score) for a in batch)
+            last_id = batch[-1].id
+
+        # Cascade origins replay in publication order
+        seen_at = func.coalesce(Article.published_date, Article.fetched_date)
+        rows = self.db.query(Article.entities, Article.source_domain, seen_at.label('seen_at')).filter(
+            Article.is_processed == True,
+            Article.canonical_id.is_(None)
+        ).order_by(seen_at, Article.id).yield_per(batch_size)
+        chunk = []
+        for row in rows:
+            chunk.append((row.entities, row.source_domain, row.seen_at))
+            if len(chunk) >= batch_size:
+                self.record_origins(chunk)
+                chunk = []
+        self.record_origins(chunk)
+
+        self.db.commit()
+        print(f"📰 Rebuilt source statistics: {recorded} articles")
+        return recorded
+
+    def _latency_histograms(self, sources: Optional[List[str]] = None) -> Dict[Tuple[str, str], Dict[int, int]]:
+        query = self.db.query(
+            SourceLatencyBucket.source_domain, SourceLatencyBucket.stage, SourceLatencyBucket.bucket, SourceLatencyBucket.count
+        ).filter(SourceLatencyBucket.count > 0)
+        if sources:
+            query = query.filter(SourceLatencyBucket.source_domain.in_(sources))
+        histograms: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(dict)
+        for source, stage, bucket, count in query:
+            histograms[(source, stage)][bucket] = count
+        return histograms
+
+    def _total_firsts(self) -> int:
+        return self.db.query(func.coalesce(func.sum(SourceStats.cascades_first), 0)).scalar()
+
+    def statistics(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """Per-source counts, sentiment, publish cadence, latency percentiles and cascade origins"""
+        query = self.db.query(SourceStats)
+        if sources:
+            query = query.filter(SourceStats.source_domain.in_(sources))
+        rows = query.order_by(SourceStats.article_count.desc()).all()
+        histograms = self._latency_histograms(sources)
+        total_firsts = self._total_firsts()
+
+        stats = []
+        for row in rows:
+            mean = row.sentiment_sum / row.sentiment_count if row.sentiment_count > 0 else None
+            variance = row.sentiment_sq_sum / row.sentiment_count - mean ** 2 if mean is not None else None
+            span_hours = (row.last_published - row.first_published).total_seconds() / 3600 \
+                if row.first_published and row.last_published else 0.0
+            gaps = row.article_count - 1
+            stats.append({
+                'source': row.source_domain,
+                'article_count': row.article_count,
+                'processed_count': row.processed_count,
+                'avg_sentiment': round(mean, 3) if mean is not None else 0.0,
+                'sentiment_stddev': round(math.sqrt(max(variance, 0.0)), 3) if variance is not None else None,
+                'first_published': row.first_published.isoformat() if row.first_published else None,
+                'last_published': row.last_published.isoformat() if row.last_published else None,
+                'articles_per_day': round(gaps * 24 / span_hours, 2) if gaps > 0 and span_hours > 0 else None,
+                'mean_gap_hours': round(span_hours / gaps, 2) if gaps > 0 and span_hours > 0 else None,
+                'latency_seconds': {
+                    stage: latency_percentiles(histograms.get((row.source_domain, stage), {}))
+                    for stage in LATENCY_STAGES
+                },
+                'cascades_first': row.cascades_first,
+                'cascade_first_share': round(row.cascades_first / total_firsts, 4) if total_firsts else 0.0
+            })
+        return stats
+
+    def latency(self, stage: str, sources: Optional[List[str]] = None) -> Dict:
+        """Latency percentiles of one stage per source, and over all sources"""
+        histograms = self._latency_histograms(sources)
+        overall: Counter = Counter()
+        per_source = {}
+        for (source, bucket_stage), histogram in histograms.items():
+            if bucket_stage != stage:
+                continue
+            overall.update(histogram)
+            per_source[source] = {'count': sum(histogram.values()), **latency_percentiles(histogram)}
+        return {
+            'stage': stage,
+            'relative_accuracy': settings.SOURCE_LATENCY_ACCURACY,
+            'overall': {'count': sum(overall.values()), **latency_percentiles(overall)},
+            'sources': dict(sorted(per_source.items(), key=lambda kv: -kv[1]['count']))
+        }
+
+    def cascade_origins(self, limit: int = 20) -> List[Dict]:
+        """Sources that most often covered an entity before any other source did"""
+        total_firsts = self._total_firsts()
+        rows = self.db.query(SourceStats.source_domain, SourceStats.cascades_first, SourceStats.processed_count).filter(
+            SourceStats.cascades_first > 0
+        ).order_by(SourceStats.cascades_first.desc()).limit(limit).all()
+        return [
+            {
+                'source': row.source_domain,
+                'cascades_first': row.cascades_first,
+                'share': round(row.cascades_first / total_firsts, 4) if total_firsts else 0.0,
+                'per_100_articles': round(100 * row.cascades_first / row.processed_count, 2) if row.processed_count else None
+            }
+            for row in rows
+        ]
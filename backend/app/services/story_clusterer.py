@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, Range, PayloadSchemaType, FilterSelector
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.article import Article, StoryCluster
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+class StoryClusterer:
+    """Online leader/threshold clustering of articles into stories.
+
+    Each new article is compared against the centroids of clusters active
+    in the last STORY_WINDOW_HOURS through an ANN query on a Qdrant
+    collection of centroids. If the nearest one is within STORY_THRESHOLD
+    (cosine) the article joins it and the centroid moves to the running mean;
+    otherwise the article leads a new cluster. Cost per article is one ANN
+    lookup, independent of how many articles exist. Centroids idle for longer
+    than the window are closed (removed from the index) after each batch, so
+    the collection only holds clusters that can still absorb articles.
+    """
+
+    def __init__(self, db: Session, qdrant=None):
+        """qdrant=None is enough for reading stories; assigning needs the centroid index"""
+        self.db = db
+        self.qdrant = qdrant
+        self.collection = settings.STORY_COLLECTION_NAME
+        if qdrant is not None:
+            self._ensure_collection()
+
+    def _ensure_collection(self):
+        try:
+            self.qdrant.get_collection(self.collection)
+        except Exception:
+            self.qdrant.create_collection(
+                collection_name=self.collection,
+                vectors_config=VectorParams(size=settings.EMBEDDING_DIMENSION, distance=Distance.COSINE)
+            )
+            self.qdrant.create_payload_index(
+                collection_name=self.collection,
+                field_name="last_seen_ts",
+                field_schema=PayloadSchemaType.INTEGER
+            )
+            print(f"Created Qdrant collection: {self.collection}")
+
+    def _nearest(self, vector: np.ndarray, when: datetime) -> Optional[int]:
+        """ID of the closest active cluster within the threshold, if any"""
+        window_start = when - timedelta(hours=settings.STORY_WINDOW_HOURS)
+        hits = self.qdrant.search(
+            collection_name=self.collection,
+            query_vector=vector.tolist(),
+            query_filter=Filter(must=[
+                FieldCondition(key="last_seen_ts", range=Range(gte=int(window_start.timestamp())))
+            ]),
+            limit=1,
+            score_threshold=settings.STORY_THRESHOLD
+        )
+        return int(hits[0].id) if hits else None
+
+    def assign(self, article_ids: Sequence[int], vectors: Sequence) -> Dict[int, int]:
+        """Assign not-yet-clustered articles to stories, oldest first; returns article_id -> story_id"""
+        vector_by_id = dict(zip(article_ids, vectors))
+        articles = self.db.query(
+            Article.id, func.coalesce(Article.published_date, Article.fetched_date).label('seen_at')
+        ).filter(
+            Article.id.in_(list(vector_by_id)),
+            Article.story_id.is_(None)
+        ).order_by('seen_at', Article.id).all()
+
+        assigned = {}
+        for article in articles:
+            vector = _normalize(vector_by_id[article.id])
+            seen_at = article.seen_at or datetime.now()
+            cluster_id = self._nearest(vector, seen_at)
+            cluster = self.db.get(StoryCluster, cluster_id) if cluster_id is not None else None
+
+            if cluster is None:
+                cluster = StoryCluster(
+                    leader_article_id=article.id,
+                    centroid=vector.tobytes(),
+                    size=1,
+                    first_seen=seen_at,
+                    last_seen=seen_at
+                )
+                self.db.add(cluster)
+                self.db.flush()
+            else:
+                centroid = np.frombuffer(cluster.centroid, dtype=np.float32)
+                cluster.centroid = ((centroid * cluster.size + vector) / (cluster.size + 1)).astype(np.float32).tobytes()
+                cluster.size += 1
+                cluster.first_seen = min(cluster.first_seen or seen_at, seen_at)
+                cluster.last_seen = max(cluster.last_seen or seen_at, seen_at)
+
+            # Re-index the centroid right away so later articles in this batch see it
+            self.qdrant.upsert(collection_name=self.collection, points=[PointStruct(
+                id=cluster.id,
+                vector=_normalize(np.frombuffer(cluster.centroid, dtype=np.float32)).tolist(),
+                payload={"last_seen_ts": int(cluster.last_seen.timestamp()), "size": cluster.size}
+            )])
+            assigned[article.id] = cluster.id
+
+        self.db.bulk_update_mappings(Article, [
+            {'id': article_id, 'story_id': story_id} for article_id, story_id in assigned.items()
+        ])
+        # Syndicated copies belong to their canonical article's story
+        for article_id, story_id in assigned.items():
+            self.db.query(Article).filter(Article.canonical_id == article_id).update(
+                {Article.story_id: story_id}, synchronize_session=False
+            )
+        self.db.commit()
+        
+        if articles:
+            newest = max(article.seen_at or datetime.now() for article in articles)
+            self.close_idle(newest - timedelta(hours=settings.STORY_WINDOW_HOURS))
+        return assigned
+
+    def close_idle(self, before: datetime):
+        """Drop centroids last updated before `before` from the index; their rows stay for reading"""
+        self.qdrant.delete(
+            collection_name=self.collection,
+            points_selector=FilterSelector(filter=Filter(must=[
+                FieldCondition(key="last_seen_ts", range=Range(lt=int(before.timestamp())))
+            ]))
+        )
+
+    def get_stories(self, hours: int = 48, min_sources: int = 2, limit: int = 20,
+                    articles_per_story: int = 10) -> List[Dict]:
+        """Multi-source stories active in the last N hours, with velocity (articles/hour)"""
+        cutoff = datetime.now() - timedelta(hours=hours)
+        seen_at = func.coalesce(Article.published_date, Article.fetched_date)
+
+        rows = self.db.query(
+            Article.story_id,
+            func.count(Article.id).label('article_count'),
+            func.count(func.distinct(Article.source_domain)).label('source_count'),
+            func.min(seen_at).label('first_seen'),
+            func.max(seen_at).label('last_seen')
+        ).filter(
+            Article.story_id.isnot(None),
+            seen_at >= cutoff
+        ).group_by(Article.story_id).having(
+            func.count(func.distinct(Article.source_domain)) >= min_sources
+        ).all()
+
+        stories = []
+        for row in rows:
+            time_span = (row.last_seen - row.first_seen).total_seconds() / 3600  # hours
+            stories.append({
+                'story_id': row.story_id,
+                'article_count': row.article_count,
+                'source_count': row.source_count,
+                'velocity': round(row.article_count / max(time_span, 1), 2),
+                'first_seen': row.first_seen.isoformat(),
+                'last_seen': row.last_seen.isoformat()
+            })
+        stories.sort(key=lambda s: (s['source_count'], s['velocity']), reverse=True)
+        stories = stories[:limit]
+        if not stories:
+            return []
+
+        # Member articles of the returned stories only, in one query
+        story_ids = [s['story_id'] for s in stories]
+        members: Dict[int, List] = {story_id: [] for story_id in story_ids}
+        for article in self.db.query(
+            Article.id, Article.title, Article.url, Article.source_domain, Article.story_id,
+            Article.canonical_id, seen_at.label('seen_at')
+        ).filter(Article.story_id.in_(story_ids), seen_at >= cutoff).order_by(seen_at):
+            members[article.story_id].append(article)
+
+        leaders = dict(self.db.query(StoryCluster.id, StoryCluster.leader_article_id).filter(
+            StoryCluster.id.in_(story_ids)
+        ).all())
+        for story in stories:
+            story_members = members[story['story_id']]
+            leader = next((a for a in story_members if a.id == leaders.get(story['story_id'])), story_members[0])
+            story['title'] = leader.title
+            story['sources'] = sorted({a.source_domain for a in story_members if a.source_domain})
+            story['articles'] = [
+                {
+                    'id': a.id,
+                    'title': a.title,
+                    'url': a.url,
+                    'published_date': a.seen_at.isoformat(),
+                    'source': a.source_domain
+                }
+                for a in story_members if a.canonical_id is None
+            ][:articles_per_story]
+        return stories
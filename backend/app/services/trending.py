@@ -0,0 +1,274 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.article import Article, TrendingSketch
+from app.services.cooccurrence import article_entity_keys
+from app.services.query_cache import LRUCache
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters summary (Metwally et al.) over at most `capacity` counters.
+
+    Each counter holds (count, error): the item occurred at least count - error
+    and at most count times, and error <= total / capacity. Any item occurring
+    more than total / capacity times is guaranteed to be monitored. Summaries
+    merge (Agarwal et al.), so hourly sketches combine into any window.
+    """
+
+    def __init__(self, capacity: int, counters: Optional[Dict[str, List[int]]] = None,
+                 types: Optional[Dict[str, str]] = None, total: int = 0):
+        self.capacity = capacity
+        self.counters = counters or {}  # item -> [count, error]
+        self.types = types or {}
+        self.total = total
+        self._heap: Optional[List[Tuple[int, str]]] = None  # (count, item) lower bounds, built on first eviction
+
+    def add(self, item: str, entity_type: Optional[str] = None, weight: int = 1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            if self._heap is not None:
+                heapq.heappush(self._heap, (weight, item))
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            victim, floor = self._pop_min()
+            del self.counters[victim]
+            self.types.pop(victim, None)
+            self.counters[item] = [floor + weight, floor]
+            heapq.heappush(self._heap, (floor + weight, item))
+        if entity_type:
+            self.types[item] = entity_type
+
+    def _pop_min(self) -> Tuple[str, int]:
+        """Remove and return the smallest counter's (item, count) from the heap.
+
+        Increments don't touch the heap, so entries are lower bounds; a stale
+        top is re-pushed with its current count until the top is exact, which
+        makes it the true minimum. Amortized O(log capacity) per eviction.
+        """
+        if self._heap is None:
+            self._heap = [(count, item) for item, (count, _) in self.counters.items()]
+            heapq.heapify(self._heap)
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counters[item][0]
+            if current == count:
+                return item, count
+            heapq.heappush(self._heap, (current, item))
+
+    def min_count(self) -> int:
+        """Upper bound on the count of any unmonitored item"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        own_floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for item in self.counters.keys() | other.counters.keys():
+            count_a, error_a = self.counters.get(item, (own_floor, own_floor))
+            count_b, error_b = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = [count_a + count_b, error_a + error_b]
+
+        capacity = max(self.capacity, other.capacity)
+        kept = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[:capacity]
+        types = {**other.types, **self.types}
+        return SpaceSaving(
+            capacity, dict(kept), {item: types[item] for item, _ in kept if item in types}, self.total + other.total
+        )
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """(item, count, error) for the k largest counters"""
+        ranked = sorted(self.counters.items(), key=lambda kv: (kv[1][0], -kv[1][1]), reverse=True)
+        return [(item, count, error) for item, (count, error) in ranked[:k]]
+
+    def to_json(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "items": [[item, count, error, self.types.get(item)] for item, (count, error) in self.counters.items()]
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict, total: int) -> "SpaceSaving":
+        sketch = cls(data.get("capacity", settings.TRENDING_SKETCH_CAPACITY), total=total)
+        for item, count, error, entity_type in data.get("items", []):
+            sketch.counters[item] = [count, error]
+            if entity_type:
+                sketch.types[item] = entity_type
+        return sketch
+
+def hour_bucket(when: datetime) -> datetime:
+    return when.replace(minute=0, second=0, microsecond=0)
+
+_trending_cache = LRUCache(maxsize=64, ttl=settings.TRENDING_CACHE_SECONDS)
+
+# This process's not-yet-flushed counts, hour -> sketch
+_pending: Dict[datetime, SpaceSaving] = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+def _add_to_sketches(sketches: Dict[datetime, SpaceSaving], articles: Iterable[Tuple[Optional[Dict], datetime]]) -> int:
+    """Fold (entities, seen_at) pairs into per-hour sketches in place; returns articles counted"""
+    oldest = hour_bucket(datetime.now()) - timedelta(hours=settings.TRENDING_MAX_HOURS)
+    recorded = 0
+    for entities, seen_at in articles:
+        keys = article_entity_keys(entities, limit=None)
+        hour = hour_bucket(seen_at or datetime.now())
+        if keys and hour >= oldest:
+            sketch = sketches.setdefault(hour, SpaceSaving(settings.TRENDING_SKETCH_CAPACITY))
+            for name, entity_type in keys.items():
+                sketch.add(name, entity_type)
+            recorded += 1
+    return recorded
+
+def flush_pending() -> int:
+    """Merge this process's pending sketches into their rows; returns hours written.
+
+    Runs in its own session, so each hour's row is locked once per flush
+    rather than once per article. On failure the counts go back into the
+    pending buffer for the next attempt.
+    """
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    db = SessionLocal()
+    try:
+        TrendingService(db).merge_into_rows(pending)
+        db.commit()
+        return len(pending)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Trending flush failed, keeping {len(pending)} hours pending: {str(e)}")
+        with _pending_lock:
+            for hour, sketch in pending.items():
+                _pending[hour] = sketch.merge(_pending[hour]) if hour in _pending else sketch
+        return 0
+    finally:
+        db.close()
+
+class TrendingService:
+    """Trending entities from persisted hourly Space-Saving sketches.
+
+    Processing an article folds its entities into an in-memory sketch of its
+    hour; every TRENDING_FLUSH_SECONDS the process merges those into the
+    persisted rows (one row-locked read-modify-write per hour, so API and
+    reprocess workers don't serialize on the current hour). Windows include
+    this process's unflushed counts; other processes' show up once flushed.
+    A window query merges at most TRENDING_MAX_HOURS sketches, so memory and
+    work are bounded by capacity x hours regardless of how many distinct
+    entities appear.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, articles: Iterable[Tuple[Optional[Dict], datetime]]) -> int:
+        """Count (entities, seen_at) pairs into this process's pending hourly sketches"""
+        articles = list(articles)
+        with _pending_lock:
+            recorded = _add_to_sketches(_pending, articles)
+            due = time.monotonic() - _last_flush >= settings.TRENDING_FLUSH_SECONDS
+        if due:
+            flush_pending()
+        return recorded
+
+    def merge_into_rows(self, sketches: Dict[datetime, SpaceSaving]):
+        """Merge per-hour sketches into their rows, in hour order; caller commits"""
+        for hour in sorted(sketches):
+            row = self._locked_row(hour)
+            merged = SpaceSaving.from_json(row.sketch, row.total).merge(sketches[hour])
+            row.sketch = merged.to_json()
+            row.total = merged.total
+        self.db.flush()
+
+    def _locked_row(self, hour: datetime) -> TrendingSketch:
+        """The hour's sketch row, locked for update (created if missing)"""
+        for _ in range(2):
+            row = self.db.query(TrendingSketch).filter(TrendingSketch.hour == hour).with_for_update().first()
+            if row is not None:
+                return row
+            try:
+                with self.db.begin_nested():
+                    row = TrendingSketch(
+                        hour=hour, total=0, sketch={"capacity": settings.TRENDING_SKETCH_CAPACITY, "items": []}
+                    )
+                    self.db.add(row)
+                return row
+            except IntegrityError:
+                continue  # another worker created it first; lock theirs
+        raise RuntimeError(f"Could not lock trending sketch for {hour}")
+
+    def window(self, hours: int) -> SpaceSaving:
+        """Merged sketch of the last `hours` hours"""
+        since = hour_bucket(datetime.now()) - timedelta(hours=hours - 1)
+        merged = SpaceSaving(settings.TRENDING_SKETCH_CAPACITY)
+        for row in self.db.query(TrendingSketch).filter(TrendingSketch.hour >= since):
+            merged = merged.merge(SpaceSaving.from_json(row.sketch, row.total))
+        with _pending_lock:
+            pending = [sketch for hour, sketch in _pending.items() if hour >= since]
+        for sketch in pending:
+            merged = merged.merge(sketch)
+        return merged
+
+    def top(self, hours: int = 24, k: int = 20) -> Dict:
+        hours = max(1, min(hours, settings.TRENDING_MAX_HOURS))
+        cache_key = (hour_bucket(datetime.now()), hours, k)
+        cached = _trending_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        sketch = self.window(hours)
+        result = {
+            "total_mentions": sketch.total,
+            "max_error": sketch.total // max(sketch.capacity, 1),
+            "topics": [
+                {
+                    'entity': item,
+                    'type': sketch.types.get(item),
+                    'mentions': count,
+                    'error': error
+                }
+                for item, count, error in sketch.top(k)
+            ]
+        }
+        _trending_cache.put(cache_key, result)
+        return result
+
+    def rebuild(self, hours: Optional[int] = None, batch_size: int = 1000) -> int:
+        """Recount the sketches from Article.entities (first deploy)"""
+        hours = hours or settings.TRENDING_MAX_HOURS
+        since = hour_bucket(datetime.now()) - timedelta(hours=hours)
+        self.db.query(TrendingSketch).filter(TrendingSketch.hour >= since).delete(synchronize_session=False)
+
+        last_id = 0
+        recorded = 0
+        sketches: Dict[datetime, SpaceSaving] = {}
+        while True:
+            batch = self.db.query(Article.id, Article.entities, Article.published_date, Article.fetched_date).filter(
+                Article.id > last_id,
+                Article.is_processed == True,
+                Article.canonical_id.is_(None),
+                Article.published_date >= since
+            ).order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            recorded += _add_to_sketches(sketches, ((a.entities, a.published_date or a.fetched_date) for a in batch))
+            last_id = batch[-1].id
+        self.merge_into_rows(sketches)
+        self.db.commit()
+        _trending_cache.clear()
+        print(f"📈 Rebuilt trending sketches: {recorded} articles over {hours} hours")
+        return recorded
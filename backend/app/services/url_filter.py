@@ -0,0 +1,206 @@
+import hashlib
+import math
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from app.core.config import settings
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "ncid", "guccounter"}
+GROWTH = 2  # each new layer holds twice as many URLs
+TIGHTENING = 0.5  # ...with half the false-positive rate, so the total stays bounded
+
+def normalize_url(url: str) -> str:
+    """Canonical URL form: lowercase host, no fragment, tracking params or trailing slash"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+class _MemoryBits:
+    def __init__(self, size: int):
+        self.bits = bytearray((size + 7) // 8)
+
+    def test(self, positions: List[int]) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def set(self, positions: List[int]):
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+
+class _RedisBits:
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+
+    def test(self, positions: List[int]) -> bool:
+        pipe = self.client.pipeline(transaction=False)
+        for p in positions:
+            pipe.getbit(self.key, p)
+        return all(pipe.execute())
+
+    def set(self, positions: List[int]):
+        pipe = self.client.pipeline(transaction=False)
+        for p in positions:
+            pipe.setbit(self.key, p, 1)
+        pipe.execute()
+
+    def clear(self):
+        self.client.delete(self.key)
+
+class _BloomLayer:
+    def __init__(self, capacity: int, error_rate: float, bits_factory):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits_factory(self.size)
+
+    def positions(self, digest: bytes) -> List[int]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.num_hashes)]
+
+class SeenURLFilter:
+    """Scalable Bloom filter over normalized article URLs.
+
+    `might_contain` answers "definitely new" (False) or "probably seen"
+    (True); callers confirm positives against the articles table. When a
+    layer fills up a larger, stricter one is added, so the overall
+    false-positive rate stays under URL_FILTER_ERROR_RATE / (1 - TIGHTENING).
+    Bits live in memory or, with URL_FILTER_BACKEND="redis", in Redis so all
+    workers share them.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._lock = threading.Lock()
+        self.layers: List[_BloomLayer] = []
+        self.counts: List[int] = []
+        self.metrics = {"definitely_new": 0, "probably_seen": 0, "false_positives": 0}
+        self._restore_layers()
+
+    def _bits_factory(self, index: int):
+        if self.redis is None:
+            return _MemoryBits
+        return lambda size: _RedisBits(self.redis, f"url_filter:layer:{index}")
+
+    def _add_layer(self):
+        index = len(self.layers)
+        capacity = settings.URL_FILTER_CAPACITY * (GROWTH ** index)
+        error_rate = settings.URL_FILTER_ERROR_RATE * (1 - TIGHTENING) * (TIGHTENING ** index)
+        self.layers.append(_BloomLayer(capacity, error_rate, self._bits_factory(index)))
+        self.counts.append(0)
+
+    def _restore_layers(self):
+        """Pick up layers other workers already created in Redis"""
+        if self.redis is not None:
+            stored = self.redis.hgetall("url_filter:counts")
+            for index in range(len(stored)):
+                self._add_layer()
+                self.counts[index] = int(stored.get(str(index).encode(), 0))
+        if not self.layers:
+            self._add_layer()
+
+    def _sync_layers(self):
+        """Another worker may have added a layer since we last looked"""
+        if self.redis is not None and self.redis.hlen("url_filter:counts") > len(self.layers):
+            with self._lock:
+                self.layers, self.counts = [], []
+                self._restore_layers()
+
+    @property
+    def is_empty(self) -> bool:
+        return sum(self.counts) == 0
+
+    @staticmethod
+    def _digest(url: str) -> bytes:
+        return hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=16).digest()
+
+    def might_contain(self, url: str) -> bool:
+        self._sync_layers()
+        digest = self._digest(url)
+        seen = any(layer.bits.test(layer.positions(digest)) for layer in self.layers)
+        self.metrics["probably_seen" if seen else "definitely_new"] += 1
+        return seen
+
+    def record_false_positive(self):
+        self.metrics["false_positives"] += 1
+
+    def add(self, url: str):
+        self._sync_layers()
+        digest = self._digest(url)
+        with self._lock:
+            if self.counts[-1] >= self.layers[-1].capacity:
+                self._add_layer()
+            layer = self.layers[-1]
+            layer.bits.set(layer.positions(digest))
+            self.counts[-1] += 1
+            if self.redis is not None:
+                self.redis.hincrby("url_filter:counts", str(len(self.layers) - 1), 1)
+
+    def rebuild(self, db, batch_size: int = 10000) -> int:
+        """Reset and reload the filter from the articles table"""
+        from app.models.article import Article
+
+        with self._lock:
+            for layer in self.layers:
+                layer.bits.clear()
+            if self.redis is not None:
+                self.redis.delete("url_filter:counts")
+            self.layers, self.counts = [], []
+            self._add_layer()
+
+        added = 0
+        for (url,) in db.query(Article.url).yield_per(batch_size):
+            self.add(url)
+            added += 1
+        print(f"🌸 Rebuilt seen-URL filter with {added} URLs in {len(self.layers)} layer(s)")
+        return added
+
+    def stats(self) -> Dict:
+        lookups = self.metrics["definitely_new"] + self.metrics["probably_seen"]
+        return {
+            "backend": "redis" if self.redis is not None else "memory",
+            "layers": [
+                {"capacity": layer.capacity, "count": count, "bits": layer.size, "hashes": layer.num_hashes}
+                for layer, count in zip(self.layers, self.counts)
+            ],
+            "urls": sum(self.counts),
+            **self.metrics,
+            "db_lookup_rate": round(self.metrics["probably_seen"] / lookups, 3) if lookups else 0.0
+        }
+
+_url_filter: Optional[SeenURLFilter] = None
+_url_filter_lock = threading.Lock()
+
+def get_url_filter() -> Optional[SeenURLFilter]:
+    """Shared filter, rebuilt from the DB on first use; None if disabled"""
+    global _url_filter
+    if not settings.URL_FILTER_ENABLED:
+        return None
+    if _url_filter is None:
+        with _url_filter_lock:
+            if _url_filter is None:
+                redis_client = None
+                if settings.URL_FILTER_BACKEND == "redis":
+                    import redis
+                    redis_client = redis.Redis.from_url(settings.REDIS_URL)
+                url_filter = SeenURLFilter(redis_client)
+                if url_filter.is_empty:
+                    from app.db.database import SessionLocal
+                    db = SessionLocal()
+                    try:
+                        url_filter.rebuild(db)
+                    finally:
+                        db.close()
+                _url_filter = url_filter
+    return _url_filter
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from app.core.config import settings
+
+class LocalVectorStore:
+    """Append-only on-disk copy of every computed embedding.
+
+    Records are fixed-size (int64 article_id + vector as float16/float32) in a
+    single file, read back through a memory map. Re-embedding an article
+    appends a new record; the in-memory offset index always points at the
+    latest one, and `compact` drops superseded and deleted records. Lets the
+    vector index be rebuilt without re-encoding anything.
+    """
+
+    def __init__(self, root: str, dim: int, dtype: str = "float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported vector store dtype: {dtype}")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.dim = dim
+        self.dtype = dtype
+        self.path = os.path.join(root, f"vectors-{dtype}-{dim}.bin")
+        self.record = np.dtype([("article_id", "<i8"), ("vector", "<f2" if dtype == "float16" else "<f4", (dim,))])
+        self._lock = threading.Lock()
+        self._offsets: Dict[int, int] = {}
+        self._rows = 0
+        self._inode = None
+        self._mmap = None
+
+        with self._lock:
+            self._truncate_partial()
+            self._refresh()
+
+    def _truncate_partial(self):
+        """Drop a torn trailing record left by a crash mid-append"""
+        if os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            if size % self.record.itemsize:
+                with open(self.path, "r+b") as f:
+                    f.truncate(size - size % self.record.itemsize)
+
+    def _refresh(self):
+        """Index records appended since the last look (possibly by other processes)"""
+        if not os.path.exists(self.path):
+            return
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode:  # first look, or compacted (replaced) by another process
+            self._offsets, self._rows, self._inode = {}, 0, stat.st_ino
+        rows = stat.st_size // self.record.itemsize
+        if rows == self._rows:
+            return
+        self._mmap = np.memmap(self.path, dtype=self.record, mode="r", shape=(rows,))
+        new_ids = self._mmap["article_id"][self._rows:rows]
+        for offset, article_id in enumerate(new_ids.tolist(), start=self._rows):
+            self._offsets[article_id] = offset
+        self._rows = rows
+
+    def append(self, article_ids: Sequence[int], vectors: Sequence[Sequence[float]]):
+        if not len(article_ids):
+            return
+        records = np.empty(len(article_ids), dtype=self.record)
+        records["article_id"] = article_ids
+        records["vector"] = np.asarray(vectors, dtype=np.float32)
+
+        # One O_APPEND write per batch keeps concurrent writers from interleaving records
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, records.tobytes())
+            finally:
+                os.close(fd)
+            self._refresh()
+
+    def get(self, article_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            self._refresh()
+            offset = self._offsets.get(article_id)
+            if offset is None:
+                return None
+            return np.asarray(self._mmap["vector"][offset], dtype=np.float32)
+
+    def get_many(self, article_ids: Sequence[int]) -> Tuple[List[int], np.ndarray]:
+        """(found article IDs, float32 matrix of their vectors) in the given order"""
+        with self._lock:
+            self._refresh()
+            found = [(a, self._offsets[a]) for a in article_ids if a in self._offsets]
+            if not found:
+                return [], np.zeros((0, self.dim), dtype=np.float32)
+            offsets = np.fromiter((offset for _, offset in found), dtype=np.int64, count=len(found))
+            return [a for a, _ in found], np.asarray(self._mmap["vector"][offsets], dtype=np.float32)
+
+    def article_ids(self) -> List[int]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._offsets)
+
+    def iter_latest(self, batch_size: int = 1024) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """Yield (article_ids, float32 vectors) batches of the latest record per article"""
+        with self._lock:
+            self._refresh()
+            items = sorted(self._offsets.items())
+            mmap = self._mmap
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            offsets = np.fromiter((offset for _, offset in batch), dtype=np.int64, count=len(batch))
+            # Sorted offsets keep the reads sequential
+            order = np.argsort(offsets)
+            vectors = np.empty((len(batch), self.dim), dtype=np.float32)
+            vectors[order] = mmap["vector"][offsets[order]]
+            yield [article_id for article_id, _ in batch], vectors
+
+    def compact(self, keep_ids: Optional[Set[int]] = None) -> int:
+        """Rewrite the file with only the latest record per (kept) article; returns records dropped"""
+        with self._lock:
+            self._refresh()
+            offsets = sorted(
+                offset for article_id, offset in self._offsets.items()
+                if keep_ids is None or article_id in keep_ids
+            )
+            dropped = self._rows - len(offsets)
+            if not dropped:
+                return 0
+
+            tmp_path = f"{self.path}.compact"
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(offsets), 65536):
+                    f.write(self._mmap[offsets[start:start + 65536]].tobytes())
+            self._mmap = None
+            os.replace(tmp_path, self.path)
+            self._offsets, self._rows = {}, 0
+            self._refresh()
+        print(f"🗜️ Compacted vector store: dropped {dropped} stale records")
+        return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "path": self.path,
+                "dtype": self.dtype,
+                "dimension": self.dim,
+                "articles": len(self._offsets),
+                "records": self._rows,
+                "size_bytes": self._rows * self.record.itemsize
+            }
+
+_vector_stores: Dict[str, LocalVectorStore] = {}
+_vector_stores_lock = threading.Lock()
+
+def get_vector_store(model_key: str) -> Optional[LocalVectorStore]:
+    """Store for one embedding model (vectors of different models never mix); None if disabled"""
+    if not settings.VECTOR_STORE_ENABLED:
+        return None
+    if model_key not in _vector_stores:
+        with _vector_stores_lock:
+            if model_key not in _vector_stores:
+                root = os.path.join(settings.VECTOR_STORE_DIR, model_key.replace("/", "__"))
+                store = LocalVectorStore(root, settings.EMBEDDING_DIMENSION, settings.VECTOR_STORE_DTYPE)
+                meta_path = os.path.join(root, "meta.json")
+                if not os.path.exists(meta_path):
+                    with open(meta_path, "w") as f:
+                        json.dump({"model_key": model_key, "dimension": store.dim, "dtype": store.dtype}, f)
+                _vector_stores[model_key] = store
+    return _vector_stores[model_key]
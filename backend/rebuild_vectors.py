@@ -0,0 +1,86 @@
+"""
+Rebuild the Qdrant collection from the local vector store (no re-encoding)
+
+Usage:
+    python rebuild_vectors.py               # upsert every stored vector
+    python rebuild_vectors.py --recreate    # drop and recreate the collection first
+    python rebuild_vectors.py --compact     # also drop stale/deleted records from the store
+    python rebuild_vectors.py --related     # also recompute the related-articles graph
+
+Only articles still in the database are loaded; payloads (title, source,
+publish date, entities) come from the articles table.
+"""
+import argparse
+import time
+from app.db.database import SessionLocal
+from app.models.article import Article
+from app.services.embedder import EmbeddingService, point_id_for, vector_payload
+from app.services.related import RelatedArticlesService
+
+def rebuild(recreate: bool = False, compact: bool = False, related: bool = False, batch_size: int = 1024):
+    embedder = EmbeddingService()
+    store = embedder.vector_store
+    if store is None:
+        print("❌ Local vector store is disabled (VECTOR_STORE_ENABLED=false)")
+        return
+
+    stats = store.stats()
+    print(f"📂 {stats['articles']} vectors in {stats['path']} ({stats['size_bytes'] / 1e6:.1f} MB)")
+    if recreate:
+        print("🧨 Recreating Qdrant collection")
+        embedder.reset_collection()
+
+    db = SessionLocal()
+    started = time.monotonic()
+    loaded = 0
+    live_ids = set()
+    try:
+        for article_ids, vectors in store.iter_latest(batch_size):
+            rows = {
+                row.id: row for row in db.query(
+                    Article.id, Article.title, Article.source_domain, Article.published_date, Article.entities
+                ).filter(Article.id.in_(article_ids))
+            }
+            items = [
+                {
+                    'article_id': article_id,
+                    'title': rows[article_id].title,
+                    'vector': vector.tolist(),
+                    'payload': vector_payload(
+                        rows[article_id].source_domain, rows[article_id].published_date, rows[article_id].entities
+                    )
+                }
+                for article_id, vector in zip(article_ids, vectors) if article_id in rows
+            ]
+            embedder.store_vectors(items, persist=False)
+            db.bulk_update_mappings(Article, [
+                {'id': item['article_id'], 'embedding_id': point_id_for(item['article_id'])} for item in items
+            ])
+            db.commit()
+
+            live_ids.update(rows)
+            loaded += len(items)
+            elapsed = time.monotonic() - started
+            print(f"📊 {loaded} vectors loaded | {loaded / elapsed if elapsed else 0:.0f} vectors/s")
+    finally:
+        db.close()
+
+    print(f"✅ Loaded {loaded} vectors in {time.monotonic() - started:.1f}s")
+    if compact:
+        store.compact(keep_ids=live_ids)
+    if related:
+        db = SessionLocal()
+        try:
+            RelatedArticlesService(db, store).rebuild()
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load the vector index from the local vector store")
+    parser.add_argument("--recreate", action="store_true", help="drop and recreate the collection first")
+    parser.add_argument("--compact", action="store_true", help="drop superseded and deleted records afterwards")
+    parser.add_argument("--related", action="store_true", help="recompute the related-articles graph afterwards")
+    parser.add_argument("--batch-size", type=int, default=1024, help="vectors per upsert")
+    args = parser.parse_args()
+
+    rebuild(recreate=args.recreate, compact=args.compact, related=args.related, batch_size=args.batch_size)
@@ -0,0 +1,349 @@
+"""
+Offline backfill / reprocess of articles (NER, sentiment and optionally embeddings)
+Streams article IDs in chunks, fans the NLP work out over a process pool with
+models preloaded in each worker, and writes results back in bulk.
+
+Usage:
+    python reprocess.py                  # unprocessed articles only
+    python reprocess.py --all            # everything, e.g. after a model change
+    python reprocess.py --all --embeddings --workers 8
+
+Progress is checkpointed after every chunk; re-running the same command
+resumes where it stopped (use --reset to start over).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from sqlalchemy.orm import selectinload
+from app.db.database import SessionLocal
+from app.models.article import Article
+from app.services.related import RelatedArticlesService
+from app.services.story_clusterer import StoryClusterer
+from app.services.cooccurrence import CooccurrenceService, article_day
+from app.services.trending import TrendingService, flush_pending
+from app.services.rollups import RollupService
+from app.services.source_stats import SourceStatsService
+from app.services.gazetteer import record_mentions
+
+# Per-worker services, loaded once by the pool initializer
+_ner = None
+_embedder = None
+
+def _init_worker(with_embeddings: bool):
+    global _ner, _embedder
+    from app.services.ner_service import NERService
+    from app.services.embedder import EmbeddingService
+    _ner = NERService()
+    if with_embeddings:
+        _embedder = EmbeddingService(connect=False)
+        _embedder.model  # load now rather than on the first chunk
+
+def _process_chunk(items: List[Dict]) -> List[Dict]:
+    """Run in a worker: NLP over one chunk of {id, title, summary, content}"""
+    from app.services.embedder import embedding_text
+
+    with_content = [item for item in items if item['content']]
+    entities = _ner.extract_entities_batch([item['content'] for item in with_content])
+    entities_by_id = {item['id']: ents for item, ents in zip(with_content, entities)}
+    if _ner.gazetteer is not None:
+        summary_only = [item for item in items if not item['content']]
+        entities = _ner.extract_entities_batch(
+            [" ".join(filter(None, [item['title'], item['summary']])) for item in summary_only], summary_only=True
+        )
+        entities_by_id.update((item['id'], ents) for item, ents in zip(summary_only, entities))
+
+    vectors_by_id = {}
+    if _embedder is not None:
+        texts = [embedding_text(item['title'], item['content']) for item in items]
+        vectors_by_id = dict(zip((item['id'] for item in items), _embedder.generate_embeddings(texts)))
+
+    results = []
+    for item in items:
+        result = {'id': item['id'], 'vector': vectors_by_id.get(item['id'])}
+        if item['id'] in entities_by_id:
+            result['entities'] = {"entities": entities_by_id[item['id']]}
+            result['sentiment_score'] = _ner.analyze_sentiment(item['content']) if item['content'] else None
+        results.append(result)
+    return results
+
+def _load_checkpoint(path: str) -> Dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_id": 0, "processed": 0}
+
+def _save_checkpoint(path: str, checkpoint: Dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def _read_chunks(all_articles: bool, start_id: int, chunk_size: int, limit: Optional[int]):
+    """Keyset-paginate canonical articles by ID; yields lists of plain dicts"""
+    db = SessionLocal()
+    try:
+        last_id = start_id
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            query = db.query(Article).options(selectinload(Article.body)).filter(
+                Article.id > last_id,
+                Article.canonical_id.is_(None)
+            )
+            if not all_articles:
+                query = query.filter(Article.is_processed == False)
+            batch = query.order_by(Article.id).limit(size).all()
+            if not batch:
+                break
+
+            yield [
+                {
+                    'id': a.id,
+                    'title': a.title,
+                    'summary': a.summary,
+                    'content': a.content,
+                    'source_domain': a.source_domain,
+                    'published_date': a.published_date,
+                    'seen_at': a.published_date or a.fetched_date,
+                    'day': article_day(a),
+                    'previous_entities': a.entities if a.is_processed else None,
+                    'previous_sentiment': a.sentiment_score,
+                    'fetched_date': a.fetched_date,
+                    'was_processed': a.is_processed
+                }
+                for a in batch
+            ]
+            last_id = batch[-1].id
+            if remaining is not None:
+                remaining -= len(batch)
+            db.expunge_all()
+    finally:
+        db.close()
+
+def _write_results(chunk: List[Dict], results: List[Dict], embedder):
+    """Bulk write one chunk's results back to Postgres (and Qdrant)"""
+    from app.services.embedder import vector_payload
+    
+    meta_by_id = {item['id']: item for item in chunk}
+    point_ids = {}
+    vectors = []
+    if embedder is not None:
+        vectors = [
+            {
+                'article_id': r['id'],
+                'title': meta_by_id[r['id']]['title'],
+                'vector': r['vector'],
+                'payload': vector_payload(
+                    meta_by_id[r['id']]['source_domain'], meta_by_id[r['id']]['published_date'], r.get('entities')
+                )
+            }
+            for r in results if r['vector'] is not None
+        ]
+        point_ids = dict(zip((v['article_id'] for v in vectors), embedder.store_vectors(vectors)))
+
+    mappings = []
+    for r in results:
+        mapping = {'id': r['id'], 'is_processed': True}
+        if 'entities' in r:
+            mapping['entities'] = r['entities']
+            mapping['sentiment_score'] = r['sentiment_score']
+        if r['id'] in point_ids:
+            mapping['embedding_id'] = point_ids[r['id']]
+        mappings.append(mapping)
+
+    db = SessionLocal()
+    try:
+        db.bulk_update_mappings(Article, mappings)
+        
+        # Swap each re-extracted article's old entity counts for the new ones
+        cooccurrence = CooccurrenceService(db)
+        extracted = [r for r in results if 'entities' in r]
+        cooccurrence.record(
+            ((meta_by_id[r['id']]['previous_entities'], meta_by_id[r['id']]['day']) for r in extracted), sign=-1
+        )
+        cooccurrence.record((r['entities'], meta_by_id[r['id']]['day']) for r in extracted)
+        # Trending sketches can't un-count, so only first-time extractions are added
+        TrendingService(db).record(
+            (r['entities'], meta_by_id[r['id']]['seen_at']) for r in extracted
+            if not meta_by_id[r['id']]['was_processed']
+        )
+        record_mentions(db, (r['entities'] for r in extracted if not meta_by_id[r['id']]['was_processed']))
+        # Hourly rollups count every article, with or without entities
+        rollups = RollupService(db)
+        items = [meta_by_id[r['id']] for r in results]
+        rollups.record((
+            (item['previous_entities'], item['source_domain'], item['seen_at']) for item in items if item['was_processed']
+        ), sign=-1)
+        rollups.record(
+            (r.get('entities', item['previous_entities']), item['source_domain'], item['seen_at'])
+            for r, item in zip(results, items)
+        )
+        stats = SourceStatsService(db)
+        stats.record_sentiment(
+            (meta_by_id[r['id']]['source_domain'], meta_by_id[r['id']]['previous_sentiment'], r['sentiment_score'])
+            for r in extracted
+        )
+        processed_at = datetime.now()
+        stats.record_processed(
+            (item['source_domain'], item['fetched_date'], processed_at) for item in items if not item['was_processed']
+        )
+        stats.record_origins(
+            (r['entities'], meta_by_id[r['id']]['source_domain'], meta_by_id[r['id']]['seen_at']) for r in extracted
+            if not meta_by_id[r['id']]['was_processed']
+        )
+        db.commit()
+        
+        # Link the freshly embedded articles into the related-articles graph and stories
+        if embedder is not None and vectors:
+            ids, vecs = [v['article_id'] for v in vectors], [v['vector'] for v in vectors]
+            RelatedArticlesService(db, embedder.vector_store, embedder.qdrant).update(ids, vecs)
+            StoryClusterer(db, embedder.qdrant).assign(ids, vecs)
+    finally:
+        db.close()
+
+def _propagate_to_duplicates(chunk_size: int) -> int:
+    """Copy canonical articles' results onto their near-duplicates"""
+    db = SessionLocal()
+    updated = 0
+    try:
+        last_id = 0
+        while True:
+            dupes = db.query(
+                Article.id, Article.canonical_id, Article.source_domain, Article.fetched_date,
+                Article.sentiment_score, Article.is_processed
+            ).filter(
+                Article.id > last_id,
+                Article.canonical_id.isnot(None)
+            ).order_by(Article.id).limit(chunk_size).all()
+            if not dupes:
+                break
+
+            canonical = {
+                row.id: row for row in db.query(
+                    Article.id, Article.entities, Article.sentiment_score, Article.is_processed, Article.story_id
+                ).filter(Article.id.in_({d.canonical_id for d in dupes}))
+            }
+            mappings = [
+                {
+                    'id': d.id,
+                    'entities': canonical[d.canonical_id].entities,
+                    'sentiment_score': canonical[d.canonical_id].sentiment_score,
+                    'story_id': canonical[d.canonical_id].story_id,
+                    'is_processed': True
+                }
+                for d in dupes
+                if d.canonical_id in canonical and canonical[d.canonical_id].is_processed
+            ]
+            db.bulk_update_mappings(Article, mappings)
+            
+            propagated = {m['id'] for m in mappings}
+            copied = [d for d in dupes if d.id in propagated]
+            stats = SourceStatsService(db)
+            stats.record_sentiment(
+                (d.source_domain, d.sentiment_score, canonical[d.canonical_id].sentiment_score) for d in copied
+            )
+            processed_at = datetime.now()
+            stats.record_processed((d.source_domain, d.fetched_date, processed_at) for d in copied if not d.is_processed)
+            db.commit()
+            updated += len(mappings)
+            last_id = dupes[-1].id
+    finally:
+        db.close()
+    return updated
+
+def reprocess(all_articles: bool = False, workers: Optional[int] = None, chunk_size: int = 256,
+              embeddings: bool = False, checkpoint_path: str = "data/reprocess.checkpoint.json",
+              reset: bool = False, limit: Optional[int] = None):
+    workers = workers or os.cpu_count() or 1
+    checkpoint = {"last_id": 0, "processed": 0} if reset else _load_checkpoint(checkpoint_path)
+    if checkpoint["last_id"]:
+        print(f"↩️ Resuming after article {checkpoint['last_id']} ({checkpoint['processed']} already done)")
+
+    db = SessionLocal()
+    query = db.query(Article).filter(Article.id > checkpoint["last_id"], Article.canonical_id.is_(None))
+    if not all_articles:
+        query = query.filter(Article.is_processed == False)
+    total = query.count()
+    db.close()
+    if limit is not None:
+        total = min(total, limit)
+    print(f"🔮 Reprocessing {total} articles with {workers} workers (chunks of {chunk_size})")
+
+    embedder = None
+    if embeddings:
+        from app.services.embedder import EmbeddingService
+        embedder = EmbeddingService()
+
+    started = time.monotonic()
+    done = 0
+    # spawn, not fork: workers must not inherit the parent's DB and SQLite cache connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(embeddings,)
+    ) as pool:
+        # Results are written in submission order so the checkpoint only ever moves forward
+        in_flight = deque()
+        chunks = _read_chunks(all_articles, checkpoint["last_id"], chunk_size, limit)
+
+        def drain_one():
+            nonlocal done
+            chunk, future = in_flight.popleft()
+            _write_results(chunk, future.result(), embedder)
+            flush_pending()  # before the checkpoint moves past this chunk
+            done += len(chunk)
+            checkpoint["last_id"] = chunk[-1]['id']
+            checkpoint["processed"] += len(chunk)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            print(f"📊 {done}/{total} articles | {rate:.1f} articles/s | ETA {eta / 60:.1f} min")
+
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(_process_chunk, chunk)))
+            if len(in_flight) >= workers * 2:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    duplicates = _propagate_to_duplicates(chunk_size)
+    elapsed = time.monotonic() - started
+    print(f"✅ Reprocessed {done} articles in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.1f} articles/s); copied results to {duplicates} duplicates")
+
+    # A finished run leaves nothing to resume
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk (re)process articles with NER and embeddings")
+    parser.add_argument("--all", action="store_true", help="reprocess already processed articles too")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="articles per worker task")
+    parser.add_argument("--embeddings", action="store_true", help="also compute and store embeddings")
+    parser.add_argument("--checkpoint", default="data/reprocess.checkpoint.json", help="checkpoint file")
+    parser.add_argument("--reset", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many articles")
+    args = parser.parse_args()
+
+    reprocess(
+        all_articles=args.all,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        embeddings=args.embeddings,
+        checkpoint_path=args.checkpoint,
+        reset=args.reset,
+        limit=args.limit
+    )